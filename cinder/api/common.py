@@ -38,6 +38,11 @@ api_common_opts = [
                help='Base URL that will be presented to users in links '
                     'to the OpenStack Volume API',
                deprecated_name='osapi_compute_link_prefix'),
+    cfg.BoolOpt('osapi_stream_list_responses',
+                default=False,
+                help='Serialize the items of volume, snapshot and backup '
+                     'list responses as they are sent, rather than building '
+                     'the whole response in memory first'),
 ]
 
 CONF = cfg.CONF
@@ -103,17 +108,28 @@ def _get_marker_param(request):
     return request.GET['marker']
 
 
-def limited(items, request, max_limit=CONF.osapi_max_limit):
-    """Return a slice of items according to requested offset and limit.
+def view_list(views):
+    """Return the item views of a list response.
+
+    :param views: iterable of item views, built as they are iterated over
+    :returns: a list, or a wsgi.StreamedList when list responses are
+              streamed
+    """
+    if CONF.osapi_stream_list_responses:
+        return wsgi.StreamedList(views)
+    return list(views)
+
+
+def get_limit_and_offset(request, max_limit=CONF.osapi_max_limit):
+    """Return the (limit, offset) tuple requested by offset and limit.
 
-    :param items: A sliceable entity
     :param request: ``wsgi.Request`` possibly containing 'offset' and 'limit'
                     GET variables. 'offset' is where to start in the list,
                     and 'limit' is the maximum number of items to return. If
                     'limit' is not specified, 0, or > max_limit, we default
                     to max_limit. Negative values for either offset or limit
                     will cause exc.HTTPBadRequest() exceptions to be raised.
-    :kwarg max_limit: The maximum number of items to return from 'items'
+    :kwarg max_limit: The maximum number of items to return
     """
     try:
         offset = int(request.GET.get('offset', 0))
@@ -136,6 +152,18 @@ def limited(items, request, max_limit=CONF.osapi_max_limit):
         raise webob.exc.HTTPBadRequest(explanation=msg)
 
     limit = min(max_limit, limit or max_limit)
+    return limit, offset
+
+
+def limited(items, request, max_limit=CONF.osapi_max_limit):
+    """Return a slice of items according to requested offset and limit.
+
+    :param items: A sliceable entity
+    :param request: ``wsgi.Request`` possibly containing 'offset' and 'limit'
+                    GET variables, see get_limit_and_offset()
+    :kwarg max_limit: The maximum number of items to return from 'items'
+    """
+    limit, offset = get_limit_and_offset(request, max_limit)
     range_end = offset + limit
     return items[offset:range_end]
 
@@ -71,18 +71,20 @@ class ExtendedSnapshotAttributesController(wsgi.Controller):
             # Attach our slave template to the response object
             resp_obj.attach(xml=ExtendedSnapshotAttributesTemplate())
 
-            snapshots = list(resp_obj.obj.get('snapshots', []))
             db_snapshots = self._get_snapshots(context)
 
-            for snapshot_object in snapshots:
+            def extend_snapshot(snapshot_object):
                 try:
                     snapshot_data = db_snapshots[snapshot_object['id']]
                 except KeyError:
-                    continue
+                    return
 
                 self._extend_snapshot(snapshot=snapshot_object,
                                       data=snapshot_data)
 
+            wsgi.map_items(resp_obj.obj.get('snapshots', []),
+                           extend_snapshot)
+
 
 class Extended_snapshot_attributes(extensions.ExtensionDescriptor):
     """Extended SnapshotAttributes support."""
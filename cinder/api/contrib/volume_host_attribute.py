@@ -12,6 +12,8 @@
 #   License for the specific language governing permissions and limitations
 #   under the License.
 
+import functools
+
 from cinder.api import extensions
 from cinder.api.openstack import wsgi
 from cinder.api import xmlutil
@@ -47,8 +49,9 @@ class VolumeHostAttributeController(wsgi.Controller):
         context = req.environ['cinder.context']
         if authorize(context):
             resp_obj.attach(xml=VolumeListHostAttributeTemplate())
-            for volume in list(resp_obj.obj['volumes']):
-                self._add_volume_host_attribute(context, req, volume)
+            wsgi.map_items(resp_obj.obj['volumes'],
+                           functools.partial(self._add_volume_host_attribute,
+                                             context, req))
 
 
 class Volume_host_attribute(extensions.ExtensionDescriptor):
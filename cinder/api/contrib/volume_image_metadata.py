@@ -76,10 +76,14 @@ class VolumeImageMetadataController(wsgi.Controller):
         if authorize(context):
             resp_obj.attach(xml=VolumesImageMetadataTemplate())
             all_meta = self._get_all_images_metadata(context)
-            for volume in list(resp_obj.obj.get('volumes', [])):
+
+            def add_image_metadata(volume):
                 image_meta = all_meta.get(volume['id'], {})
                 self._add_image_metadata(context, volume, image_meta)
 
+            wsgi.map_items(resp_obj.obj.get('volumes', []),
+                           add_image_metadata)
+
 
 class Volume_image_metadata(extensions.ExtensionDescriptor):
     """Show image metadata associated with the volume."""
@@ -12,6 +12,8 @@
 #   License for the specific language governing permissions and limitations
 #   under the License.
 
+import functools
+
 from cinder.api import extensions
 from cinder.api.openstack import wsgi
 from cinder.api import xmlutil
@@ -48,8 +50,10 @@ class VolumeMigStatusAttributeController(wsgi.Controller):
         context = req.environ['cinder.context']
         if authorize(context):
             resp_obj.attach(xml=VolumeListMigStatusAttributeTemplate())
-            for volume in list(resp_obj.obj['volumes']):
-                self._add_volume_mig_status_attribute(req, context, volume)
+            wsgi.map_items(
+                resp_obj.obj['volumes'],
+                functools.partial(self._add_volume_mig_status_attribute,
+                                  req, context))
 
 
 class Volume_mig_status_attribute(extensions.ExtensionDescriptor):
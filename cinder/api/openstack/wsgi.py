@@ -18,6 +18,7 @@ import inspect
 import math
 import time
 
+from eventlet import greenthread
 from lxml import etree
 import six
 import webob
@@ -53,6 +54,10 @@ _MEDIA_TYPE_MAP = {
     'application/atom+xml': 'atom',
 }
 
+# Approximate size in bytes of the chunks in which list responses are
+# streamed.
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class Request(webob.Request):
     """Add some OpenStack API-specific logic to the base webob.Request."""
@@ -334,6 +339,35 @@ class JSONDictSerializer(DictSerializer):
     def default(self, data):
         return jsonutils.dumps(data)
 
+    def serialize_iter(self, data, key):
+        """Serialize data in chunks, streaming the items of data[key].
+
+        data[key] is a StreamedList.  The chunks add up to what serialize()
+        returns for the same data.
+        """
+        for index, (name, value) in enumerate(data.items()):
+            chunk = '{' if index == 0 else ', '
+            chunk += jsonutils.dumps(name) + ': '
+            if name != key:
+                yield chunk + jsonutils.dumps(value)
+                continue
+
+            chunks = [chunk + '[']
+            size = 0
+            for position, item in enumerate(value.stream()):
+                text = jsonutils.dumps(item)
+                chunks.append(text if position == 0 else ', ' + text)
+                size += len(text)
+                if size >= STREAM_CHUNK_SIZE:
+                    yield ''.join(chunks)
+                    chunks = []
+                    size = 0
+                    # Let other requests run between chunks.
+                    greenthread.sleep(0)
+            chunks.append(']')
+            yield ''.join(chunks)
+        yield '}'
+
 
 class XMLDictSerializer(DictSerializer):
 
@@ -486,6 +520,67 @@ def response(code):
     return decorator
 
 
+class StreamedList(object):
+    """Item views of a list response, built as the response is serialized.
+
+    Iterating over it builds all the items and keeps them, like a list,
+    so extensions extending the items use map() instead.  Otherwise the
+    serializers stream the items, and each item is dropped once
+    serialized.
+    """
+
+    def __init__(self, items):
+        self._items = iter(items)
+        self._list = None
+
+    def _materialize(self):
+        if self._list is None:
+            self._list = list(self._items)
+        return self._list
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+    def __len__(self):
+        return len(self._materialize())
+
+    def __getitem__(self, index):
+        return self._materialize()[index]
+
+    def stream(self):
+        """Iterate over the items, only keeping those already built."""
+        if self._list is not None:
+            return iter(self._list)
+        return self._items
+
+    def map(self, func):
+        """Call func on each item as it is built, to update it in place."""
+        if self._list is not None:
+            for item in self._list:
+                func(item)
+        else:
+            self._items = self._map(self._items, func)
+
+    @staticmethod
+    def _map(items, func):
+        for item in items:
+            func(item)
+            yield item
+
+
+def map_items(items, func):
+    """Call func on each item of a list response, to update it in place.
+
+    Items of a StreamedList are updated as they are built, so that they
+    are still streamed.
+    """
+    if isinstance(items, StreamedList):
+        items.map(func)
+    else:
+        for item in items:
+            func(item)
+
+
 class ResponseObject(object):
     """Bundles a response object with appropriate serializers.
 
@@ -603,7 +698,21 @@ class ResponseObject(object):
             response.headers[hdr] = value
         response.headers['Content-Type'] = content_type
         if self.obj is not None:
-            response.body = serializer.serialize(self.obj)
+            streamed = []
+            if isinstance(self.obj, dict):
+                streamed = [key for key, value in self.obj.items()
+                            if isinstance(value, StreamedList)]
+            if (len(streamed) == 1 and
+                    hasattr(serializer, 'serialize_iter')):
+                response.app_iter = serializer.serialize_iter(self.obj,
+                                                              streamed[0])
+            else:
+                obj = self.obj
+                if streamed:
+                    obj = dict(obj)
+                    for key in streamed:
+                        obj[key] = list(obj[key])
+                response.body = serializer.serialize(obj)
 
         return response
 
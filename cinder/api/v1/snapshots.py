@@ -139,6 +139,8 @@ class SnapshotsController(wsgi.Controller):
         """Returns a list of snapshots, transformed through entity_maker."""
         context = req.environ['cinder.context']
 
+        limit, offset = common.get_limit_and_offset(req)
+
         #pop out limit and offset , they are not search_opts
         search_opts = req.GET.copy()
         search_opts.pop('limit', None)
@@ -149,10 +151,10 @@ class SnapshotsController(wsgi.Controller):
         utils.remove_invalid_filter_options(context, search_opts,
                                             allowed_search_options)
 
-        snapshots = self.volume_api.get_all_snapshots(context,
-                                                      search_opts=search_opts)
-        limited_list = common.limited(snapshots, req)
-        res = [entity_maker(context, snapshot) for snapshot in limited_list]
+        limited_list = self.volume_api.get_all_snapshots(
+            context, search_opts=search_opts, limit=limit, offset=offset)
+        res = common.view_list(entity_maker(context, snapshot)
+                               for snapshot in limited_list)
         return {'snapshots': res}
 
     @wsgi.serializers(xml=SnapshotTemplate)
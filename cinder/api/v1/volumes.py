@@ -265,6 +265,8 @@ class VolumeController(wsgi.Controller):
     def _items(self, req, entity_maker):
         """Returns a list of volumes, transformed through entity_maker."""
 
+        limit, offset = common.get_limit_and_offset(req)
+
         #pop out limit and offset , they are not search_opts
         search_opts = req.GET.copy()
         search_opts.pop('limit', None)
@@ -278,19 +280,20 @@ class VolumeController(wsgi.Controller):
                                             search_opts,
                                             self._get_volume_search_options())
 
-        volumes = self.volume_api.get_all(context, marker=None, limit=None,
+        volumes = self.volume_api.get_all(context, marker=None, limit=limit,
                                           sort_key='created_at',
                                           sort_dir='desc', filters=search_opts,
-                                          viewable_admin_meta=True)
+                                          viewable_admin_meta=True,
+                                          offset=offset)
 
-        volumes = [dict(vol.iteritems()) for vol in volumes]
+        limited_list = [dict(vol.iteritems()) for vol in volumes]
 
-        for volume in volumes:
+        for volume in limited_list:
             utils.add_visible_admin_metadata(volume)
 
-        limited_list = common.limited(volumes, req)
         req.cache_resource(limited_list)
-        res = [entity_maker(context, vol) for vol in limited_list]
+        res = common.view_list(entity_maker(context, vol)
+                               for vol in limited_list)
         return {'volumes': res}
 
     def _image_uuid_from_href(self, image_href):
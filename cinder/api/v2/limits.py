@@ -22,6 +22,7 @@ import copy
 import httplib
 import math
 import re
+import sqlite3
 import time
 
 import webob.dec
@@ -211,7 +212,9 @@ DEFAULT_LIMITS = [
 class RateLimitingMiddleware(base_wsgi.Middleware):
     """Rate-limits requests passing through this middleware.
 
-    All limit information is stored in memory for this implementation.
+    All limit information is stored in memory for this implementation,
+    unless a limiter sharing it between API workers, such as
+    `SlidingWindowLimiter` with a store, is selected.
     """
 
     def __init__(self, application, limits=None, limiter=None, **kwargs):
@@ -368,6 +371,222 @@ class Limiter(object):
         return result
 
 
+class MemoryCounterStore(object):
+    """Request counters kept in the memory of the API process."""
+
+    # Seconds between two removals of expired counters.
+    PRUNE_INTERVAL = 60
+
+    def __init__(self):
+        self._counts = {}
+        self._expires = {}
+        self._next_prune = 0
+
+    def add(self, counts, now):
+        """Add to the counters and return all of them.
+
+        @param counts: Dictionary of counter keys to a list of the count to
+                       add and the time at which the counter expires
+        @param now: The current time
+        @return: Dictionary of counter keys to their count
+        """
+        for key, (count, expires) in counts.items():
+            self._counts[key] = self._counts.get(key, 0) + count
+            self._expires[key] = expires
+        if now >= self._next_prune:
+            for key, expires in self._expires.items():
+                if expires < now:
+                    del self._counts[key]
+                    del self._expires[key]
+            self._next_prune = now + self.PRUNE_INTERVAL
+        return self._counts
+
+
+class FileCounterStore(object):
+    """Request counters kept in an SQLite file shared by API workers."""
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+
+    def _connect(self):
+        # Connect on first use, in the worker process rather than in the
+        # parent process it is forked from.
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path,
+                                               isolation_level=None)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS counters "
+                "(key TEXT PRIMARY KEY, count INTEGER, expires REAL)")
+        return self._connection
+
+    def add(self, counts, now):
+        """Add to the counters and return all of them.
+
+        See `MemoryCounterStore.add`.
+        """
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for key, (count, expires) in counts.items():
+                updated = connection.execute(
+                    "UPDATE counters SET count = count + ?, expires = ? "
+                    "WHERE key = ?", (count, expires, key))
+                if not updated.rowcount:
+                    connection.execute(
+                        "INSERT INTO counters (key, count, expires) "
+                        "VALUES (?, ?, ?)", (key, count, expires))
+            connection.execute("DELETE FROM counters WHERE expires < ?",
+                               (now,))
+            totals = dict(connection.execute(
+                "SELECT key, count FROM counters"))
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return totals
+
+
+class SlidingWindowLimiter(Limiter):
+    """Rate-limit checking class counting requests in sliding windows.
+
+    Requests are counted per user and limit in fixed windows as long as
+    the limit's unit.  The number of requests made over the last unit is
+    estimated from the counts of the current and previous windows, so each
+    check only looks up two counters.
+
+    The counters are kept in memory, or, given a store path, in a file
+    shared by the API workers of the host.  Each worker then adds its
+    requests to the file every sync_interval seconds and reads the other
+    workers' ones back, rather than on every request.
+    """
+
+    def __init__(self, limits, store=None, sync_interval=1, **kwargs):
+        """Initialize the new `SlidingWindowLimiter`.
+
+        @param limits: List of `Limit` objects
+        @param store: Path of the file counters are shared through, None to
+                      keep them in memory
+        @param sync_interval: Seconds between two syncs with the file
+        """
+        super(SlidingWindowLimiter, self).__init__(limits, **kwargs)
+        if store:
+            self.store = FileCounterStore(store)
+            self.sync_interval = float(sync_interval)
+        else:
+            self.store = MemoryCounterStore()
+            self.sync_interval = 0
+        # Counts of the store as of the last sync.
+        self._totals = {}
+        # Counts not added to the store yet, with their expiry time.
+        self._pending = {}
+        self._last_sync = None
+
+    def _get_time(self):
+        """Retrieve the current time. Broken out for testability."""
+        return time.time()
+
+    def _user_limits(self, username):
+        # Don't let levels make a copy of the limits for every user.
+        if username in self.levels:
+            return self.levels[username]
+        return self.limits
+
+    def _sync(self, now):
+        if (self._last_sync is not None and
+                now - self._last_sync < self.sync_interval):
+            return
+        self._totals = self.store.add(self._pending, now)
+        self._pending = {}
+        self._last_sync = now
+
+    def _count(self, key):
+        pending = self._pending.get(key)
+        return self._totals.get(key, 0) + (pending[0] if pending else 0)
+
+    def _window(self, username, index, limit, now):
+        """Return the key and counts of the current window of a limit.
+
+        @return: Tuple of the current window's key, the estimated number
+                 of requests over the last unit, the counts of the
+                 previous and current windows, and the seconds elapsed in
+                 the current window
+        """
+        window = int(now // limit.unit)
+        elapsed = now - window * limit.unit
+        key = '%s/%d/%d' % (username or '', index, window)
+        previous = self._count('%s/%d/%d' % (username or '', index,
+                                             window - 1))
+        current = self._count(key)
+        estimate = previous * (1 - elapsed / limit.unit) + current
+        return key, estimate, previous, current, elapsed
+
+    @staticmethod
+    def _delay(limit, previous, current, elapsed):
+        """Seconds until one more request fits in the limit."""
+        allowed = limit.value - 1 - current
+        if previous and allowed >= 0:
+            # Wait for enough of the previous window to slide out.
+            delay = limit.unit * (1 - float(allowed) / previous) - elapsed
+            if delay <= limit.unit - elapsed:
+                return max(delay, 0)
+        # Wait for the next window, of which the current one will be the
+        # previous one.
+        delay = limit.unit - elapsed
+        if current > limit.value - 1:
+            delay += limit.unit * (1 - float(limit.value - 1) / current)
+        return delay
+
+    def get_limits(self, username=None):
+        """Return the limits for a given user."""
+        now = self._get_time()
+        result = []
+        for index, limit in enumerate(self._user_limits(username)):
+            key, estimate, previous, current, elapsed = self._window(
+                username, index, limit, now)
+            display = limit.display()
+            display['remaining'] = int(max(limit.value - estimate, 0))
+            if estimate + 1 > limit.value:
+                display['resetTime'] = int(now + self._delay(
+                    limit, previous, current, elapsed))
+            else:
+                display['resetTime'] = int(now)
+            result.append(display)
+        return result
+
+    def check_for_delay(self, verb, url, username=None):
+        """Check the given verb/user/user triplet for limit.
+
+        @return: Tuple of delay (in seconds) and error message (or None, None)
+        """
+        now = self._get_time()
+        self._sync(now)
+        delays = []
+
+        for index, limit in enumerate(self._user_limits(username)):
+            if limit.verb != verb or not re.match(limit.regex, url):
+                continue
+            key, estimate, previous, current, elapsed = self._window(
+                username, index, limit, now)
+            if estimate + 1 > limit.value:
+                delay = self._delay(limit, previous, current, elapsed)
+                delays.append((delay, limit.error_message))
+                continue
+            pending = self._pending.get(key)
+            if pending:
+                pending[0] += 1
+            else:
+                # Keep the counter while it can be the previous window.
+                expires = (int(now // limit.unit) + 2) * limit.unit
+                self._pending[key] = [1, expires]
+
+        if delays:
+            delays.sort()
+            return delays[0]
+
+        return None, None
+
+
 class WsgiLimiter(object):
     """Rate-limit checking from a WSGI application.
 
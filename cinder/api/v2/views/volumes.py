@@ -125,7 +125,8 @@ class ViewBuilder(common.ViewBuilder):
                           for a pagination query
         :returns: Volume data in dictionary format
         """
-        volumes_list = [func(request, volume)['volume'] for volume in volumes]
+        volumes_list = common.view_list(func(request, volume)['volume']
+                                        for volume in volumes)
         volumes_links = self._get_collection_links(request,
                                                    volumes,
                                                    coll_name)
@@ -17,6 +17,8 @@
 
 
 import ast
+
+from oslo.config import cfg
 import webob
 from webob import exc
 
@@ -34,6 +36,7 @@ from cinder.volume import utils as volume_utils
 from cinder.volume import volume_types
 
 
+CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 SCHEDULER_HINTS_NAMESPACE =\
     "http://docs.openstack.org/block-service/ext/scheduler-hints/api/v2"
@@ -202,6 +205,8 @@ class VolumeController(wsgi.Controller):
         """Returns a detailed list of volumes."""
         return self._get_volumes(req, is_detail=True)
 
+    _summary_columns = ['id', 'display_name']
+
     def _get_volumes(self, req, is_detail):
         """Returns a list of volumes, transformed through view builder."""
 
@@ -209,10 +214,10 @@ class VolumeController(wsgi.Controller):
 
         params = req.params.copy()
         marker = params.pop('marker', None)
-        limit = params.pop('limit', None)
+        limit = self._get_page_limit(params.pop('limit', None))
+        offset = params.pop('offset', None)
         sort_key = params.pop('sort_key', 'created_at')
         sort_dir = params.pop('sort_dir', 'desc')
-        params.pop('offset', None)
         filters = params
 
         utils.remove_invalid_filter_options(context,
@@ -227,23 +232,38 @@ class VolumeController(wsgi.Controller):
         if 'metadata' in filters:
             filters['metadata'] = ast.literal_eval(filters['metadata'])
 
+        # The summary view only needs the id and name, so don't load whole
+        # volumes with their metadata and type for it.
+        columns = None if is_detail else self._summary_columns
         volumes = self.volume_api.get_all(context, marker, limit, sort_key,
                                           sort_dir, filters,
-                                          viewable_admin_meta=True)
-
-        volumes = [dict(vol.iteritems()) for vol in volumes]
-
-        for volume in volumes:
-            utils.add_visible_admin_metadata(volume)
-
-        limited_list = common.limited(volumes, req)
+                                          viewable_admin_meta=True,
+                                          offset=offset, columns=columns)
 
         if is_detail:
-            volumes = self._view_builder.detail_list(req, limited_list)
+            volumes = [dict(vol.iteritems()) for vol in volumes]
+            for volume in volumes:
+                utils.add_visible_admin_metadata(volume)
+            view = self._view_builder.detail_list(req, volumes)
         else:
-            volumes = self._view_builder.summary_list(req, limited_list)
-        req.cache_resource(limited_list)
-        return volumes
+            view = self._view_builder.summary_list(req, volumes)
+        req.cache_resource(volumes)
+        return view
+
+    def _get_page_limit(self, limit):
+        """Cap the requested page size at osapi_max_limit.
+
+        Like common.limited, a missing or zero limit means the maximum.
+        Invalid values are left for the volume API to reject.
+        """
+        max_limit = CONF.osapi_max_limit
+        try:
+            limit = int(limit or 0)
+        except ValueError:
+            return limit
+        if limit < 0:
+            return limit
+        return min(limit or max_limit, max_limit)
 
     def _image_uuid_from_href(self, image_href):
         # If the image href was generated by nova api, strip image_href
@@ -78,7 +78,8 @@ class ViewBuilder(common.ViewBuilder):
 
     def _list_view(self, func, request, backups):
         """Provide a view for a list of backups."""
-        backups_list = [func(request, backup)['backup'] for backup in backups]
+        backups_list = common.view_list(func(request, backup)['backup']
+                                        for backup in backups)
         backups_links = self._get_collection_links(request,
                                                    backups,
                                                    self._collection_name)
@@ -29,6 +29,11 @@ XMLNS_VOLUME_V1 = 'http://docs.openstack.org/volume/api/v1'
 XMLNS_VOLUME_V2 = ('http://docs.openstack.org/api/openstack-volume/2.0/'
                    'content')
 
+# Number of items of a streamed list rendered at a time.
+STREAM_BATCH_SIZE = 100
+# Comment marking where streamed items go in the rendered XML.
+_STREAM_MARKER = 'streamed items'
+
 
 def validate_schema(xml, schema_name):
     if isinstance(xml, str):
@@ -643,6 +648,57 @@ class Template(object):
         # Serialize it into XML
         return etree.tostring(elem, *args, **kwargs)
 
+    def serialize_iter(self, obj, key, *args, **kwargs):
+        """Serialize an object in chunks, streaming the items of obj[key].
+
+        obj[key] is a StreamedList selected by a child of the root element.
+        The items are rendered a batch at a time and come first among the
+        children of the root element.  Positional and keyword arguments are
+        passed to etree.tostring().
+
+        :param obj: The object to serialize.
+        :param key: The key of the items to stream.
+        """
+
+        for k, v in self.serialize_options.items():
+            kwargs.setdefault(k, v)
+
+        frame = dict(obj)
+        frame[key] = []
+        items = iter(obj[key].stream())
+        try:
+            first = next(items)
+        except StopIteration:
+            yield self.serialize(frame, *args, **kwargs)
+            return
+
+        # Render everything but the items, marking where they go.
+        elem = self.make_tree(frame)
+        marker = '<!--%s-->' % _STREAM_MARKER
+        elem.insert(0, etree.Comment(_STREAM_MARKER))
+        head, tail = etree.tostring(elem, *args, **kwargs).split(marker)
+        yield head
+
+        # Only the children of the root element are kept, the namespaces
+        # are declared on the root element already written.
+        kwargs['xml_declaration'] = False
+        batch = [first]
+        for item in items:
+            batch.append(item)
+            if len(batch) == STREAM_BATCH_SIZE:
+                yield self._serialize_items(key, batch, marker,
+                                            *args, **kwargs)
+                batch = []
+        if batch:
+            yield self._serialize_items(key, batch, marker, *args, **kwargs)
+        yield tail
+
+    def _serialize_items(self, key, items, marker, *args, **kwargs):
+        elem = self.make_tree({key: items})
+        elem.insert(0, etree.Comment(_STREAM_MARKER))
+        elem.append(etree.Comment(_STREAM_MARKER))
+        return etree.tostring(elem, *args, **kwargs).split(marker)[1]
+
     def make_tree(self, obj):
         """Create a tree.
 
@@ -0,0 +1,145 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Admission control for backup and restore operations.
+
+Backup and restore requests are cast to the backup service and would all
+start as soon as they arrive. The admission queue makes them wait until the
+number of operations running on the host, and on the volume backend they
+read from or write to, is below the configured limits.
+"""
+
+import collections
+import contextlib
+import itertools
+
+from eventlet import event
+
+from cinder.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+class _Operation(object):
+    def __init__(self, sequence, backend, project_id, size_bytes):
+        self.sequence = sequence
+        self.backend = backend
+        self.project_id = project_id
+        self.size_bytes = size_bytes
+        self.admitted = event.Event()
+
+
+class AdmissionQueue(object):
+    """Limits how many backup operations run at the same time.
+
+    Waiting operations are admitted in fair-share order: first those of the
+    project with the fewest running operations, then those of the project
+    admitted least recently, and within a project in arrival order. A limit
+    of 0 means no limit.
+
+    All state is changed without yielding, so green threads share a queue
+    without locking.
+    """
+
+    def __init__(self, max_running=0, max_running_per_backend=0):
+        self.max_running = max_running
+        self.max_running_per_backend = max_running_per_backend
+        self._sequence = itertools.count()
+        self._admissions = itertools.count()
+        self._last_admission = {}
+        self._waiting = []
+        self._running = set()
+        self._running_by_backend = collections.defaultdict(int)
+        self._running_by_project = collections.defaultdict(int)
+
+    @contextlib.contextmanager
+    def admit(self, backend, project_id, size_bytes=0):
+        """Wait until the operation may run, and account for it meanwhile."""
+        op = _Operation(next(self._sequence), backend, project_id,
+                        size_bytes)
+        self._waiting.append(op)
+        self._dispatch()
+        if not op.admitted.ready():
+            LOG.debug('Operation of project %(project)s on backend '
+                      '%(backend)s queued behind %(depth)d others.',
+                      {'project': project_id, 'backend': backend,
+                       'depth': len(self._waiting) - 1})
+        try:
+            op.admitted.wait()
+        except BaseException:
+            if op in self._waiting:
+                self._waiting.remove(op)
+            else:
+                self._finish(op)
+            raise
+        try:
+            yield
+        finally:
+            self._finish(op)
+
+    def _has_capacity(self, backend):
+        if self.max_running and len(self._running) >= self.max_running:
+            return False
+        return not (self.max_running_per_backend and
+                    self._running_by_backend[backend] >=
+                    self.max_running_per_backend)
+
+    def _next_operation(self):
+        candidates = [op for op in self._waiting
+                      if self._has_capacity(op.backend)]
+        if not candidates:
+            return None
+        return min(candidates,
+                   key=lambda op: (self._running_by_project[op.project_id],
+                                   self._last_admission.get(op.project_id,
+                                                            -1),
+                                   op.sequence))
+
+    def _dispatch(self):
+        while True:
+            op = self._next_operation()
+            if op is None:
+                return
+            self._waiting.remove(op)
+            self._running.add(op)
+            self._running_by_backend[op.backend] += 1
+            self._running_by_project[op.project_id] += 1
+            self._last_admission[op.project_id] = next(self._admissions)
+            op.admitted.send()
+
+    def _finish(self, op):
+        if op not in self._running:
+            return
+        self._running.remove(op)
+        self._running_by_backend[op.backend] -= 1
+        self._running_by_project[op.project_id] -= 1
+        if not self._running_by_project[op.project_id]:
+            del self._running_by_project[op.project_id]
+            if not any(waiting.project_id == op.project_id
+                       for waiting in self._waiting):
+                del self._last_admission[op.project_id]
+        self._dispatch()
+
+    def stats(self):
+        """Return the queue depth and in-flight operations and bytes."""
+        backends = collections.defaultdict(
+            lambda: {'running': 0, 'waiting': 0, 'running_bytes': 0})
+        for op in self._running:
+            backends[op.backend]['running'] += 1
+            backends[op.backend]['running_bytes'] += op.size_bytes
+        for op in self._waiting:
+            backends[op.backend]['waiting'] += 1
+        return {'queue_depth': len(self._waiting),
+                'running': len(self._running),
+                'running_bytes': sum(op.size_bytes for op in self._running),
+                'waiting_bytes': sum(op.size_bytes for op in self._waiting),
+                'backends': dict(backends)}
@@ -67,21 +67,30 @@ class API(base.Base):
             msg = _('Backup status must be available or error')
             raise exception.InvalidBackup(reason=msg)
 
+        dependents = self.db.backup_get_all_by_project(
+            context, backup['project_id'], filters={'parent_id': backup_id})
+        if dependents:
+            msg = _('Incremental backups exist for this backup')
+            raise exception.InvalidBackup(reason=msg)
+
         self.db.backup_update(context, backup_id, {'status': 'deleting'})
         self.backup_rpcapi.delete_backup(context,
                                          backup['host'],
                                          backup['id'])
 
-    def get_all(self, context, search_opts=None):
+    def get_all(self, context, search_opts=None, limit=None, offset=None):
         if search_opts is None:
             search_opts = {}
         check_policy(context, 'get_all')
         if context.is_admin:
-            backups = self.db.backup_get_all(context, filters=search_opts)
+            backups = self.db.backup_get_all(context, filters=search_opts,
+                                             limit=limit, offset=offset)
         else:
             backups = self.db.backup_get_all_by_project(context,
                                                         context.project_id,
-                                                        filters=search_opts)
+                                                        filters=search_opts,
+                                                        limit=limit,
+                                                        offset=offset)
 
         return backups
 
@@ -109,9 +118,24 @@ class API(base.Base):
         services = self.db.service_get_all_by_topic(ctxt, topic)
         return [srv['host'] for srv in services if not srv['disabled']]
 
+    def _get_latest_backup(self, context, volume_id):
+        """Return the most recent available backup of a volume."""
+        backups = self.db.backup_get_all_by_project(
+            context, context.project_id,
+            filters={'volume_id': volume_id, 'status': 'available'})
+        if not backups:
+            return None
+        return max(backups, key=lambda backup: backup['created_at'])
+
     def create(self, context, name, description, volume_id,
-               container, availability_zone=None):
-        """Make the RPC call to create a volume backup."""
+               container, availability_zone=None, incremental=False):
+        """Make the RPC call to create a volume backup.
+
+        An incremental backup only stores the data that changed since the
+        most recent available backup of the volume, which becomes its
+        parent. Backup drivers that do not support incremental backups
+        ignore the parent and store a full copy.
+        """
         check_policy(context, 'create')
         volume = self.volume_api.get(context, volume_id)
         if volume['status'] != "available":
@@ -121,6 +145,16 @@ class API(base.Base):
         if not self._is_backup_service_enabled(volume, volume_host):
             raise exception.ServiceNotFound(service_id='cinder-backup')
 
+        parent_id = None
+        if incremental:
+            parent = self._get_latest_backup(context, volume_id)
+            if parent is None:
+                msg = _('No backups available to do an incremental backup')
+                raise exception.InvalidBackup(reason=msg)
+            parent_id = parent['id']
+            if container is None:
+                container = parent['container']
+
         self.db.volume_update(context, volume_id, {'status': 'backing-up'})
 
         options = {'user_id': context.user_id,
@@ -131,7 +165,8 @@ class API(base.Base):
                    'status': 'creating',
                    'container': container,
                    'size': volume['size'],
-                   'host': volume_host, }
+                   'host': volume_host,
+                   'parent_id': parent_id, }
 
         backup = self.db.backup_create(context, options)
 
@@ -44,6 +44,7 @@ restore to a new volume (default).
 
 import eventlet
 import fcntl
+import functools
 import os
 import re
 import subprocess
@@ -88,7 +89,15 @@ service_opts = [
                help='RBD stripe count to use when creating a backup image.'),
     cfg.BoolOpt('restore_discard_excess_bytes', default=True,
                 help='If True, always discard excess bytes when restoring '
-                     'volumes i.e. pad with zeroes.')
+                     'volumes i.e. pad with zeroes.'),
+    cfg.IntOpt('backup_ceph_connection_pool_size', default=4,
+               help='Maximum number of idle connections to the backup Ceph '
+                    'cluster kept open for reuse, per pool. Set to 0 to '
+                    'connect for every operation.'),
+    cfg.IntOpt('backup_ceph_connection_pool_max_active', default=32,
+               help='Maximum number of connections to the backup Ceph '
+                    'cluster in use at once, per pool. Operations wait for '
+                    'a connection beyond that. Set to 0 for no limit.'),
 ]
 
 CONF = cfg.CONF
@@ -235,25 +244,36 @@ class CephBackupDriver(BackupDriver):
         return (old_format, features)
 
     def _connect_to_rados(self, pool=None):
+        """Check out a connection to the backup Ceph cluster.
+
+        Connections come from the pool shared with the RBD volume driver, so
+        they outlive the driver instance built for each backup operation.
+        """
+        pool_to_open = strutils.safe_encode(pool or self._ceph_backup_pool)
+        key = (self._ceph_backup_conf, self._ceph_backup_user, pool_to_open)
+        return rbd_driver.get_rados_connection_pool().get(
+            key, functools.partial(self._open_rados_connection, pool_to_open),
+            CONF.backup_ceph_connection_pool_size,
+            CONF.backup_ceph_connection_pool_max_active)
+
+    def _disconnect_from_rados(self, client, ioctx, discard=False):
+        """Return a connection to the backup Ceph cluster."""
+        rbd_driver.get_rados_connection_pool().put(client, ioctx,
+                                                   discard=discard)
+
+    def _open_rados_connection(self, pool):
         """Establish connection to the backup Ceph cluster."""
         client = self.rados.Rados(rados_id=self._ceph_backup_user,
                                   conffile=self._ceph_backup_conf)
         try:
             client.connect()
-            pool_to_open = strutils.safe_encode(pool or self._ceph_backup_pool)
-            ioctx = client.open_ioctx(pool_to_open)
+            ioctx = client.open_ioctx(pool)
             return client, ioctx
         except self.rados.Error:
             # shutdown cannot raise an exception
             client.shutdown()
             raise
 
-    def _disconnect_from_rados(self, client, ioctx):
-        """Terminate connection with the backup Ceph cluster."""
-        # closing an ioctx cannot raise an exception
-        ioctx.close()
-        client.shutdown()
-
     def _get_backup_base_name(self, volume_id, backup_id=None,
                               diff_format=False):
         """Return name of base image used for backup.
@@ -27,25 +27,56 @@
                                     failed Swift operations (default: 10).
 :backup_compression_algorithm: Compression algorithm to use for volume
                                backups. Supported options are:
-                               None (to disable), zlib and bz2 (default: zlib)
+                               None (to disable), zlib, bz2, and, when their
+                               modules are installed, lzma, snappy, lz4 and
+                               zstd (default: zlib)
+:backup_compression_plugins: Additional compression algorithms, mapped to the
+                             module implementing them (default: none).
+:backup_compression_threads: The number of chunks compressed in parallel by
+                             native threads (default: 0, compress in the
+                             uploading green thread).
+:backup_compression_adaptive: Store chunks uncompressed when a sample shows
+                              they do not compress (default: False).
+:backup_swift_upload_concurrency: The number of backup chunks compressed and
+                                  uploaded to Swift in parallel (default: 1).
+:backup_swift_restore_prefetch: The number of Swift objects downloaded ahead
+                                of the one being restored (default: 0).
+
+Chunks that only contain zeros are not uploaded, they are recorded as zero
+extents in the backup metadata. On restore these ranges are zeroed with
+discard or hole punching where the volume supports it.
+
+Backups that have a parent backup (see parent_id) are incremental: each chunk
+whose SHA-256 fingerprint matches the chunk at the same offset of the parent
+is not uploaded again, the metadata entry of the parent's object is reused
+instead, along with the container that object lives in.
 """
 
+import collections
 import hashlib
+import itertools
 import json
 import os
 import six
 import socket
+import sys
 
 import eventlet
+from eventlet import greenpool
+from eventlet import queue
+from eventlet import semaphore
+from eventlet import tpool
 from oslo.config import cfg
 
 from cinder.backup.driver import BackupDriver
 from cinder import exception
 from cinder.openstack.common import excutils
 from cinder.openstack.common.gettextutils import _
+from cinder.openstack.common import importutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import timeutils
 from cinder.openstack.common import units
+from cinder import utils
 from swiftclient import client as swift
 
 
@@ -79,30 +110,89 @@ swiftbackup_service_opts = [
     cfg.StrOpt('backup_compression_algorithm',
                default='zlib',
                help='Compression algorithm (None to disable)'),
+    cfg.DictOpt('backup_compression_plugins',
+                default={},
+                help='Additional compression algorithms, as a mapping of '
+                     'algorithm names to the module implementing them. The '
+                     'module must provide compress and decompress '
+                     'functions'),
+    cfg.IntOpt('backup_compression_threads',
+               default=0,
+               help='The number of backup chunks compressed in parallel by '
+                    'native threads, limited by the eventlet thread pool '
+                    'size (0 to compress in green threads)'),
+    cfg.BoolOpt('backup_compression_adaptive',
+                default=False,
+                help='Compress a sample of every backup chunk first and '
+                     'store the chunk uncompressed if the sample does not '
+                     'compress well enough'),
+    cfg.FloatOpt('backup_compression_max_ratio',
+                 default=0.9,
+                 help='The largest compressed to uncompressed size ratio '
+                      'of a sample for which the chunk is still compressed '
+                      'in adaptive compression mode'),
+    cfg.IntOpt('backup_swift_upload_concurrency',
+               default=1,
+               help='The number of backup chunks that are compressed and '
+                    'uploaded to Swift in parallel. Memory used by a backup '
+                    'is bounded by this number of chunks (1 to disable '
+                    'pipelining)'),
+    cfg.IntOpt('backup_swift_restore_prefetch',
+               default=0,
+               help='The number of Swift objects to download ahead of the '
+                    'object being written to the volume during a restore '
+                    '(0 to disable prefetching)'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(swiftbackup_service_opts)
 
+# Compression algorithms known without configuration, mapped to the module
+# implementing them. Optional codecs only need to be installed when used.
+COMPRESSION_MODULES = {
+    'zlib': 'zlib',
+    'gzip': 'zlib',
+    'bz2': 'bz2',
+    'bzip2': 'bz2',
+    'lzma': 'lzma',
+    'xz': 'lzma',
+    'snappy': 'snappy',
+    'lz4': 'lz4.frame',
+    'zstd': 'zstd',
+}
+
+# Adaptive compression compresses this many slices of this size, spread
+# over the chunk, to decide whether to compress the whole chunk.
+COMPRESSION_SAMPLE_SLICES = 4
+COMPRESSION_SAMPLE_SIZE = 16 * units.Ki
+
 
 class SwiftBackupDriver(BackupDriver):
     """Provides backup, restore and delete of backup objects within Swift."""
 
-    DRIVER_VERSION = '1.0.0'
-    DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1'}
+    DRIVER_VERSION = '2.0.0'
+    DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1',
+                              '2.0.0': '_restore_v2'}
+    # Name of the metadata entries of chunks that only contain zeros
+    ZERO_EXTENT = 'zero_extent'
 
     def _get_compressor(self, algorithm):
-        try:
-            if algorithm.lower() in ('none', 'off', 'no'):
-                return None
-            elif algorithm.lower() in ('zlib', 'gzip'):
-                import zlib as compressor
-                return compressor
-            elif algorithm.lower() in ('bz2', 'bzip2'):
-                import bz2 as compressor
-                return compressor
-        except ImportError:
-            pass
+        if algorithm.lower() in ('none', 'off', 'no'):
+            return None
+
+        modules = dict(COMPRESSION_MODULES)
+        for name, module in CONF.backup_compression_plugins.items():
+            modules[name.lower()] = module
+        module = modules.get(algorithm.lower())
+        if module is not None:
+            try:
+                compressor = importutils.import_module(module)
+            except ImportError:
+                pass
+            else:
+                if (hasattr(compressor, 'compress') and
+                        hasattr(compressor, 'decompress')):
+                    return compressor
 
         err = _('unsupported compression algorithm: %s') % algorithm
         raise ValueError(unicode(err))
@@ -115,8 +205,15 @@ class SwiftBackupDriver(BackupDriver):
         self.data_block_size_bytes = CONF.backup_swift_object_size
         self.swift_attempts = CONF.backup_swift_retry_attempts
         self.swift_backoff = CONF.backup_swift_retry_backoff
+        self.upload_concurrency = max(CONF.backup_swift_upload_concurrency, 1)
+        self.restore_prefetch = max(CONF.backup_swift_restore_prefetch, 0)
         self.compressor = \
             self._get_compressor(CONF.backup_compression_algorithm)
+        self.compression_adaptive = CONF.backup_compression_adaptive
+        self.compression_threads = None
+        if CONF.backup_compression_threads > 0:
+            self.compression_threads = semaphore.Semaphore(
+                CONF.backup_compression_threads)
         LOG.debug('Connect to %s in "%s" mode' % (CONF.backup_swift_url,
                                                   CONF.backup_swift_auth))
         if CONF.backup_swift_auth == 'single_user':
@@ -125,16 +222,36 @@ class SwiftBackupDriver(BackupDriver):
                             "but %(param)s not set")
                           % {'param': 'backup_swift_user'})
                 raise exception.ParameterNotFound(param='backup_swift_user')
-            self.conn = swift.Connection(authurl=CONF.backup_swift_url,
-                                         user=CONF.backup_swift_user,
-                                         key=CONF.backup_swift_key,
-                                         retries=self.swift_attempts,
-                                         starting_backoff=self.swift_backoff)
-        else:
-            self.conn = swift.Connection(retries=self.swift_attempts,
-                                         preauthurl=self.swift_url,
-                                         preauthtoken=self.context.auth_token,
-                                         starting_backoff=self.swift_backoff)
+        self.conn = self._get_connection()
+
+    def _get_connection(self):
+        """Return a new Swift connection.
+
+        A swiftclient connection wraps a single HTTP connection, so every
+        green thread issuing requests concurrently needs its own.
+        """
+        if CONF.backup_swift_auth == 'single_user':
+            return swift.Connection(authurl=CONF.backup_swift_url,
+                                    user=CONF.backup_swift_user,
+                                    key=CONF.backup_swift_key,
+                                    retries=self.swift_attempts,
+                                    starting_backoff=self.swift_backoff)
+        return swift.Connection(retries=self.swift_attempts,
+                                preauthurl=self.swift_url,
+                                preauthtoken=self.context.auth_token,
+                                starting_backoff=self.swift_backoff)
+
+    def _get_connection_pool(self, size):
+        """Return a queue holding size connections, starting with self.conn.
+
+        Callers get() a connection for the duration of one request and put()
+        it back afterwards.
+        """
+        pool = queue.LightQueue()
+        pool.put(self.conn)
+        for _i in range(size - 1):
+            pool.put(self._get_connection())
+        return pool
 
     def _create_container(self, context, backup):
         backup_id = backup['id']
@@ -246,43 +363,95 @@ class SwiftBackupDriver(BackupDriver):
                       'availability_zone': availability_zone,
                   })
         object_meta = {'id': 1, 'list': [], 'prefix': object_prefix,
-                       'volume_meta': None}
+                       'volume_meta': None,
+                       'parent_objects': self._get_parent_objects(backup)}
         return object_meta, container
 
-    def _backup_chunk(self, backup, container, data, data_offset, object_meta):
-        """Backup data chunk based on the object metadata and offset."""
-        object_prefix = object_meta['prefix']
-        object_list = object_meta['list']
+    def _get_parent_objects(self, backup):
+        """Return the fingerprinted objects of the parent backup by offset.
+
+        Each value is an (object_name, entry) tuple where entry records the
+        container holding the object.
+        """
+        parent_id = backup.get('parent_id')
+        if not parent_id:
+            return {}
+        parent = self.db.backup_get(self.context, parent_id)
+        try:
+            metadata = self._read_metadata(parent)
+        except socket.error as err:
+            raise exception.SwiftConnectionFailed(reason=err)
+        parent_objects = {}
+        for metadata_object in metadata['objects']:
+            for object_name, entry in metadata_object.items():
+                if 'sha256' not in entry:
+                    continue
+                entry = dict(entry)
+                entry.setdefault('container', parent['container'])
+                parent_objects[entry['offset']] = (object_name, entry)
+        if not parent_objects:
+            LOG.info(_('Parent backup %s has no chunk fingerprints, '
+                       'backing up all data') % parent_id)
+        return parent_objects
+
+    @staticmethod
+    def _fingerprint(data):
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def _is_zero_chunk(data):
+        # Most chunks with data are rejected by looking at their first page.
+        head = data[:4096]
+        return (head.count('\0') == len(head) and
+                data.count('\0') == len(data))
+
+    def _get_unchanged_chunk(self, data, data_offset, object_meta):
+        """Check whether a chunk can be recorded without uploading it.
+
+        That is the case for chunks that only contain zeros and for chunks
+        identical to the chunk at the same offset of the parent backup.
+        Returns a tuple of the metadata entry to record (None when the chunk
+        has to be uploaded) and the fingerprint of the chunk, if computed.
+        """
+        if self._is_zero_chunk(data):
+            LOG.debug('chunk at offset %d only contains zeros' % data_offset)
+            return ({self.ZERO_EXTENT: {'offset': data_offset,
+                                        'length': len(data)}}, None)
+        parent_object = object_meta['parent_objects'].get(data_offset)
+        if parent_object is None:
+            return None, None
+        object_name, entry = parent_object
+        fingerprint = self._fingerprint(data)
+        if entry['length'] != len(data) or entry['sha256'] != fingerprint:
+            return None, fingerprint
+        LOG.debug('chunk at offset %(offset)d is unchanged, reusing '
+                  '%(object_name)s' %
+                  {'offset': data_offset, 'object_name': object_name})
+        return {object_name: dict(entry)}, fingerprint
+
+    def _next_object_name(self, object_meta):
+        """Reserve the next object name of the backup."""
         object_id = object_meta['id']
-        object_name = '%s-%05d' % (object_prefix, object_id)
+        object_meta['id'] = object_id + 1
+        return '%s-%05d' % (object_meta['prefix'], object_id)
+
+    def _write_chunk(self, conn, container, object_name, data, data_offset,
+                     fingerprint=None):
+        """Compress and upload one chunk, returning its metadata entry."""
         obj = {}
         obj[object_name] = {}
         obj[object_name]['offset'] = data_offset
         obj[object_name]['length'] = len(data)
+        obj[object_name]['sha256'] = fingerprint or self._fingerprint(data)
         LOG.debug('reading chunk of data from volume')
-        if self.compressor is not None:
-            algorithm = CONF.backup_compression_algorithm.lower()
-            obj[object_name]['compression'] = algorithm
-            data_size_bytes = len(data)
-            data = self.compressor.compress(data)
-            comp_size_bytes = len(data)
-            LOG.debug('compressed %(data_size_bytes)d bytes of data '
-                      'to %(comp_size_bytes)d bytes using '
-                      '%(algorithm)s' %
-                      {
-                          'data_size_bytes': data_size_bytes,
-                          'comp_size_bytes': comp_size_bytes,
-                          'algorithm': algorithm,
-                      })
-        else:
-            LOG.debug('not compressing data')
-            obj[object_name]['compression'] = 'none'
+        algorithm, data = self._compress_chunk(data)
+        obj[object_name]['compression'] = algorithm
 
         reader = six.StringIO(data)
         LOG.debug('About to put_object')
         try:
-            etag = self.conn.put_object(container, object_name, reader,
-                                        content_length=len(data))
+            etag = conn.put_object(container, object_name, reader,
+                                   content_length=len(data))
         except socket.error as err:
             raise exception.SwiftConnectionFailed(reason=err)
         LOG.debug('swift MD5 for %(object_name)s: %(etag)s' %
@@ -296,13 +465,124 @@ class SwiftBackupDriver(BackupDriver):
                     'swift %(etag)s is not the same as MD5 of object sent '
                     'to swift %(md5)s') % {'etag': etag, 'md5': md5}
             raise exception.InvalidBackup(reason=err)
-        object_list.append(obj)
-        object_id += 1
-        object_meta['list'] = object_list
-        object_meta['id'] = object_id
+        return obj
+
+    def _run_compressor(self, func, data):
+        """Run a compress or decompress function on data.
+
+        The function runs in a native thread if compression threads are
+        enabled, so that chunks are compressed in parallel.
+        """
+        if self.compression_threads is None:
+            return func(data)
+        with self.compression_threads:
+            return tpool.execute(func, data)
+
+    def _is_compressible(self, data):
+        """Check whether a sample of the chunk compresses well enough."""
+        sample_bytes = COMPRESSION_SAMPLE_SLICES * COMPRESSION_SAMPLE_SIZE
+        if len(data) <= sample_bytes:
+            # Not worth sampling, the chunk itself is checked once compressed
+            return True
+        step = len(data) // COMPRESSION_SAMPLE_SLICES
+        sample = ''.join(data[i * step:i * step + COMPRESSION_SAMPLE_SIZE]
+                         for i in range(COMPRESSION_SAMPLE_SLICES))
+        compressed = self._run_compressor(self.compressor.compress, sample)
+        ratio = float(len(compressed)) / len(sample)
+        LOG.debug('compression ratio of chunk sample is %.2f' % ratio)
+        return ratio <= CONF.backup_compression_max_ratio
+
+    def _compress_chunk(self, data):
+        """Compress a chunk, returning the algorithm used and the data.
+
+        In adaptive mode, chunks that do not compress well enough are stored
+        as they are, the per-chunk compression field lets restore mix both.
+        """
+        if self.compressor is None:
+            LOG.debug('not compressing data')
+            return 'none', data
+        if self.compression_adaptive and not self._is_compressible(data):
+            LOG.debug('chunk does not compress, storing it uncompressed')
+            return 'none', data
+
+        algorithm = CONF.backup_compression_algorithm.lower()
+        compressed = self._run_compressor(self.compressor.compress, data)
+        LOG.debug('compressed %(data_size_bytes)d bytes of data '
+                  'to %(comp_size_bytes)d bytes using '
+                  '%(algorithm)s' %
+                  {
+                      'data_size_bytes': len(data),
+                      'comp_size_bytes': len(compressed),
+                      'algorithm': algorithm,
+                  })
+        if self.compression_adaptive and len(compressed) >= len(data):
+            LOG.debug('chunk does not compress, storing it uncompressed')
+            return 'none', data
+        return algorithm, compressed
+
+    def _backup_chunk(self, backup, container, data, data_offset, object_meta):
+        """Backup data chunk based on the object metadata and offset."""
+        obj, fingerprint = self._get_unchanged_chunk(data, data_offset,
+                                                     object_meta)
+        if obj is None:
+            object_name = self._next_object_name(object_meta)
+            obj = self._write_chunk(self.conn, container, object_name, data,
+                                    data_offset, fingerprint)
+        object_meta['list'].append(obj)
         LOG.debug('Calling eventlet.sleep(0)')
         eventlet.sleep(0)
 
+    def _backup_chunks_pipelined(self, backup, container, volume_file,
+                                 object_meta):
+        """Read, compress and upload chunks with several uploads in flight.
+
+        The volume is read in the calling thread while up to
+        upload_concurrency chunks are compressed and uploaded by a pool of
+        green threads, each using its own Swift connection. Spawning blocks
+        while the pool is full, which bounds the memory used to
+        upload_concurrency + 1 chunks. Object entries are added to
+        object_meta in chunk order once every upload has completed.
+        """
+        pool = greenpool.GreenPool(self.upload_concurrency)
+        conns = self._get_connection_pool(self.upload_concurrency)
+        results = {}
+        failures = []
+
+        def _upload(index, object_name, data, data_offset, fingerprint):
+            if failures:
+                return
+            conn = conns.get()
+            try:
+                results[index] = self._write_chunk(conn, container,
+                                                   object_name, data,
+                                                   data_offset, fingerprint)
+            except Exception:
+                failures.append(sys.exc_info())
+            finally:
+                conns.put(conn)
+
+        index = 0
+        while not failures:
+            data = volume_file.read(self.data_block_size_bytes)
+            data_offset = volume_file.tell()
+            if data == '':
+                break
+            obj, fingerprint = self._get_unchanged_chunk(data, data_offset,
+                                                         object_meta)
+            if obj is not None:
+                results[index] = obj
+            else:
+                object_name = self._next_object_name(object_meta)
+                pool.spawn_n(_upload, index, object_name, data, data_offset,
+                             fingerprint)
+            index += 1
+            eventlet.sleep(0)
+        pool.waitall()
+
+        if failures:
+            six.reraise(*failures[0])
+        object_meta['list'].extend(results[i] for i in range(index))
+
     def _finalize_backup(self, backup, container, object_meta):
         """Finalize the backup by updating its metadata on Swift."""
         object_list = object_meta['list']
@@ -339,13 +619,17 @@ class SwiftBackupDriver(BackupDriver):
         """Backup the given volume to Swift."""
 
         object_meta, container = self._prepare_backup(backup)
-        while True:
-            data = volume_file.read(self.data_block_size_bytes)
-            data_offset = volume_file.tell()
-            if data == '':
-                break
-            self._backup_chunk(backup, container, data,
-                               data_offset, object_meta)
+        if self.upload_concurrency > 1:
+            self._backup_chunks_pipelined(backup, container, volume_file,
+                                          object_meta)
+        else:
+            while True:
+                data = volume_file.read(self.data_block_size_bytes)
+                data_offset = volume_file.tell()
+                if data == '':
+                    break
+                self._backup_chunk(backup, container, data,
+                                   data_offset, object_meta)
 
         if backup_metadata:
             try:
@@ -359,14 +643,62 @@ class SwiftBackupDriver(BackupDriver):
 
         self._finalize_backup(backup, container, object_meta)
 
-    def _restore_v1(self, backup, volume_id, metadata, volume_file):
-        """Restore a v1 swift volume backup from swift."""
+    def _get_object(self, conn, container, object_name):
+        try:
+            (resp, body) = conn.get_object(container, object_name)
+        except socket.error as err:
+            raise exception.SwiftConnectionFailed(reason=err)
+        return body
+
+    def _iter_object_bodies(self, objects):
+        """Yield the body of each (container, object_name), in order.
+
+        With restore_prefetch enabled, downloads of the following
+        restore_prefetch objects run in green threads while the caller
+        writes the current one to the volume.
+        """
+        if not self.restore_prefetch:
+            for container, object_name in objects:
+                yield self._get_object(self.conn, container, object_name)
+            return
+
+        conns = self._get_connection_pool(self.restore_prefetch + 1)
+
+        def _fetch(container, object_name):
+            conn = conns.get()
+            try:
+                return self._get_object(conn, container, object_name)
+            finally:
+                conns.put(conn)
+
+        objects = iter(objects)
+        pending = collections.deque(
+            eventlet.spawn(_fetch, *obj) for obj in
+            itertools.islice(objects, self.restore_prefetch + 1))
+        try:
+            while pending:
+                body = pending.popleft().wait()
+                for obj in itertools.islice(objects, 1):
+                    pending.append(eventlet.spawn(_fetch, *obj))
+                yield body
+        finally:
+            for thread in pending:
+                thread.kill()
+
+    def _restore_objects(self, backup, volume_id, metadata, volume_file):
+        """Write the objects listed in the backup metadata to the volume.
+
+        Entries that carry a container refer to objects of a parent backup;
+        all other objects must be stored under the prefix of this backup.
+        """
         backup_id = backup['id']
-        LOG.debug('v1 swift volume backup restore of %s started', backup_id)
         container = backup['container']
         metadata_objects = metadata['objects']
-        metadata_object_names = sum((obj.keys() for obj in metadata_objects),
-                                    [])
+        metadata_object_names = [object_name
+                                 for obj in metadata_objects
+                                 for object_name, entry in obj.items()
+                                 if 'container' not in entry and
+                                 object_name != self.ZERO_EXTENT]
         LOG.debug('metadata_object_names = %s' % metadata_object_names)
         prune_list = [self._metadata_filename(backup)]
         swift_object_names = [swift_object_name for swift_object_name in
@@ -377,50 +709,102 @@ class SwiftBackupDriver(BackupDriver):
                     'swift does not match object list stored in metadata')
             raise exception.InvalidBackup(reason=err)
 
+        objects = []
         for metadata_object in metadata_objects:
             object_name = metadata_object.keys()[0]
-            LOG.debug('restoring object from swift. backup: %(backup_id)s, '
-                      'container: %(container)s, swift object name: '
-                      '%(object_name)s, volume: %(volume_id)s' %
-                      {
-                          'backup_id': backup_id,
-                          'container': container,
-                          'object_name': object_name,
-                          'volume_id': volume_id,
-                      })
-            try:
-                (resp, body) = self.conn.get_object(container, object_name)
-            except socket.error as err:
-                raise exception.SwiftConnectionFailed(reason=err)
-            compression_algorithm = metadata_object[object_name]['compression']
-            decompressor = self._get_compressor(compression_algorithm)
-            if decompressor is not None:
-                LOG.debug('decompressing data using %s algorithm' %
-                          compression_algorithm)
-                decompressed = decompressor.decompress(body)
-                volume_file.write(decompressed)
-            else:
-                volume_file.write(body)
+            if object_name == self.ZERO_EXTENT:
+                continue
+            object_container = metadata_object[object_name].get('container',
+                                                                container)
+            objects.append((object_container, object_name))
+
+        bodies = self._iter_object_bodies(objects)
+        objects = iter(objects)
+        try:
+            for metadata_object in metadata_objects:
+                object_name = metadata_object.keys()[0]
+                if object_name == self.ZERO_EXTENT:
+                    self._restore_zero_extent(
+                        volume_file, metadata_object[object_name]['length'])
+                    eventlet.sleep(0)
+                    continue
+                object_container = next(objects)[0]
+                LOG.debug('restoring object from swift. backup: '
+                          '%(backup_id)s, container: %(container)s, swift '
+                          'object name: %(object_name)s, volume: '
+                          '%(volume_id)s' %
+                          {
+                              'backup_id': backup_id,
+                              'container': object_container,
+                              'object_name': object_name,
+                              'volume_id': volume_id,
+                          })
+                body = next(bodies)
+                compression_algorithm = \
+                    metadata_object[object_name]['compression']
+                decompressor = self._get_compressor(compression_algorithm)
+                if decompressor is not None:
+                    LOG.debug('decompressing data using %s algorithm' %
+                              compression_algorithm)
+                    decompressed = self._run_compressor(
+                        decompressor.decompress, body)
+                    volume_file.write(decompressed)
+                else:
+                    volume_file.write(body)
 
-            # force flush every write to avoid long blocking write on close
-            volume_file.flush()
+                # force flush every write to avoid long blocking write on
+                # close
+                volume_file.flush()
 
-            # Be tolerant to IO implementations that do not support fileno()
-            try:
-                fileno = volume_file.fileno()
-            except IOError:
-                LOG.info("volume_file does not support fileno() so skipping "
-                         "fsync()")
-            else:
-                os.fsync(fileno)
+                # Be tolerant to IO implementations that do not support
+                # fileno()
+                try:
+                    fileno = volume_file.fileno()
+                except IOError:
+                    LOG.info("volume_file does not support fileno() so "
+                             "skipping fsync()")
+                else:
+                    os.fsync(fileno)
 
-            # Restoring a backup to a volume can take some time. Yield so other
-            # threads can run, allowing for among other things the service
-            # status to be updated
-            eventlet.sleep(0)
+                # Restoring a backup to a volume can take some time. Yield so
+                # other threads can run, allowing for among other things the
+                # service status to be updated
+                eventlet.sleep(0)
+        finally:
+            bodies.close()
+
+    def _restore_zero_extent(self, volume_file, length):
+        """Advance volume_file over length bytes that must read as zeros."""
+        LOG.debug('restoring zero extent of %d bytes' % length)
+        volume_file.flush()
+        offset = volume_file.tell()
+        # Be tolerant to IO implementations that do not support fileno()
+        try:
+            fileno = volume_file.fileno()
+        except IOError:
+            fileno = None
+        if fileno is not None and utils.zero_file_range(fileno, offset,
+                                                        length):
+            volume_file.seek(offset + length)
+        else:
+            volume_file.write('\0' * length)
+
+    def _restore_v1(self, backup, volume_id, metadata, volume_file):
+        """Restore a v1 swift volume backup from swift."""
+        backup_id = backup['id']
+        LOG.debug('v1 swift volume backup restore of %s started', backup_id)
+        self._restore_objects(backup, volume_id, metadata, volume_file)
         LOG.debug('v1 swift volume backup restore of %s finished',
                   backup_id)
 
+    def _restore_v2(self, backup, volume_id, metadata, volume_file):
+        """Restore a v2 swift volume backup, which may be incremental."""
+        backup_id = backup['id']
+        LOG.debug('v2 swift volume backup restore of %s started', backup_id)
+        self._restore_objects(backup, volume_id, metadata, volume_file)
+        LOG.debug('v2 swift volume backup restore of %s finished',
+                  backup_id)
+
     def restore(self, backup, volume_id, volume_file):
         """Restore the given volume backup from swift."""
         backup_id = backup['id']
@@ -30,12 +30,20 @@ Volume backups can be created, restored, deleted and listed.
 :backup_manager:  The module name of a class derived from
                           :class:`manager.Manager` (default:
                           :class:`cinder.backup.manager.Manager`).
+:backup_max_concurrent_operations:  The number of backups and restores
+                                    running at once on this host
+                                    (default: 0, no limit).
+:backup_max_concurrent_operations_per_backend:  The number of backups and
+                                                restores running at once per
+                                                volume backend (default: 0,
+                                                no limit).
 
 """
 
 from oslo.config import cfg
 from oslo import messaging
 
+from cinder.backup import admission
 from cinder.backup import rpcapi as backup_rpcapi
 from cinder import context
 from cinder import exception
@@ -44,6 +52,8 @@ from cinder.openstack.common import excutils
 from cinder.openstack.common.gettextutils import _
 from cinder.openstack.common import importutils
 from cinder.openstack.common import log as logging
+from cinder.openstack.common import periodic_task
+from cinder.openstack.common import units
 from cinder import utils
 
 LOG = logging.getLogger(__name__)
@@ -53,6 +63,16 @@ backup_manager_opts = [
                default='cinder.backup.drivers.swift',
                help='Driver to use for backups.',
                deprecated_name='backup_service'),
+    cfg.IntOpt('backup_max_concurrent_operations',
+               default=0,
+               help='The maximum number of backup and restore operations '
+                    'running at the same time on this host. Further '
+                    'operations wait in a queue (0 for no limit)'),
+    cfg.IntOpt('backup_max_concurrent_operations_per_backend',
+               default=0,
+               help='The maximum number of backup and restore operations '
+                    'running at the same time on a volume backend (0 for '
+                    'no limit)'),
 ]
 
 # This map doesn't need to be extended in the future since it's only
@@ -77,6 +97,9 @@ class BackupManager(manager.SchedulerDependentManager):
         self.volume_managers = {}
         self._setup_volume_drivers()
         self.backup_rpcapi = backup_rpcapi.BackupAPI()
+        self.admission = admission.AdmissionQueue(
+            CONF.backup_max_concurrent_operations,
+            CONF.backup_max_concurrent_operations_per_backend)
         super(BackupManager, self).__init__(service_name='backup',
                                             *args, **kwargs)
 
@@ -270,8 +293,10 @@ class BackupManager(manager.SchedulerDependentManager):
             utils.require_driver_initialized(self.driver)
 
             backup_service = self.service.get_backup_driver(context)
-            self._get_driver(backend).backup_volume(context, backup,
-                                                    backup_service)
+            with self.admission.admit(backend, backup['project_id'],
+                                      volume['size'] * units.Gi):
+                self._get_driver(backend).backup_volume(context, backup,
+                                                        backup_service)
         except Exception as err:
             with excutils.save_and_reraise_exception():
                 self.db.volume_update(context, volume_id,
@@ -352,9 +377,11 @@ class BackupManager(manager.SchedulerDependentManager):
             utils.require_driver_initialized(self.driver)
 
             backup_service = self.service.get_backup_driver(context)
-            self._get_driver(backend).restore_backup(context, backup,
-                                                     volume,
-                                                     backup_service)
+            with self.admission.admit(backend, backup['project_id'],
+                                      backup['size'] * units.Gi):
+                self._get_driver(backend).restore_backup(context, backup,
+                                                         volume,
+                                                         backup_service)
         except Exception:
             with excutils.save_and_reraise_exception():
                 self.db.volume_update(context, volume_id,
@@ -575,3 +602,17 @@ class BackupManager(manager.SchedulerDependentManager):
 
             LOG.info(_('Import record id %s metadata from driver '
                        'finished.') % backup_id)
+
+    @periodic_task.periodic_task
+    def _report_backup_queue(self, context):
+        """Log the state of the backup and restore admission queue."""
+        stats = self.admission.stats()
+        if not (stats['running'] or stats['queue_depth']):
+            return
+        LOG.info(_('Backup operations running: %(running)d '
+                   '(%(running_bytes)d bytes), queued: %(queue_depth)d '
+                   '(%(waiting_bytes)d bytes).') % stats)
+        for backend, backend_stats in stats['backends'].items():
+            LOG.debug('Backup operations on backend %(backend)s: '
+                      '%(stats)s' % {'backend': backend,
+                                     'stats': backend_stats})
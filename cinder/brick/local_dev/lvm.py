@@ -17,6 +17,7 @@
 LVM class for performing LVM operations.
 """
 
+import functools
 import math
 import re
 
@@ -27,16 +28,32 @@ from cinder.brick import executor
 from cinder.openstack.common.gettextutils import _
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import processutils as putils
+from cinder.openstack.common import timeutils
 
 LOG = logging.getLogger(__name__)
 
 
+def _invalidates_inventory(f):
+    """Decorator dropping the cached inventory after an LVM change.
+
+    The cache is dropped whether or not the command succeeded, since a
+    failed command may still have changed the VG.
+    """
+    @functools.wraps(f)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return f(self, *args, **kwargs)
+        finally:
+            self.invalidate_inventory()
+    return wrapper
+
+
 class LVM(executor.Executor):
     """LVM object to enable various LVM related operations."""
 
     def __init__(self, vg_name, root_helper, create_vg=False,
                  physical_volumes=None, lvm_type='default',
-                 executor=putils.execute):
+                 executor=putils.execute, inventory_ttl=0):
 
         """Initialize the LVM object.
 
@@ -50,6 +67,8 @@ class LVM(executor.Executor):
         :param physical_volumes: List of PVs to build VG on
         :param lvm_type: VG and Volume type (default, or thin)
         :param executor: Execute method to use, None uses common/processutils
+        :param inventory_ttl: Seconds to serve LV, PV and VG information
+                              from memory, 0 disables the cache
 
         """
         super(LVM, self).__init__(execute=executor, root_helper=root_helper)
@@ -65,6 +84,12 @@ class LVM(executor.Executor):
         self.vg_thin_pool_free_space = 0.0
         self._supports_snapshot_lv_activation = None
         self._supports_lvchange_ignoreskipactivation = None
+        self.inventory_ttl = inventory_ttl
+        self.inventory_stats = {}
+        self._lv_cache = {}
+        self._lv_list_fetched_at = None
+        self._pv_list_fetched_at = None
+        self._vg_info_fetched_at = None
 
         if create_vg and physical_volumes is not None:
             self.pv_list = physical_volumes
@@ -94,6 +119,28 @@ class LVM(executor.Executor):
             self.activate_lv(self.vg_thin_pool)
         self.pv_list = self.get_all_physical_volumes(root_helper, vg_name)
 
+    def invalidate_inventory(self):
+        """Drop the cached LV, PV and VG information.
+
+        Called by the operations of this object that change the VG; call
+        it after changing the VG by other means.
+        """
+        self._lv_cache = {}
+        self._lv_list_fetched_at = None
+        self._pv_list_fetched_at = None
+        self._vg_info_fetched_at = None
+
+    def _inventory_fresh(self, fetched_at):
+        if self.inventory_ttl <= 0 or fetched_at is None:
+            return False
+        return not timeutils.is_older_than(fetched_at, self.inventory_ttl)
+
+    def _count_inventory_call(self, operation, cached):
+        """Record whether ``operation`` ran a command or used the cache."""
+        stats = self.inventory_stats.setdefault(operation,
+                                                {'executed': 0, 'saved': 0})
+        stats['saved' if cached else 'executed'] += 1
+
     def _vg_exists(self):
         """Simple check to see if VG exists.
 
@@ -233,11 +280,13 @@ class LVM(executor.Executor):
         return self._supports_lvchange_ignoreskipactivation
 
     @staticmethod
-    def get_all_volumes(root_helper, vg_name=None):
+    def get_all_volumes(root_helper, vg_name=None, lv_name=None):
         """Static method to get all LV's on a system.
 
         :param root_helper: root_helper to use for execute
         :param vg_name: optional, gathers info for only the specified VG
+        :param lv_name: optional, gathers info for only the specified LV
+                        of vg_name
         :returns: List of Dictionaries with LV info
 
         """
@@ -245,7 +294,9 @@ class LVM(executor.Executor):
         cmd = ['env', 'LC_ALL=C', 'lvs', '--noheadings', '--unit=g',
                '-o', 'vg_name,name,size', '--nosuffix']
 
-        if vg_name is not None:
+        if vg_name is not None and lv_name is not None:
+            cmd.append('%s/%s' % (vg_name, lv_name))
+        elif vg_name is not None:
             cmd.append(vg_name)
 
         (out, err) = putils.execute(*cmd,
@@ -266,18 +317,55 @@ class LVM(executor.Executor):
         :returns: List of Dictionaries with LV info
 
         """
+        if self._inventory_fresh(self._lv_list_fetched_at):
+            self._count_inventory_call('get_volumes', True)
+            return self.lv_list
+
+        self._count_inventory_call('get_volumes', False)
         self.lv_list = self.get_all_volumes(self._root_helper, self.vg_name)
+        now = timeutils.utcnow()
+        self._lv_list_fetched_at = now
+        self._lv_cache = dict((lv['name'], (lv, now)) for lv in self.lv_list)
         return self.lv_list
 
     def get_volume(self, name):
         """Get reference object of volume specified by name.
 
+        Only the named LV is queried, unless the cache has a fresh entry
+        for it or a fresh listing of the whole VG.
+
         :returns: dict representation of Logical Volume if exists
 
         """
-        ref_list = self.get_volumes()
+        if self._inventory_fresh(self._lv_list_fetched_at):
+            self._count_inventory_call('get_volume', True)
+            entry = self._lv_cache.get(name)
+            return entry[0] if entry else None
+
+        entry = self._lv_cache.get(name)
+        if entry and self._inventory_fresh(entry[1]):
+            self._count_inventory_call('get_volume', True)
+            return entry[0]
+
+        self._count_inventory_call('get_volume', False)
+        try:
+            ref_list = self.get_all_volumes(self._root_helper, self.vg_name,
+                                            name)
+        except putils.ProcessExecutionError as err:
+            # NOTE: lvs fails when the named LV does not exist; the message
+            # differs between LVM versions.
+            if 'not found' in err.stderr or 'Failed to find' in err.stderr:
+                LOG.debug('LV %(vg)s/%(lv)s not found' %
+                          {'vg': self.vg_name, 'lv': name})
+                return None
+            LOG.debug('Unable to query LV %(vg)s/%(lv)s: %(err)s, listing '
+                      'the VG instead' %
+                      {'vg': self.vg_name, 'lv': name, 'err': err.stderr})
+            ref_list = self.get_volumes()
+
         for r in ref_list:
             if r['name'] == name:
+                self._lv_cache[name] = (r, timeutils.utcnow())
                 return r
 
     @staticmethod
@@ -318,8 +406,14 @@ class LVM(executor.Executor):
         :returns: List of Dictionaries with PV info
 
         """
+        if self._inventory_fresh(self._pv_list_fetched_at):
+            self._count_inventory_call('get_physical_volumes', True)
+            return self.pv_list
+
+        self._count_inventory_call('get_physical_volumes', False)
         self.pv_list = self.get_all_physical_volumes(self._root_helper,
                                                      self.vg_name)
+        self._pv_list_fetched_at = timeutils.utcnow()
         return self.pv_list
 
     @staticmethod
@@ -364,6 +458,11 @@ class LVM(executor.Executor):
         :returns: Dictionaries of VG info
 
         """
+        if self._inventory_fresh(self._vg_info_fetched_at):
+            self._count_inventory_call('update_volume_group_info', True)
+            return
+
+        self._count_inventory_call('update_volume_group_info', False)
         vg_list = self.get_all_volume_groups(self._root_helper, self.vg_name)
 
         if len(vg_list) != 1:
@@ -376,12 +475,14 @@ class LVM(executor.Executor):
         self.vg_uuid = vg_list[0]['uuid']
 
         if self.vg_thin_pool is not None:
-            for lv in self.get_all_volumes(self._root_helper, self.vg_name):
-                if lv['name'] == self.vg_thin_pool:
-                    self.vg_thin_pool_size = lv['size']
-                    tpfs = self._get_thin_pool_free_space(self.vg_name,
-                                                          self.vg_thin_pool)
-                    self.vg_thin_pool_free_space = tpfs
+            lv = self.get_volume(self.vg_thin_pool)
+            if lv is not None:
+                self.vg_thin_pool_size = lv['size']
+                tpfs = self._get_thin_pool_free_space(self.vg_name,
+                                                      self.vg_thin_pool)
+                self.vg_thin_pool_free_space = tpfs
+
+        self._vg_info_fetched_at = timeutils.utcnow()
 
     def _calculate_thin_pool_size(self):
         """Calculates the correct size for a thin pool.
@@ -398,11 +499,13 @@ class LVM(executor.Executor):
         """
 
         # make sure volume group information is current
+        self.invalidate_inventory()
         self.update_volume_group_info()
 
         # leave 5% free for metadata
         return "%sg" % (self.vg_free_space * 0.95)
 
+    @_invalidates_inventory
     def create_thin_pool(self, name=None, size_str=None):
         """Creates a thin provisioning pool for this VG.
 
@@ -443,6 +546,7 @@ class LVM(executor.Executor):
         self.vg_thin_pool = name
         return size_str
 
+    @_invalidates_inventory
     def create_volume(self, name, size_str, lv_type='default', mirror_count=0):
         """Creates a logical volume on the object's VG.
 
@@ -480,6 +584,7 @@ class LVM(executor.Executor):
             LOG.error(_('StdErr  :%s') % err.stderr)
             raise
 
+    @_invalidates_inventory
     def create_lv_snapshot(self, name, source_lv_name, lv_type='default'):
         """Creates a snapshot of a logical volume.
 
@@ -553,6 +658,7 @@ class LVM(executor.Executor):
             LOG.error(_('StdErr  :%s') % err.stderr)
             raise
 
+    @_invalidates_inventory
     def delete(self, name):
         """Delete logical volume or snapshot.
 
@@ -598,6 +704,7 @@ class LVM(executor.Executor):
                 '%s/%s' % (self.vg_name, name),
                 root_helper=self._root_helper, run_as_root=True)
 
+    @_invalidates_inventory
     def revert(self, snapshot_name):
         """Revert an LV from snapshot.
 
@@ -619,6 +726,7 @@ class LVM(executor.Executor):
                 return True
         return False
 
+    @_invalidates_inventory
     def extend_volume(self, lv_name, new_size):
         """Extend the size of an existing volume."""
 
@@ -658,6 +766,7 @@ class LVM(executor.Executor):
     def vg_mirror_size(self, mirror_count):
         return (self.vg_free_space / (mirror_count + 1))
 
+    @_invalidates_inventory
     def rename_volume(self, lv_name, new_name):
         """Change the name of an existing volume."""
 
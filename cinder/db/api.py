@@ -211,10 +211,11 @@ def volume_get(context, volume_id):
 
 
 def volume_get_all(context, marker, limit, sort_key, sort_dir,
-                   filters=None):
+                   filters=None, offset=None, columns=None):
     """Get all volumes."""
     return IMPL.volume_get_all(context, marker, limit, sort_key, sort_dir,
-                               filters=filters)
+                               filters=filters, offset=offset,
+                               columns=columns)
 
 
 def volume_get_all_by_host(context, host):
@@ -223,10 +224,12 @@ def volume_get_all_by_host(context, host):
 
 
 def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
-                              sort_dir, filters=None):
+                              sort_dir, filters=None, offset=None,
+                              columns=None):
     """Get all volumes belonging to a project."""
     return IMPL.volume_get_all_by_project(context, project_id, marker, limit,
-                                          sort_key, sort_dir, filters=filters)
+                                          sort_key, sort_dir, filters=filters,
+                                          offset=offset, columns=columns)
 
 
 def volume_get_iscsi_target_num(context, volume_id):
@@ -243,6 +246,15 @@ def volume_update(context, volume_id, values):
     return IMPL.volume_update(context, volume_id, values)
 
 
+def volume_update_all_by_ids(context, volume_ids, values):
+    """Set the given properties on many volumes in one update.
+
+    Returns the number of volumes updated.
+
+    """
+    return IMPL.volume_update_all_by_ids(context, volume_ids, values)
+
+
 ####################
 
 
@@ -261,14 +273,18 @@ def snapshot_get(context, snapshot_id):
     return IMPL.snapshot_get(context, snapshot_id)
 
 
-def snapshot_get_all(context):
-    """Get all snapshots."""
-    return IMPL.snapshot_get_all(context)
+def snapshot_get_all(context, filters=None, limit=None, offset=None):
+    """Get all snapshots, optionally filtered and paged."""
+    return IMPL.snapshot_get_all(context, filters=filters, limit=limit,
+                                 offset=offset)
 
 
-def snapshot_get_all_by_project(context, project_id):
+def snapshot_get_all_by_project(context, project_id, filters=None,
+                                limit=None, offset=None):
     """Get all snapshots belonging to a project."""
-    return IMPL.snapshot_get_all_by_project(context, project_id)
+    return IMPL.snapshot_get_all_by_project(context, project_id,
+                                            filters=filters, limit=limit,
+                                            offset=offset)
 
 
 def snapshot_get_all_for_volume(context, volume_id):
@@ -547,6 +563,12 @@ def volume_glance_metadata_create(context, volume_id, key, value):
                                               value)
 
 
+def volume_glance_metadata_bulk_create(context, volume_id, metadata):
+    """Add Glance metadata for specified volume (multiple pairs)."""
+    return IMPL.volume_glance_metadata_bulk_create(context, volume_id,
+                                                   metadata)
+
+
 def volume_glance_metadata_get_all(context):
     """Return the glance metadata for all volumes."""
     return IMPL.volume_glance_metadata_get_all(context)
@@ -727,9 +749,10 @@ def backup_get(context, backup_id):
     return IMPL.backup_get(context, backup_id)
 
 
-def backup_get_all(context, filters=None):
-    """Get all backups."""
-    return IMPL.backup_get_all(context, filters=filters)
+def backup_get_all(context, filters=None, limit=None, offset=None):
+    """Get all backups, optionally filtered and paged."""
+    return IMPL.backup_get_all(context, filters=filters, limit=limit,
+                               offset=offset)
 
 
 def backup_get_all_by_host(context, host):
@@ -742,10 +765,12 @@ def backup_create(context, values):
     return IMPL.backup_create(context, values)
 
 
-def backup_get_all_by_project(context, project_id, filters=None):
+def backup_get_all_by_project(context, project_id, filters=None,
+                              limit=None, offset=None):
     """Get all backups belonging to a project."""
     return IMPL.backup_get_all_by_project(context, project_id,
-                                          filters=filters)
+                                          filters=filters, limit=limit,
+                                          offset=offset)
 
 
 def backup_update(context, backup_id, values):
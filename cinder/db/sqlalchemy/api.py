@@ -19,8 +19,10 @@
 """Implementation of SQLAlchemy backend."""
 
 
+import functools
 import sys
 import threading
+import time
 import uuid
 import warnings
 
@@ -75,6 +77,7 @@ def get_session(**kwargs):
     return facade.get_session(**kwargs)
 
 _DEFAULT_QUOTA_NAME = 'default'
+_DEADLOCK_RETRIES = 5
 
 
 def get_backend():
@@ -190,6 +193,25 @@ def require_snapshot_exists(f):
     return wrapper
 
 
+def _retry_on_deadlock(f):
+    """Decorator to retry a DB API call if Deadlock was received."""
+    @functools.wraps(f)
+    def wrapped(*args, **kwargs):
+        attempt = 1
+        while True:
+            try:
+                return f(*args, **kwargs)
+            except db_exc.DBDeadlock:
+                if attempt >= _DEADLOCK_RETRIES:
+                    raise
+                LOG.warn(_("Deadlock detected when running "
+                           "'%(func_name)s': Retrying..."),
+                         {'func_name': f.__name__})
+                time.sleep(0.1 * attempt)
+                attempt += 1
+    return wrapped
+
+
 def model_query(context, *args, **kwargs):
     """Query helper that accounts for context's `read_deleted` field.
 
@@ -689,28 +711,99 @@ def _reservation_create(context, uuid, usage, project_id, resource, delta,
 # code always acquires the lock on quota_usages before acquiring the lock
 # on reservations.
 
-def _get_quota_usages(context, session, project_id):
+def _get_quota_usages(context, session, project_id, resources=None):
     # Broken out for testability
-    rows = model_query(context, models.QuotaUsage,
-                       read_deleted="no",
-                       session=session).\
-        filter_by(project_id=project_id).\
+    query = model_query(context, models.QuotaUsage,
+                        read_deleted="no",
+                        session=session).\
+        filter_by(project_id=project_id)
+    if resources is not None:
+        query = query.filter(models.QuotaUsage.resource.in_(resources))
+    rows = query.order_by(models.QuotaUsage.id).\
         with_lockmode('update').\
         all()
     return dict((row.resource, row) for row in rows)
 
 
+class _ConditionalReserveFailed(Exception):
+    pass
+
+
+def _quota_reserve_conditional(context, quotas, deltas, expire, project_id):
+    """Reserve quota without locking the usage rows up front.
+
+    Each positive delta is added with an UPDATE that only matches while the
+    new total stays within the quota, so concurrent reservations of the same
+    project don't wait for each other's usage reads. Returns None if the
+    usages need to be created or refreshed, or if a delta does not fit,
+    leaving those cases to the locking path.
+    """
+    session = get_session()
+    try:
+        with session.begin():
+            usages = model_query(context, models.QuotaUsage,
+                                 read_deleted="no", session=session).\
+                filter_by(project_id=project_id).\
+                filter(models.QuotaUsage.resource.in_(deltas.keys())).\
+                all()
+            usages = dict((row.resource, row) for row in usages)
+            if (set(deltas) - set(usages) or
+                    any(usage.in_use < 0 or usage.until_refresh is not None
+                        for usage in usages.values())):
+                return None
+
+            reservations = []
+            for resource, delta in sorted(deltas.items()):
+                usage = usages[resource]
+                if delta > 0:
+                    query = model_query(context, models.QuotaUsage,
+                                        read_deleted="no",
+                                        session=session).\
+                        filter_by(id=usage.id)
+                    if quotas[resource] >= 0:
+                        query = query.filter(
+                            models.QuotaUsage.in_use +
+                            models.QuotaUsage.reserved + delta <=
+                            quotas[resource])
+                    updated = query.update(
+                        {'reserved': models.QuotaUsage.reserved + delta},
+                        synchronize_session=False)
+                    if not updated:
+                        raise _ConditionalReserveFailed()
+                elif delta < 0 and delta + usage.in_use < 0:
+                    LOG.warning(_("Change will make usage less than 0 for "
+                                  "the following resources: %s") % resource)
+
+                reservation = _reservation_create(context,
+                                                  str(uuid.uuid4()),
+                                                  usage, project_id,
+                                                  resource, delta, expire,
+                                                  session=session)
+                reservations.append(reservation.uuid)
+    except _ConditionalReserveFailed:
+        return None
+    return reservations
+
+
 @require_context
+@_retry_on_deadlock
 def quota_reserve(context, resources, quotas, deltas, expire,
                   until_refresh, max_age, project_id=None):
     elevated = context.elevated()
+    if project_id is None:
+        project_id = context.project_id
+
+    if not until_refresh and not max_age:
+        reservations = _quota_reserve_conditional(elevated, quotas, deltas,
+                                                  expire, project_id)
+        if reservations is not None:
+            return reservations
+
     session = get_session()
     with session.begin():
-        if project_id is None:
-            project_id = context.project_id
-
         # Get the current usages
-        usages = _get_quota_usages(context, session, project_id)
+        usages = _get_quota_usages(context, session, project_id,
+                                   resources=deltas.keys())
 
         # Handle usage refresh
         work = set(deltas.keys())
@@ -851,33 +944,61 @@ def _quota_reservations(session, context, reservations):
         all()
 
 
-@require_context
-def reservation_commit(context, reservations, project_id=None):
-    session = get_session()
-    with session.begin():
-        usages = _get_quota_usages(context, session, project_id)
+def _apply_reservations(context, session, reservations, commit):
+    """Commit or roll back reservations in one pass.
 
-        for reservation in _quota_reservations(session, context, reservations):
-            usage = usages[reservation.resource]
-            if reservation.delta >= 0:
-                usage.reserved -= reservation.delta
+    Only the usages the reservations refer to are locked, always before the
+    reservations themselves, and the reservations are deleted with a single
+    statement.
+    """
+    usage_ids = model_query(context, models.Reservation.usage_id,
+                            read_deleted="no", session=session).\
+        filter(models.Reservation.uuid.in_(reservations)).\
+        distinct().\
+        all()
+    if not usage_ids:
+        return
+    usages = model_query(context, models.QuotaUsage, read_deleted="no",
+                         session=session).\
+        filter(models.QuotaUsage.id.in_([row[0] for row in usage_ids])).\
+        order_by(models.QuotaUsage.id).\
+        with_lockmode('update').\
+        all()
+    usages = dict((usage.id, usage) for usage in usages)
+
+    reservation_ids = []
+    for reservation in _quota_reservations(session, context, reservations):
+        usage = usages[reservation.usage_id]
+        if reservation.delta >= 0:
+            usage.reserved -= reservation.delta
+        if commit:
             usage.in_use += reservation.delta
+        reservation_ids.append(reservation.id)
 
-            reservation.delete(session=session)
+    if reservation_ids:
+        model_query(context, models.Reservation, read_deleted="no",
+                    session=session).\
+            filter(models.Reservation.id.in_(reservation_ids)).\
+            update({'deleted': True,
+                    'deleted_at': timeutils.utcnow(),
+                    'updated_at': literal_column('updated_at')},
+                   synchronize_session=False)
 
 
 @require_context
-def reservation_rollback(context, reservations, project_id=None):
+@_retry_on_deadlock
+def reservation_commit(context, reservations, project_id=None):
     session = get_session()
     with session.begin():
-        usages = _get_quota_usages(context, session, project_id)
+        _apply_reservations(context, session, reservations, commit=True)
 
-        for reservation in _quota_reservations(session, context, reservations):
-            usage = usages[reservation.resource]
-            if reservation.delta >= 0:
-                usage.reserved -= reservation.delta
 
-            reservation.delete(session=session)
+@require_context
+@_retry_on_deadlock
+def reservation_rollback(context, reservations, project_id=None):
+    session = get_session()
+    with session.begin():
+        _apply_reservations(context, session, reservations, commit=False)
 
 
 @require_admin_context
@@ -1141,7 +1262,7 @@ def volume_get(context, volume_id):
 
 @require_admin_context
 def volume_get_all(context, marker, limit, sort_key, sort_dir,
-                   filters=None):
+                   filters=None, offset=None, columns=None):
     """Retrieves all volumes.
 
     :param context: context to query under
@@ -1154,17 +1275,22 @@ def volume_get_all(context, marker, limit, sort_key, sort_dir,
                     'no_migration_targets'=True causes volumes with either
                     a NULL 'migration_status' or a 'migration_status' that
                     does not start with 'target:' to be retrieved.
+    :param offset: number of items to skip
+    :param columns: names of the volume columns to load; when given, only
+                    those columns are queried, without joining metadata or
+                    volume types, and dicts are returned
     :returns: list of matching volumes
     """
     session = get_session()
     with session.begin():
         # Generate the query
         query = _generate_paginate_query(context, session, marker, limit,
-                                         sort_key, sort_dir, filters)
+                                         sort_key, sort_dir, filters,
+                                         offset, columns)
         # No volumes would match, return empty list
         if query == None:
             return []
-        return query.all()
+        return _volume_query_results(query, columns)
 
 
 @require_admin_context
@@ -1174,7 +1300,8 @@ def volume_get_all_by_host(context, host):
 
 @require_context
 def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
-                              sort_dir, filters=None):
+                              sort_dir, filters=None, offset=None,
+                              columns=None):
     """"Retrieves all volumes in a project.
 
     :param context: context to query under
@@ -1188,6 +1315,10 @@ def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
                     'no_migration_targets'=True causes volumes with either
                     a NULL 'migration_status' or a 'migration_status' that
                     does not start with 'target:' to be retrieved.
+    :param offset: number of items to skip
+    :param columns: names of the volume columns to load; when given, only
+                    those columns are queried, without joining metadata or
+                    volume types, and dicts are returned
     :returns: list of matching volumes
     """
     session = get_session()
@@ -1198,15 +1329,22 @@ def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
         filters['project_id'] = project_id
         # Generate the query
         query = _generate_paginate_query(context, session, marker, limit,
-                                         sort_key, sort_dir, filters)
+                                         sort_key, sort_dir, filters,
+                                         offset, columns)
         # No volumes would match, return empty list
         if query == None:
             return []
-        return query.all()
+        return _volume_query_results(query, columns)
+
+
+def _volume_query_results(query, columns=None):
+    if columns:
+        return [dict(zip(columns, row)) for row in query.all()]
+    return query.all()
 
 
 def _generate_paginate_query(context, session, marker, limit, sort_key,
-                             sort_dir, filters):
+                             sort_dir, filters, offset=None, columns=None):
     """Generate the query to include the filters and the paginate options.
 
     Returns a query with sorting / pagination criteria added or None
@@ -1223,9 +1361,18 @@ def _generate_paginate_query(context, session, marker, limit, sort_key,
                     tuples, sets, or frozensets cause an 'IN' test to
                     be performed, while exact matching ('==' operator)
                     is used for other values
+    :param offset: number of items to skip
+    :param columns: names of the volume columns to query, instead of whole
+                    volumes with their metadata and volume type
     :returns: updated query or None
     """
-    query = _volume_get_query(context, session=session)
+    if columns:
+        query = model_query(context,
+                            *[getattr(models.Volume, column)
+                              for column in columns],
+                            session=session)
+    else:
+        query = _volume_get_query(context, session=session)
 
     if filters:
         filters = filters.copy()
@@ -1300,10 +1447,13 @@ def _generate_paginate_query(context, session, marker, limit, sort_key,
     if marker is not None:
         marker_volume = _volume_get(context, marker, session)
 
-    return sqlalchemyutils.paginate_query(query, models.Volume, limit,
-                                          [sort_key, 'created_at', 'id'],
-                                          marker=marker_volume,
-                                          sort_dir=sort_dir)
+    query = sqlalchemyutils.paginate_query(query, models.Volume, limit,
+                                           [sort_key, 'created_at', 'id'],
+                                           marker=marker_volume,
+                                           sort_dir=sort_dir)
+    if offset:
+        query = query.offset(offset)
+    return query
 
 
 @require_admin_context
@@ -1344,6 +1494,18 @@ def volume_update(context, volume_id, values):
         return volume_ref
 
 
+@require_admin_context
+def volume_update_all_by_ids(context, volume_ids, values):
+    if not volume_ids:
+        return 0
+    session = get_session()
+    with session.begin():
+        return model_query(context, models.Volume, read_deleted="no",
+                           session=session).\
+            filter(models.Volume.id.in_(volume_ids)).\
+            update(values, synchronize_session=False)
+
+
 ####################
 
 def _volume_x_metadata_get_query(context, volume_id, model, session=None):
@@ -1379,20 +1541,19 @@ def _volume_x_metadata_update(context, volume_id, metadata, delete,
         session = get_session()
 
     with session.begin(subtransactions=True):
+        # Load the existing items at once, the changes below are flushed
+        # together when the transaction ends
+        meta_refs = {}
+        for meta_ref in _volume_x_metadata_get_query(context, volume_id,
+                                                     model,
+                                                     session=session):
+            meta_refs[meta_ref['key']] = meta_ref
+
         # Set existing metadata to deleted if delete argument is True
         if delete:
-            original_metadata = _volume_x_metadata_get(context, volume_id,
-                                                       model, session=session)
-            for meta_key, meta_value in original_metadata.iteritems():
+            for meta_key, meta_ref in meta_refs.iteritems():
                 if meta_key not in metadata:
-                    meta_ref = _volume_x_metadata_get_item(context, volume_id,
-                                                           meta_key, model,
-                                                           notfound_exec,
-                                                           session=session)
                     meta_ref.update({'deleted': True})
-                    meta_ref.save(session=session)
-
-        meta_ref = None
 
         # Now update all existing items with new values, or create new meta
         # objects
@@ -1401,17 +1562,13 @@ def _volume_x_metadata_update(context, volume_id, metadata, delete,
             # update the value whether it exists or not
             item = {"value": meta_value}
 
-            try:
-                meta_ref = _volume_x_metadata_get_item(context, volume_id,
-                                                       meta_key, model,
-                                                       notfound_exec,
-                                                       session=session)
-            except notfound_exec:
+            meta_ref = meta_refs.get(meta_key)
+            if meta_ref is None:
                 meta_ref = model()
                 item.update({"key": meta_key, "volume_id": volume_id})
+                session.add(meta_ref)
 
             meta_ref.update(item)
-            meta_ref.save(session=session)
 
     return _volume_x_metadata_get(context, volume_id, model)
 
@@ -1578,11 +1735,48 @@ def snapshot_get(context, snapshot_id):
     return _snapshot_get(context, snapshot_id)
 
 
+def _process_snapshots_filters(query, filters):
+    """Apply exact-match filters to a snapshot query.
+
+    :returns: the updated query, or None if a filter key is not a column,
+              in which case no snapshot can match
+    """
+    for key in filters:
+        try:
+            column_attr = getattr(models.Snapshot, key)
+            prop = getattr(column_attr, 'property')
+            if isinstance(prop, RelationshipProperty):
+                LOG.debug(_("'%s' filter key is not valid, "
+                            "it maps to a relationship.") % key)
+                return None
+        except AttributeError:
+            LOG.debug(_("'%s' filter key is not valid.") % key)
+            return None
+    return query.filter_by(**filters)
+
+
+def _snapshot_get_all(context, filters=None, limit=None, offset=None):
+    query = model_query(context, models.Snapshot).\
+        options(joinedload('snapshot_metadata'))
+    if filters:
+        query = _process_snapshots_filters(query, filters)
+        if query is None:
+            return []
+    if limit is not None or offset:
+        # Page in a stable order, so that consecutive pages neither skip
+        # nor repeat snapshots; oldest first, like the unpaged listing
+        query = query.order_by(models.Snapshot.created_at,
+                               models.Snapshot.id)
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+    return query.all()
+
+
 @require_admin_context
-def snapshot_get_all(context):
-    return model_query(context, models.Snapshot).\
-        options(joinedload('snapshot_metadata')).\
-        all()
+def snapshot_get_all(context, filters=None, limit=None, offset=None):
+    return _snapshot_get_all(context, filters, limit, offset)
 
 
 @require_context
@@ -1595,12 +1789,11 @@ def snapshot_get_all_for_volume(context, volume_id):
 
 
 @require_context
-def snapshot_get_all_by_project(context, project_id):
+def snapshot_get_all_by_project(context, project_id, filters=None,
+                                limit=None, offset=None):
     authorize_project_context(context, project_id)
-    return model_query(context, models.Snapshot).\
-        filter_by(project_id=project_id).\
-        options(joinedload('snapshot_metadata')).\
-        all()
+    filters = dict(filters or {}, project_id=project_id)
+    return _snapshot_get_all(context, filters, limit, offset)
 
 
 @require_context
@@ -2492,6 +2685,38 @@ def volume_glance_metadata_create(context, volume_id, key, value):
     return
 
 
+@require_context
+@require_volume_exists
+def volume_glance_metadata_bulk_create(context, volume_id, metadata):
+    """Update the Glance metadata for a volume by adding new key:value pairs.
+
+    All the pairs are added in one transaction. Keys which already exist are
+    skipped, as this API does not support changing the value of a key once
+    it has been created.
+    """
+
+    session = get_session()
+    with session.begin():
+        rows = session.query(models.VolumeGlanceMetadata.key).\
+            filter_by(volume_id=volume_id).\
+            filter_by(deleted=False).all()
+        existing = set(row.key for row in rows)
+
+        metadata = [{'key': key, 'value': str(value)}
+                    for key, value in metadata.items()
+                    if key not in existing]
+        _volume_glance_metadata_insert(session, metadata,
+                                       volume_id=volume_id)
+
+
+def _volume_glance_metadata_insert(session, metadata, **values):
+    """Insert the key:value pairs of metadata with a single statement."""
+    rows = [dict(values, key=meta['key'], value=meta['value'])
+            for meta in metadata]
+    if rows:
+        session.execute(models.VolumeGlanceMetadata.__table__.insert(), rows)
+
+
 @require_context
 @require_snapshot_exists
 def volume_glance_metadata_copy_to_snapshot(context, snapshot_id, volume_id):
@@ -2506,13 +2731,8 @@ def volume_glance_metadata_copy_to_snapshot(context, snapshot_id, volume_id):
     with session.begin():
         metadata = _volume_glance_metadata_get(context, volume_id,
                                                session=session)
-        for meta in metadata:
-            vol_glance_metadata = models.VolumeGlanceMetadata()
-            vol_glance_metadata.snapshot_id = snapshot_id
-            vol_glance_metadata.key = meta['key']
-            vol_glance_metadata.value = meta['value']
-
-            vol_glance_metadata.save(session=session)
+        _volume_glance_metadata_insert(session, metadata,
+                                       snapshot_id=snapshot_id)
 
 
 @require_context
@@ -2532,13 +2752,8 @@ def volume_glance_metadata_copy_from_volume_to_volume(context,
         metadata = _volume_glance_metadata_get(context,
                                                src_volume_id,
                                                session=session)
-        for meta in metadata:
-            vol_glance_metadata = models.VolumeGlanceMetadata()
-            vol_glance_metadata.volume_id = volume_id
-            vol_glance_metadata.key = meta['key']
-            vol_glance_metadata.value = meta['value']
-
-            vol_glance_metadata.save(session=session)
+        _volume_glance_metadata_insert(session, metadata,
+                                       volume_id=volume_id)
 
 
 @require_context
@@ -2554,13 +2769,8 @@ def volume_glance_metadata_copy_to_volume(context, volume_id, snapshot_id):
     with session.begin():
         metadata = _volume_snapshot_glance_metadata_get(context, snapshot_id,
                                                         session=session)
-        for meta in metadata:
-            vol_glance_metadata = models.VolumeGlanceMetadata()
-            vol_glance_metadata.volume_id = volume_id
-            vol_glance_metadata.key = meta['key']
-            vol_glance_metadata.value = meta['value']
-
-            vol_glance_metadata.save(session=session)
+        _volume_glance_metadata_insert(session, metadata,
+                                       volume_id=volume_id)
 
 
 @require_context
@@ -2596,20 +2806,29 @@ def backup_get(context, backup_id):
     return result
 
 
-def _backup_get_all(context, filters=None):
+def _backup_get_all(context, filters=None, limit=None, offset=None):
     session = get_session()
     with session.begin():
         # Generate the query
         query = model_query(context, models.Backup)
         if filters:
             query = query.filter_by(**filters)
+        if limit is not None or offset:
+            # Page in a stable order, so that consecutive pages neither
+            # skip nor repeat backups; oldest first, like the unpaged listing
+            query = query.order_by(models.Backup.created_at,
+                                   models.Backup.id)
+            if offset:
+                query = query.offset(offset)
+            if limit is not None:
+                query = query.limit(limit)
 
         return query.all()
 
 
 @require_admin_context
-def backup_get_all(context, filters=None):
-    return _backup_get_all(context, filters)
+def backup_get_all(context, filters=None, limit=None, offset=None):
+    return _backup_get_all(context, filters, limit, offset)
 
 
 @require_admin_context
@@ -2618,7 +2837,8 @@ def backup_get_all_by_host(context, host):
 
 
 @require_context
-def backup_get_all_by_project(context, project_id, filters=None):
+def backup_get_all_by_project(context, project_id, filters=None,
+                              limit=None, offset=None):
 
     authorize_project_context(context, project_id)
     if not filters:
@@ -2628,7 +2848,7 @@ def backup_get_all_by_project(context, project_id, filters=None):
 
     filters['project_id'] = project_id
 
-    return _backup_get_all(context, filters)
+    return _backup_get_all(context, filters, limit, offset)
 
 
 @require_context
@@ -73,6 +73,13 @@ def _parse_image_ref(image_href):
     return (image_id, netloc, use_ssl)
 
 
+def _read_file_chunks(path, chunk_size=65536):
+    """Read a file in chunks, like the image data iterator of glanceclient."""
+    with open(path, "r") as f:
+        for chunk in iter(lambda: f.read(chunk_size), ''):
+            yield chunk
+
+
 def _create_glance_client(context, netloc, use_ssl,
                           version=CONF.glance_api_version):
     """Instantiate a new glanceclient.Client object."""
@@ -266,6 +273,8 @@ class GlanceImageService(object):
             location = self.get_location(context, image_id)
             o = urlparse.urlparse(location)
             if o.scheme == "file":
+                if not data:
+                    return _read_file_chunks(o.path)
                 with open(o.path, "r") as f:
                     # a system call to cp could have significant performance
                     # advantages, however we do not have the path to files at
@@ -25,12 +25,18 @@ we should look at maybe pushing this up to Oslo
 
 
 import contextlib
+import itertools
+import math
 import os
+import shlex
 import tempfile
+import time
 
+from eventlet.green import subprocess
 from oslo.config import cfg
 
 from cinder import exception
+from cinder.openstack.common import excutils
 from cinder.openstack.common import fileutils
 from cinder.openstack.common.gettextutils import _
 from cinder.openstack.common import imageutils
@@ -45,7 +51,27 @@ LOG = logging.getLogger(__name__)
 image_helper_opt = [cfg.StrOpt('image_conversion_dir',
                                default='$state_path/conversion',
                                help='Directory used for temporary storage '
-                                    'during image conversion'), ]
+                                    'during image conversion'),
+                    cfg.BoolOpt('stream_raw_images',
+                                default=False,
+                                help='Write raw images to the volume while '
+                                     'downloading them, instead of through '
+                                     'a temporary file in '
+                                     'image_conversion_dir. Images whose '
+                                     'data is not raw are still converted '
+                                     'through a temporary file'),
+                    cfg.StrOpt('image_cache_dir',
+                               default='$state_path/image-cache',
+                               help='Directory where images fetched for '
+                                    'volumes are kept, converted to raw, '
+                                    'so that further volumes created from '
+                                    'them do not download them again'),
+                    cfg.IntOpt('image_cache_max_size_gb',
+                               default=0,
+                               help='Maximum size in GB of the images kept '
+                                    'in image_cache_dir. The least recently '
+                                    'used images are evicted when it is '
+                                    'exceeded. 0 disables the image cache'), ]
 
 CONF = cfg.CONF
 CONF.register_opts(image_helper_opt)
@@ -70,6 +96,38 @@ def convert_image(source, dest, out_format, bps_limit=None):
     utils.execute(*cmd, run_as_root=True)
 
 
+# Magic numbers of the image formats qemu-img detects, with their offsets.
+# Data matching none of them is raw as far as qemu-img is concerned.
+_IMAGE_MAGIC = (
+    ('bochs', 0, 'Bochs Virtual HD Image'),
+    ('cloop', 0, '#!/bin/sh\n#V2.0 Format'),
+    ('luks', 0, 'LUKS\xba\xbe'),
+    ('parallels', 0, 'WithoutFreeSpace'),
+    ('parallels', 0, 'WithouFreSpacExt'),
+    ('qcow', 0, 'QFI\xfb'),
+    ('qed', 0, 'QED\x00'),
+    ('vdi', 64, '\x7f\x10\xda\xbe'),
+    ('vhdx', 0, 'vhdxfile'),
+    ('vmdk', 0, 'KDMV'),
+    ('vmdk', 0, '# Disk DescriptorFile'),
+    ('vpc', 0, 'conectix'),
+)
+_IMAGE_MAGIC_LENGTH = max(offset + len(magic)
+                          for _fmt, offset, magic in _IMAGE_MAGIC)
+
+
+def detect_image_format(head):
+    """Return the format of image data from its first bytes.
+
+    :param head: at least the first 512 bytes of the image, or all of it
+    :returns: the qemu-img name of the format, 'raw' if none matched
+    """
+    for fmt, offset, magic in _IMAGE_MAGIC:
+        if head[offset:offset + len(magic)] == magic:
+            return fmt
+    return 'raw'
+
+
 def resize_image(source, size, run_as_root=False):
     """Changes the virtual size of the image."""
     cmd = ('qemu-img', 'resize', source, '%sG' % size)
@@ -86,6 +144,129 @@ def fetch(context, image_service, image_id, path, _user_id, _project_id):
             image_service.download(context, image_id, image_file)
 
 
+def _rechunk(chunks, chunk_size):
+    """Regroup an iterable of strings into strings of chunk_size bytes."""
+    pending = []
+    pending_len = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_len += len(chunk)
+        if pending_len < chunk_size:
+            continue
+        data = ''.join(pending)
+        end = len(data) - len(data) % chunk_size
+        for offset in range(0, end, chunk_size):
+            yield data[offset:offset + chunk_size]
+        pending = [data[end:]]
+        pending_len = len(pending[0])
+    if pending_len:
+        yield ''.join(pending)
+
+
+def stream_raw_image(context, image_service, image_id, open_dest,
+                     image_meta=None, size=None, skip_zeros=False,
+                     chunk_size=None):
+    """Copy a raw image to its destination while downloading it.
+
+    The image is only streamed if stream_raw_images is set, Glance lists
+    it as a bare raw image and its data has no known image format header.
+    Otherwise nothing is written and the caller should fall back to
+    fetching the image to a temporary file and converting it.
+
+    :param open_dest: callable returning a context manager which yields the
+                      file object to write to; only called once the image
+                      has been found to be raw
+    :param image_meta: the image's metadata, if already known
+    :param size: size of the volume in GB
+    :param skip_zeros: seek over chunks of zeroes rather than writing them,
+                       for destinations that read back unwritten data as
+                       zeroes
+    :param chunk_size: write the image in chunks of this many bytes rather
+                       than in the chunks it was downloaded in
+    :returns: True if the image was copied, False if it was not streamable
+    :raises ImageUnacceptable: if the image does not fit in the volume
+    """
+    if not CONF.stream_raw_images:
+        return False
+
+    if image_meta is None:
+        image_meta = image_service.show(context, image_id)
+    if (image_meta.get('disk_format') != 'raw' or
+            image_meta.get('container_format') not in (None, 'bare') or
+            image_meta.get('size') is None):
+        return False
+
+    if size is not None and image_meta['size'] > size * units.Gi:
+        params = {'image_size': image_meta['size'] / units.Gi,
+                  'volume_size': size}
+        reason = _("Size is %(image_size)dGB and doesn't fit in a "
+                   "volume of size %(volume_size)dGB.") % params
+        raise exception.ImageUnacceptable(image_id=image_id, reason=reason)
+
+    chunks = iter(image_service.download(context, image_id))
+    head = ''
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= _IMAGE_MAGIC_LENGTH:
+            break
+
+    fmt = detect_image_format(head)
+    if fmt != 'raw':
+        LOG.warn(_("Image %(image_id)s is listed as raw but its data is "
+                   "%(fmt)s, not streaming it.") %
+                 {'image_id': image_id, 'fmt': fmt})
+        return False
+
+    chunks = itertools.chain([head], chunks)
+    if chunk_size:
+        chunks = _rechunk(chunks, chunk_size)
+
+    written = skipped = 0
+    with open_dest() as dest:
+        for chunk in chunks:
+            if skip_zeros and not chunk.strip('\0'):
+                dest.seek(len(chunk), os.SEEK_CUR)
+                skipped += len(chunk)
+            else:
+                dest.write(chunk)
+                written += len(chunk)
+
+    LOG.debug("Streamed raw image %(image_id)s: wrote %(written)d bytes, "
+              "skipped %(skipped)d bytes of zeroes." %
+              {'image_id': image_id, 'written': written, 'skipped': skipped})
+    return True
+
+
+@contextlib.contextmanager
+def _open_device_for_streaming(dest, blocksize):
+    """Yield a pipe to dd writing to dest, which may need root to open.
+
+    dd is run like processutils.execute() runs commands, with a green pipe
+    so that writing the image does not block other greenthreads.
+    """
+    cmd = shlex.split(utils.get_root_helper()) + [
+        'dd', 'of=%s' % dest, 'bs=%s' % blocksize, 'conv=fdatasync']
+    LOG.debug('Running cmd (subprocess): %s' % ' '.join(cmd))
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            close_fds=True,
+                            preexec_fn=processutils._subprocess_setup)
+    try:
+        yield proc.stdin
+    except Exception:
+        with excutils.save_and_reraise_exception():
+            proc.kill()
+            proc.wait()
+
+    stdout, stderr = proc.communicate()
+    LOG.debug('Result was %s' % proc.returncode)
+    if proc.returncode:
+        raise processutils.ProcessExecutionError(exit_code=proc.returncode,
+                                                 stdout=stdout,
+                                                 stderr=stderr,
+                                                 cmd=' '.join(cmd))
+
+
 def fetch_verify_image(context, image_service, image_id, dest,
                        user_id=None, project_id=None, size=None):
     fetch(context, image_service, image_id, dest,
@@ -137,9 +318,46 @@ def fetch_to_volume_format(context, image_service,
             os.path.exists(CONF.image_conversion_dir)):
         os.makedirs(CONF.image_conversion_dir)
 
-    qemu_img = True
     image_meta = image_service.show(context, image_id)
 
+    cached = fetch_to_cache(context, image_service, image_id, blocksize,
+                            user_id, project_id, size=size,
+                            image_meta=image_meta)
+    if cached:
+        LOG.debug("Copying cached image %(image_id)s from %(cached)s to "
+                  "%(dest)s" % {'image_id': image_id, 'cached': cached,
+                                'dest': dest})
+        if volume_format == 'raw':
+            size_in_m = int(math.ceil(float(os.path.getsize(cached)) /
+                                      units.Mi))
+            volume_utils.copy_volume(cached, dest, size_in_m, blocksize)
+        else:
+            convert_image(cached, dest, volume_format,
+                          bps_limit=CONF.volume_copy_bps_limit)
+        return
+
+    if volume_format == 'raw' and stream_raw_image(
+            context, image_service, image_id,
+            lambda: _open_device_for_streaming(dest, blocksize),
+            image_meta=image_meta, size=size):
+        return
+
+    _fetch_and_convert(context, image_service, image_id, image_meta, dest,
+                       volume_format, blocksize, user_id, project_id, size)
+
+
+def _fetch_and_convert(context, image_service, image_id, image_meta, dest,
+                       volume_format, blocksize, user_id, project_id, size,
+                       check=None):
+    """Fetch an image and convert it into dest.
+
+    :param check: called with the 'qemu-img info' of the fetched image
+                  before it is converted; the image is not converted if it
+                  returns False
+    :returns: whether the image was converted
+    """
+    qemu_img = True
+
     # NOTE(avishay): I'm not crazy about creating temp files which may be
     # large and cause disk full errors which would confuse users.
     # Unfortunately it seems that you can't pipe to 'qemu-img convert' because
@@ -184,9 +402,11 @@ def fetch_to_volume_format(context, image_service,
                       'size: %(size)s' % {'tmp': tmp, 'dest': dest,
                                           'size': image_meta['size']})
             volume_utils.copy_volume(tmp, dest, image_meta['size'], blocksize)
-            return
+            return True
 
         data = qemu_img_info(tmp)
+        if check is not None and not check(data):
+            return False
         virt_size = data.virtual_size / units.Gi
 
         # NOTE(xqueralt): If the image virtual size doesn't fit in the
@@ -231,6 +451,152 @@ def fetch_to_volume_format(context, image_service,
                          "now %(file_format)s") % {'vol_format': volume_format,
                                                    'file_format': data.
                                                    file_format})
+        return True
+
+
+# Cached images used within this many seconds are not evicted, so that an
+# image is not removed between being looked up and being copied.
+_IMAGE_CACHE_EVICT_GRACE = 60
+
+
+def _cached_image_paths(image_id=None):
+    """Return the paths of the images in the image cache.
+
+    :param image_id: only return the images cached for this image id,
+                     including partially fetched ones
+    """
+    if not os.path.isdir(CONF.image_cache_dir):
+        return []
+    if image_id:
+        return [os.path.join(CONF.image_cache_dir, name)
+                for name in os.listdir(CONF.image_cache_dir)
+                if name.startswith('%s.' % image_id)]
+    return [os.path.join(CONF.image_cache_dir, name)
+            for name in os.listdir(CONF.image_cache_dir)
+            if not name.endswith('.part')]
+
+
+@utils.synchronized('image-cache-evict', external=True)
+def _evict_cached_images():
+    """Remove the least recently used images beyond the cache size."""
+    max_size = CONF.image_cache_max_size_gb * units.Gi
+    entries = []
+    for path in _cached_image_paths():
+        try:
+            st = os.stat(path)
+        except OSError:
+            # Invalidated while we were listing the cache.
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _mtime, size, _path in entries)
+    recent = time.time() - _IMAGE_CACHE_EVICT_GRACE
+    for mtime, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        if mtime > recent:
+            continue
+        LOG.info(_("Evicting %s from the image cache.") % path)
+        fileutils.delete_if_exists(path)
+        total -= size
+
+    if total > max_size:
+        LOG.warn(_("Image cache holds %(total)d bytes, more than its "
+                   "limit of %(max_size)d, in recently used images.") %
+                 {'total': total, 'max_size': max_size})
+
+
+def fetch_to_cache(context, image_service, image_id, blocksize,
+                   user_id=None, project_id=None, size=None,
+                   image_meta=None):
+    """Return the path of a raw copy of an image in the image cache.
+
+    The image is fetched and converted to raw on the first call for it;
+    concurrent calls for the same image wait for that fetch instead of
+    fetching it again.  Cached images are keyed by image id and checksum,
+    so a cached image is replaced once its data changes in Glance.
+
+    :param size: size of the volume in GB the image is fetched for
+    :param image_meta: the image's metadata, if already known
+    :returns: the path of the cached image, or None if the image cache is
+              disabled or the image cannot be cached
+    :raises ImageUnacceptable: if the image does not fit in the volume
+    """
+    if not CONF.image_cache_max_size_gb:
+        return None
+
+    if image_meta is None:
+        image_meta = image_service.show(context, image_id)
+    checksum = image_meta.get('checksum')
+    if (image_meta.get('status') != 'active' or not checksum or
+            image_meta.get('size') is None or
+            image_meta['size'] > CONF.image_cache_max_size_gb * units.Gi):
+        return None
+
+    path = os.path.join(CONF.image_cache_dir, '%s.%s' % (image_id, checksum))
+
+    def _check_virtual_size(data):
+        # Glance reports the stored size, a small qcow2 image may expand
+        # to much more, so check what the image converts to.
+        if size is not None and data.virtual_size > size * units.Gi:
+            params = {'image_size': data.virtual_size / units.Gi,
+                      'volume_size': size}
+            reason = _("Size is %(image_size)dGB and doesn't fit in a "
+                       "volume of size %(volume_size)dGB.") % params
+            raise exception.ImageUnacceptable(image_id=image_id,
+                                              reason=reason)
+        if data.virtual_size > CONF.image_cache_max_size_gb * units.Gi:
+            LOG.info(_("Image %s is too big for the image cache.") %
+                     image_id)
+            return False
+        return True
+
+    @utils.synchronized('image-cache-%s' % image_id, external=True)
+    def _fetch():
+        """Fetch the image into the cache unless it is there already.
+
+        :returns: whether the image was fetched, or None if it cannot be
+                  cached
+        """
+        if os.path.exists(path):
+            LOG.debug("Image %s found in the image cache." % image_id)
+            os.utime(path, None)
+            return False
+
+        fileutils.ensure_tree(CONF.image_cache_dir)
+        # Anything left for this image was cached before its data changed
+        # in Glance, or is a fetch interrupted half way.
+        for stale in _cached_image_paths(image_id):
+            LOG.info(_("Removing stale image cache entry %s.") % stale)
+            fileutils.delete_if_exists(stale)
+
+        part = path + '.part'
+        with fileutils.remove_path_on_error(part):
+            if not _fetch_and_convert(context, image_service, image_id,
+                                      image_meta, part, 'raw', blocksize,
+                                      user_id, project_id, None,
+                                      check=_check_virtual_size):
+                fileutils.delete_if_exists(part)
+                return None
+            # qemu-img convert runs as root; the cached image must be ours
+            # to touch it when it is used.
+            utils.execute('chown', os.getuid(), part, run_as_root=True)
+            os.rename(part, path)
+        return True
+
+    fetched = _fetch()
+    if fetched is None:
+        return None
+    if fetched:
+        _evict_cached_images()
+
+    if size is not None and os.path.getsize(path) > size * units.Gi:
+        params = {'image_size': os.path.getsize(path) / units.Gi,
+                  'volume_size': size}
+        reason = _("Size is %(image_size)dGB and doesn't fit in a "
+                   "volume of size %(volume_size)dGB.") % params
+        raise exception.ImageUnacceptable(image_id=image_id, reason=reason)
+    return path
 
 
 def upload_volume(context, image_service, image_meta, volume_path,
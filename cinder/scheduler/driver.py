@@ -19,11 +19,14 @@
 Scheduler base class that all Schedulers should inherit from
 """
 
+import copy
+
 from oslo.config import cfg
 
 from cinder import db
 from cinder.openstack.common.gettextutils import _
 from cinder.openstack.common import importutils
+from cinder.openstack.common import log as logging
 from cinder.openstack.common import timeutils
 from cinder.volume import rpcapi as volume_rpcapi
 
@@ -40,6 +43,8 @@ scheduler_driver_opts = [
 CONF = cfg.CONF
 CONF.register_opts(scheduler_driver_opts)
 
+LOG = logging.getLogger(__name__)
+
 
 def volume_update_db(context, volume_id, host):
     '''Set the host and set the scheduled_at field of a volume.
@@ -81,3 +86,29 @@ class Scheduler(object):
     def schedule_create_volume(self, context, request_spec, filter_properties):
         """Must override schedule method for scheduler to work."""
         raise NotImplementedError(_("Must implement schedule_create_volume"))
+
+    def schedule_create_volumes(self, context, request_specs,
+                                filter_properties):
+        """Place a batch of volumes one at a time.
+
+        Schedulers which can place a batch at once override this.
+
+        :returns: a list of (volume_id, host, error) tuples in request order,
+                  with a host of None and the exception raised for volumes
+                  that could not be placed.
+        """
+        placements = []
+        for request_spec in request_specs:
+            volume_id = request_spec['volume_id']
+            try:
+                self.schedule_create_volume(
+                    context, request_spec,
+                    copy.deepcopy(filter_properties or {}))
+            except Exception as ex:
+                LOG.exception(_('Failed to schedule volume %s in batch'),
+                              volume_id)
+                placements.append((volume_id, None, ex))
+            else:
+                host = db.volume_get(context, volume_id)['host']
+                placements.append((volume_id, host, None))
+        return placements
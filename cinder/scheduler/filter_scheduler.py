@@ -20,6 +20,9 @@ You can customize this scheduler by specifying your own volume Filters and
 Weighing Functions.
 """
 
+import copy
+import math
+
 from oslo.config import cfg
 
 from cinder import exception
@@ -68,6 +71,96 @@ class FilterScheduler(driver.Scheduler):
         if not weighed_host:
             raise exception.NoValidHost(reason="No weighed hosts available")
 
+        self._create_volume_on_host(context, weighed_host, request_spec,
+                                    filter_properties)
+
+    def schedule_create_volumes(self, context, request_specs,
+                                filter_properties):
+        """Place a batch of volumes and create them on the chosen hosts.
+
+        Hosts are filtered once for each group of requests with the same
+        volume type, availability zone and size class. The volumes of a
+        group are then placed one after another, consuming capacity on the
+        chosen host so that later placements in the batch account for it.
+
+        A volume that cannot be placed, or whose creation cannot be cast,
+        does not stop the rest of the batch.
+
+        :returns: a list of (volume_id, host, error) tuples in request order,
+                  with a host of None and the exception raised for volumes
+                  that could not be placed.
+        """
+        placements = []
+        candidates = {}
+        for request_spec in request_specs:
+            volume_id = request_spec['volume_id']
+            try:
+                host = self._schedule_in_batch(context, request_spec,
+                                               filter_properties, candidates)
+            except exception.NoValidHost as ex:
+                LOG.warning(_('No weighed hosts found for volume %s in '
+                              'batch'), volume_id)
+                placements.append((volume_id, None, ex))
+            except Exception as ex:
+                LOG.exception(_('Failed to schedule volume %s in batch'),
+                              volume_id)
+                placements.append((volume_id, None, ex))
+            else:
+                placements.append((volume_id, host, None))
+        return placements
+
+    def _schedule_in_batch(self, context, request_spec, filter_properties,
+                           candidates):
+        """Place one volume of a batch, returning its host.
+
+        :param candidates: the filtered hosts of the batch so far, by
+                           _batch_key()
+        """
+        properties = copy.deepcopy(filter_properties or {})
+        key = self._batch_key(request_spec)
+        if key not in candidates:
+            candidates[key] = self._get_filtered_candidates(
+                context, request_spec, properties)
+        else:
+            self._populate_filter_properties(context, request_spec,
+                                             properties)
+
+        weighed_host = self._choose_batch_host(candidates[key],
+                                               request_spec, properties)
+        if not weighed_host:
+            raise exception.NoValidHost(reason=_("No weighed hosts "
+                                                 "available"))
+
+        self._create_volume_on_host(context, weighed_host, request_spec,
+                                    properties)
+        return weighed_host.obj.host
+
+    def _batch_key(self, request_spec):
+        volume_properties = request_spec['volume_properties']
+        size_class = int(math.log(max(volume_properties['size'], 1), 2))
+        return (volume_properties.get('volume_type_id'),
+                volume_properties.get('availability_zone'),
+                size_class)
+
+    def _choose_batch_host(self, hosts, request_spec, filter_properties):
+        """Choose the best host for a volume from pre-filtered hosts.
+
+        Capacity consumed by earlier volumes of the batch changes both the
+        weights and whether a host still passes the filters, so the hosts
+        are weighed again and the winner is checked against the filters.
+        """
+        if not hosts:
+            return None
+        weighed_hosts = self.host_manager.get_weighed_hosts(hosts,
+                                                            filter_properties)
+        for weighed_host in weighed_hosts:
+            if self.host_manager.get_filtered_hosts([weighed_host.obj],
+                                                    filter_properties):
+                return self._choose_top_host([weighed_host], request_spec)
+        return None
+
+    def _create_volume_on_host(self, context, weighed_host, request_spec,
+                               filter_properties):
         host = weighed_host.obj.host
         volume_id = request_spec['volume_id']
         snapshot_id = request_spec['snapshot_id']
@@ -213,13 +306,8 @@ class FilterScheduler(driver.Scheduler):
             }
             raise exception.NoValidHost(reason=msg)
 
-    def _get_weighted_candidates(self, context, request_spec,
-                                 filter_properties=None):
-        """Returns a list of hosts that meet the required specs,
-        ordered by their fitness.
-        """
-        elevated = context.elevated()
-
+    def _populate_filter_properties(self, context, request_spec,
+                                    filter_properties):
         volume_properties = request_spec['volume_properties']
         # Since Cinder is using mixed filters from Oslo and it's own, which
         # takes 'resource_XX' and 'volume_XX' as input respectively, copying
@@ -231,8 +319,6 @@ class FilterScheduler(driver.Scheduler):
 
         config_options = self._get_configuration_options()
 
-        if filter_properties is None:
-            filter_properties = {}
         self._populate_retry(filter_properties, resource_properties)
 
         filter_properties.update({'context': context,
@@ -244,6 +330,16 @@ class FilterScheduler(driver.Scheduler):
         self.populate_filter_properties(request_spec,
                                         filter_properties)
 
+    def _get_filtered_candidates(self, context, request_spec,
+                                 filter_properties=None):
+        """Returns a list of hosts that meet the required specs."""
+        elevated = context.elevated()
+
+        if filter_properties is None:
+            filter_properties = {}
+        self._populate_filter_properties(context, request_spec,
+                                         filter_properties)
+
         # Find our local list of acceptable hosts by filtering and
         # weighing our options. we virtually consume resources on
         # it so subsequent selections can adjust accordingly.
@@ -255,10 +351,21 @@ class FilterScheduler(driver.Scheduler):
         # Filter local hosts based on requirements ...
         hosts = self.host_manager.get_filtered_hosts(hosts,
                                                      filter_properties)
+        LOG.debug("Filtered %s" % hosts)
+        return hosts
+
+    def _get_weighted_candidates(self, context, request_spec,
+                                 filter_properties=None):
+        """Returns a list of hosts that meet the required specs,
+        ordered by their fitness.
+        """
+        if filter_properties is None:
+            filter_properties = {}
+        hosts = self._get_filtered_candidates(context, request_spec,
+                                              filter_properties)
         if not hosts:
             return []
 
-        LOG.debug("Filtered %s" % hosts)
         # weighted_host = WeightedHost() ... the best
         # host for the job.
         weighed_hosts = self.host_manager.get_weighed_hosts(hosts,
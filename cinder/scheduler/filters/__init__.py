@@ -0,0 +1,49 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Cinder scheduler host filters
+"""
+
+from cinder.openstack.common.scheduler import filters
+
+
+class RequestCachedHostFilter(filters.BaseHostFilter):
+    """Host filter which does the work depending on the request only once.
+
+    prepare() is called once per request and what it returns is handed to
+    host_passes_prepared() for every host, so that, for instance, a
+    database query is not repeated for each host.
+    """
+
+    def prepare(self, filter_properties):
+        """Return what host_passes_prepared() needs from the request."""
+        return filter_properties
+
+    def host_passes_prepared(self, host_state, prepared):
+        """Return True if the HostState passes the filter, otherwise False.
+        Override this in a subclass.
+        """
+        raise NotImplementedError()
+
+    def host_passes(self, host_state, filter_properties):
+        return self.host_passes_prepared(host_state,
+                                         self.prepare(filter_properties))
+
+    def filter_all(self, filter_obj_list, filter_properties):
+        prepared = self.prepare(filter_properties)
+        for obj in filter_obj_list:
+            if self.host_passes_prepared(obj, prepared):
+                yield obj
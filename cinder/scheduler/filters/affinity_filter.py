@@ -16,26 +16,35 @@
 
 
 from cinder.openstack.common import log as logging
-from cinder.openstack.common.scheduler import filters
 from cinder.openstack.common import uuidutils
+from cinder.scheduler import filters
 from cinder.volume import api as volume
 
 LOG = logging.getLogger(__name__)
 
 
-class AffinityFilter(filters.BaseHostFilter):
+class AffinityFilter(filters.RequestCachedHostFilter):
+    """Base class for filters on the back-ends of a set of volumes.
+
+    The back-ends of the volumes named by the scheduler hint are looked up
+    once per request rather than once per host.
+    """
+
+    # Scheduler hint naming the volumes.
+    hint = None
+
     def __init__(self):
         self.volume_api = volume.API()
 
+    def prepare(self, filter_properties):
+        """Return the volume uuids of the hint and the hosts of the volumes.
 
-class DifferentBackendFilter(AffinityFilter):
-    """Schedule volume on a different back-end from a set of volumes."""
-
-    def host_passes(self, host_state, filter_properties):
+        The uuids are None if the hint is not valid.
+        """
         context = filter_properties['context']
         scheduler_hints = filter_properties.get('scheduler_hints') or {}
 
-        affinity_uuids = scheduler_hints.get('different_host', [])
+        affinity_uuids = scheduler_hints.get(self.hint, [])
 
         # scheduler hint verification: affinity_uuids can be a list of uuids
         # or single uuid.  The checks here is to make sure every single string
@@ -44,59 +53,47 @@ class DifferentBackendFilter(AffinityFilter):
         # like a uuid, it is better to fail the request than serving it wrong.
         if isinstance(affinity_uuids, list):
             for uuid in affinity_uuids:
-                if uuidutils.is_uuid_like(uuid):
-                    continue
-                else:
-                    return False
+                if not uuidutils.is_uuid_like(uuid):
+                    return None, set()
         elif uuidutils.is_uuid_like(affinity_uuids):
             affinity_uuids = [affinity_uuids]
         else:
             # Not a list, not a string looks like uuid, don't pass it
             # to DB for query to avoid potential risk.
-            return False
+            return None, set()
 
-        if affinity_uuids:
-            return not self.volume_api.get_all(
-                context, filters={'host': host_state.host,
-                                  'id': affinity_uuids,
-                                  'deleted': False})
+        if not affinity_uuids:
+            return affinity_uuids, set()
+        volumes = self.volume_api.get_all(
+            context, filters={'id': affinity_uuids, 'deleted': False},
+            columns=['host'])
+        return affinity_uuids, set(vol['host'] for vol in volumes)
 
-        # With no different_host key
-        return True
+
+class DifferentBackendFilter(AffinityFilter):
+    """Schedule volume on a different back-end from a set of volumes."""
+
+    hint = 'different_host'
+
+    def host_passes_prepared(self, host_state, prepared):
+        affinity_uuids, affinity_hosts = prepared
+        if affinity_uuids is None:
+            return False
+        # With no different_host key, affinity_hosts is empty.
+        return host_state.host not in affinity_hosts
 
 
 class SameBackendFilter(AffinityFilter):
     """Schedule volume on the same back-end as another volume."""
 
-    def host_passes(self, host_state, filter_properties):
-        context = filter_properties['context']
-        scheduler_hints = filter_properties.get('scheduler_hints') or {}
-
-        affinity_uuids = scheduler_hints.get('same_host', [])
+    hint = 'same_host'
 
-        # scheduler hint verification: affinity_uuids can be a list of uuids
-        # or single uuid.  The checks here is to make sure every single string
-        # in the list looks like a uuid, otherwise, this filter will fail to
-        # pass.  Note that the filter does *NOT* ignore string doesn't look
-        # like a uuid, it is better to fail the request than serving it wrong.
-        if isinstance(affinity_uuids, list):
-            for uuid in affinity_uuids:
-                if uuidutils.is_uuid_like(uuid):
-                    continue
-                else:
-                    return False
-        elif uuidutils.is_uuid_like(affinity_uuids):
-            affinity_uuids = [affinity_uuids]
-        else:
-            # Not a list, not a string looks like uuid, don't pass it
-            # to DB for query to avoid potential risk.
+    def host_passes_prepared(self, host_state, prepared):
+        affinity_uuids, affinity_hosts = prepared
+        if affinity_uuids is None:
             return False
-
         if affinity_uuids:
-            return self.volume_api.get_all(
-                context, filters={'host': host_state.host,
-                                  'id': affinity_uuids,
-                                  'deleted': False})
+            return host_state.host in affinity_hosts
 
         # With no same_host key
         return True
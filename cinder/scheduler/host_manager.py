@@ -26,6 +26,7 @@ from cinder import exception
 from cinder.openstack.common.gettextutils import _
 from cinder.openstack.common import log as logging
 from cinder.openstack.common.scheduler import filters
+from cinder.openstack.common.scheduler.filters import extra_specs_ops
 from cinder.openstack.common.scheduler import weights
 from cinder.openstack.common import timeutils
 from cinder import utils
@@ -44,7 +45,20 @@ host_manager_opts = [
                 default=[
                     'CapacityWeigher'
                 ],
-                help='Which weigher class names to use for weighing hosts.')
+                help='Which weigher class names to use for weighing hosts.'),
+    cfg.IntOpt('scheduler_host_state_refresh_interval',
+               default=0,
+               help='Number of seconds the scheduler serves host states '
+                    'from memory before reloading the volume services and '
+                    'their liveness from the database. Capability updates '
+                    'from volume services are applied as they arrive. '
+                    'Set to 0 to reload on every request.'),
+    cfg.IntOpt('scheduler_max_stats_age',
+               default=0,
+               help='Maximum age in seconds of the stats a volume service '
+                    'last collected from its driver for the service to be '
+                    'scheduled to. Set to 0 to schedule to services with '
+                    'stats of any age.'),
 ]
 
 CONF = cfg.CONF
@@ -108,6 +122,8 @@ class HostState(object):
         self.reserved_percentage = 0
 
         self.updated = None
+        # When the volume service collected the stats from its driver.
+        self.stats_timestamp = None
 
     def update_capabilities(self, capabilities=None, service=None):
         # Read-only capability dicts
@@ -137,8 +153,24 @@ class HostState(object):
                 'allocated_capacity_gb', 0)
             self.reserved_percentage = capability['reserved_percentage']
 
+            stats_timestamp = capability.get('stats_timestamp')
+            if stats_timestamp:
+                self.stats_timestamp = timeutils.normalize_time(
+                    timeutils.parse_isotime(stats_timestamp))
+
             self.updated = capability['timestamp']
 
+    def stats_are_stale(self):
+        """Whether the driver stats are older than scheduler_max_stats_age.
+
+        Volume services which do not report when they collected their stats
+        are never considered stale.
+        """
+        max_age = CONF.scheduler_max_stats_age
+        if max_age <= 0 or self.stats_timestamp is None:
+            return False
+        return timeutils.is_older_than(self.stats_timestamp, max_age)
+
     def consume_from_volume(self, volume):
         """Incrementally update host state from an volume."""
         volume_gb = volume['size']
@@ -158,14 +190,146 @@ class HostState(object):
                 (self.host, self.free_capacity_gb))
 
 
+class HostIndex(object):
+    """Index of host states by capability value and availability zone.
+
+    Lets the availability zone and extra specs of a request narrow down the
+    hosts before filters are run on each of them.  Extra specs are matched
+    once per distinct capability value instead of once per host.
+    """
+
+    def __init__(self):
+        self.host_states = {}
+        # {capability: {value: set(host)}}
+        self._values = {}
+        # {capability: set(host)}, for values which cannot be indexed
+        self._unhashable = {}
+        # {availability_zone: set(host)}
+        self._zones = {}
+        # {host: ([(capability, value)], [capability], availability_zone)}
+        self._entries = {}
+
+    @staticmethod
+    def _add(index, key, host):
+        index.setdefault(key, set()).add(host)
+
+    @staticmethod
+    def _discard(index, key, host):
+        hosts = index.get(key)
+        if hosts is not None:
+            hosts.discard(host)
+            if not hosts:
+                del index[key]
+
+    def update(self, host_state):
+        """Index the current capabilities and service of a host state."""
+        host = host_state.host
+        self.remove(host)
+        self.host_states[host] = host_state
+        # What was indexed, as the host state is updated in place.
+        values = []
+        unhashable = []
+        for key, value in host_state.capabilities.iteritems():
+            if value is None:
+                continue
+            try:
+                self._add(self._values.setdefault(key, {}), value, host)
+                values.append((key, value))
+            except TypeError:
+                self._add(self._unhashable, key, host)
+                unhashable.append(key)
+        zone = host_state.service.get('availability_zone')
+        self._add(self._zones, zone, host)
+        self._entries[host] = (values, unhashable, zone)
+
+    def remove(self, host):
+        self.host_states.pop(host, None)
+        entries = self._entries.pop(host, None)
+        if entries is None:
+            return
+        values, unhashable, zone = entries
+        for key, value in values:
+            self._discard(self._values[key], value, host)
+            if not self._values[key]:
+                del self._values[key]
+        for key in unhashable:
+            self._discard(self._unhashable, key, host)
+        self._discard(self._zones, zone, host)
+
+    def indexes(self, host_state):
+        """Whether host_state is the indexed state of its host."""
+        return self.host_states.get(host_state.host) is host_state
+
+    def hosts_in_zone(self, availability_zone):
+        return set(self._zones.get(availability_zone, ()))
+
+    def hosts_matching(self, capability, req):
+        """Return the hosts whose capability may match an extra spec.
+
+        Hosts with a value which cannot be indexed are always returned,
+        and so are hosts with a value the extra spec cannot be matched
+        against, leaving the decision to the filter.
+        """
+        hosts = set(self._unhashable.get(capability, ()))
+        for value, value_hosts in self._values.get(capability, {}).items():
+            try:
+                matches = extra_specs_ops.match(value, req)
+            except Exception:
+                matches = True
+            if matches:
+                hosts.update(value_hosts)
+        return hosts
+
+    def zone_candidates(self, filter_properties):
+        """Return the hosts AvailabilityZoneFilter may pass, None for all."""
+        spec = filter_properties.get('request_spec') or {}
+        props = spec.get('resource_properties') or {}
+        availability_zone = props.get('availability_zone')
+        if not availability_zone:
+            return None
+        return self.hosts_in_zone(availability_zone)
+
+    def capabilities_candidates(self, filter_properties):
+        """Return the hosts CapabilitiesFilter may pass, None for all.
+
+        Only extra specs on top-level capabilities are looked up, the
+        filter still checks nested ones.
+        """
+        resource_type = filter_properties.get('resource_type') or {}
+        extra_specs = resource_type.get('extra_specs') or {}
+        candidates = None
+        for key, req in extra_specs.iteritems():
+            # Same scoping as CapabilitiesFilter
+            scope = key.split(':')
+            if len(scope) > 1 and scope[0] != "capabilities":
+                continue
+            elif scope[0] == "capabilities":
+                del scope[0]
+            if len(scope) != 1:
+                continue
+            hosts = self.hosts_matching(scope[0], req)
+            candidates = hosts if candidates is None else candidates & hosts
+        return candidates
+
+
 class HostManager(object):
     """Base HostManager class."""
 
+    # Filters which can use the host index to narrow down the hosts they
+    # are run on, by class name.
+    indexed_filters = {
+        'AvailabilityZoneFilter': HostIndex.zone_candidates,
+        'CapabilitiesFilter': HostIndex.capabilities_candidates,
+    }
+
     host_state_cls = HostState
 
     def __init__(self):
         self.service_states = {}  # { <host>: {<service>: {cap k : v}}}
         self.host_state_map = {}
+        self.host_index = HostIndex()
+        self.host_states_refreshed_at = None
+        self.host_state_cache_stats = {'served': 0, 'refreshed': 0}
         self.filter_handler = filters.HostFilterHandler('cinder.scheduler.'
                                                         'filters')
         self.filter_classes = self.filter_handler.get_all_classes()
@@ -245,10 +409,33 @@ class HostManager(object):
             raise exception.SchedulerHostWeigherNotFound(weigher_name=msg)
         return good_weighers
 
+    def _index_candidates(self, filter_classes, filter_properties):
+        """Return the hosts the indexed filters may pass, None for all."""
+        candidates = None
+        for filter_cls in filter_classes:
+            lookup = self.indexed_filters.get(filter_cls.__name__)
+            if lookup is None:
+                continue
+            hosts = lookup(self.host_index, filter_properties)
+            if hosts is not None:
+                candidates = (hosts if candidates is None
+                              else candidates & hosts)
+        return candidates
+
     def get_filtered_hosts(self, hosts, filter_properties,
                            filter_class_names=None):
-        """Filter hosts and return only ones passing all filters."""
+        """Filter hosts and return only ones passing all filters.
+
+        Hosts which the host index shows cannot pass the availability zone
+        or capabilities filters are left out before any filter runs.
+        """
         filter_classes = self._choose_host_filters(filter_class_names)
+        candidates = self._index_candidates(filter_classes,
+                                            filter_properties)
+        if candidates is not None:
+            hosts = [host_state for host_state in hosts
+                     if host_state.host in candidates or
+                     not self.host_index.indexes(host_state)]
         return self.filter_handler.get_filtered_objects(filter_classes,
                                                         hosts,
                                                         filter_properties)
@@ -278,16 +465,57 @@ class HostManager(object):
         capab_copy["timestamp"] = timeutils.utcnow()  # Reported time
         self.service_states[host] = capab_copy
 
+        host_state = self.host_state_map.get(host)
+        if host_state:
+            host_state.update_capabilities(capab_copy, host_state.service)
+            host_state.update_from_volume_capability(capab_copy)
+            self.host_index.update(host_state)
+        else:
+            # A new volume service, load its service record on the next
+            # request.
+            self.host_states_refreshed_at = None
+
+    def _host_states_expired(self):
+        interval = CONF.scheduler_host_state_refresh_interval
+        if self.host_states_refreshed_at is None or interval <= 0:
+            return True
+        return timeutils.is_older_than(self.host_states_refreshed_at,
+                                       interval)
+
     def get_all_host_states(self, context):
         """Returns a dict of all the hosts the HostManager knows about.
 
         Each of the consumable resources in HostState are
         populated with capabilities scheduler received from RPC.
 
+        The host states are kept in memory and only reloaded from the
+        database once scheduler_host_state_refresh_interval has passed.
+        Hosts whose driver stats are older than scheduler_max_stats_age are
+        left out.
+
         For example:
           {'192.168.1.100': HostState(), ...}
         """
+        if self._host_states_expired():
+            self._refresh_host_states(context)
+            self.host_state_cache_stats['refreshed'] += 1
+        else:
+            self.host_state_cache_stats['served'] += 1
+        if CONF.scheduler_max_stats_age <= 0:
+            return self.host_state_map.itervalues()
+        return self._fresh_host_states()
+
+    def _fresh_host_states(self):
+        for host_state in self.host_state_map.itervalues():
+            if host_state.stats_are_stale():
+                LOG.warn(_("Ignoring volume service with stale stats, last "
+                           "collected at %(timestamp)s. (host: %(host)s)") %
+                         {'timestamp': host_state.stats_timestamp,
+                          'host': host_state.host})
+                continue
+            yield host_state
 
+    def _refresh_host_states(self, context):
         # Get resource usage across the available volume nodes:
         topic = CONF.volume_topic
         volume_services = db.service_get_all_by_topic(context,
@@ -313,6 +541,7 @@ class HostManager(object):
                 self.host_state_map[host] = host_state
             # update attributes in host_state that scheduler is interested in
             host_state.update_from_volume_capability(capabilities)
+            self.host_index.update(host_state)
             active_hosts.add(host)
 
         # remove non-active hosts from host_state_map
@@ -321,5 +550,9 @@ class HostManager(object):
             LOG.info(_("Removing non-active host: %(host)s from "
                        "scheduler cache.") % {'host': host})
             del self.host_state_map[host]
+            self.host_index.remove(host)
 
-        return self.host_state_map.itervalues()
+        self.host_states_refreshed_at = timeutils.utcnow()
+        LOG.debug('Host state cache served %(served)d requests and was '
+                  'refreshed %(refreshed)d times.',
+                  self.host_state_cache_stats)
@@ -53,7 +53,7 @@ LOG = logging.getLogger(__name__)
 class SchedulerManager(manager.Manager):
     """Chooses a host to create volumes."""
 
-    RPC_API_VERSION = '1.5'
+    RPC_API_VERSION = '1.6'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -107,6 +107,27 @@ class SchedulerManager(manager.Manager):
         with flow_utils.DynamicLogListener(flow_engine, logger=LOG):
             flow_engine.run()
 
+    def create_volumes(self, context, topic, request_specs,
+                       filter_properties=None):
+        """Place a batch of volumes and return where they went.
+
+        Volumes that cannot be placed are set to error, and have a host of
+        None in the returned list of (volume_id, host) pairs.
+        """
+        results = self.driver.schedule_create_volumes(context,
+                                                      request_specs,
+                                                      filter_properties)
+        placements = []
+        for request_spec, (volume_id, host, ex) in zip(request_specs,
+                                                       results):
+            if host is None:
+                volume_state = {'volume_state': {'status': 'error'}}
+                self._set_volume_state_and_notify('create_volume',
+                                                  volume_state, context, ex,
+                                                  request_spec)
+            placements.append((volume_id, host))
+        return placements
+
     def request_service_capabilities(self, context):
         volume_rpcapi.VolumeAPI().publish_service_capabilities(context)
 
@@ -17,8 +17,10 @@ import json
 import uuid
 
 from lxml import etree
+import mock
 import webob
 
+from cinder.api.openstack import wsgi
 from cinder import context
 from cinder import db
 from cinder import test
@@ -103,6 +105,24 @@ class VolumeHostAttributeTest(test.TestCase):
         vol = json.loads(res.body)['volumes']
         self.assertNotIn('os-vol-host-attr:host', vol[0])
 
+    def test_list_detail_volumes_streamed(self):
+        self.flags(osapi_stream_list_responses=True)
+        ctx = context.RequestContext('admin', 'fake', True)
+        req = webob.Request.blank('/v2/fake/volumes/detail?all_tenants=1')
+        req.method = 'GET'
+        req.environ['cinder.context'] = ctx
+        # The attribute extensions extend the volumes as they are
+        # serialized, rather than building the whole list first.
+        with mock.patch.object(wsgi.StreamedList, '_materialize',
+                               side_effect=AssertionError('materialized')):
+            res = req.get_response(app())
+            body = res.body
+        self.assertEqual(200, res.status_int)
+        vol = json.loads(body)['volumes'][0]
+        self.assertEqual('host001', vol['os-vol-host-attr:host'])
+        self.assertEqual('fake', vol['os-vol-tenant-attr:tenant_id'])
+        self.assertEqual('fake2', vol['os-vol-mig-status-attr:name_id'])
+
     def test_list_simple_volumes_no_host(self):
         ctx = context.RequestContext('admin', 'fake', True)
         req = webob.Request.blank('/v2/fake/volumes')
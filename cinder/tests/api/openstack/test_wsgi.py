@@ -15,6 +15,7 @@ import webob
 
 from cinder.api.openstack import wsgi
 from cinder import exception
+from cinder.openstack.common import jsonutils
 from cinder import test
 from cinder.tests.api import fakes
 
@@ -184,6 +185,17 @@ class JSONDictSerializerTest(test.TestCase):
         result = result.replace('\n', '').replace(' ', '')
         self.assertEqual(result, expected_json)
 
+    def test_serialize_iter(self):
+        self.stubs.Set(wsgi, 'STREAM_CHUNK_SIZE', 20)
+        items = [{'id': i, 'name': 'volume%d' % i} for i in range(5)]
+        data = {'volumes': wsgi.StreamedList(iter(items)),
+                'volumes_links': [{'rel': 'next', 'href': 'fake'}]}
+        serializer = wsgi.JSONDictSerializer()
+        chunks = list(serializer.serialize_iter(data, 'volumes'))
+        self.assertTrue(len(chunks) > 3)
+        self.assertEqual(jsonutils.dumps(dict(data, volumes=items)),
+                         ''.join(chunks))
+
 
 class TextDeserializerTest(test.TestCase):
     def test_dispatch_default(self):
@@ -818,11 +830,78 @@ class ResourceTest(test.TestCase):
         self.assertEqual(response, 'foo')
 
 
+class StreamedListTest(test.TestCase):
+    def test_stream(self):
+        built = []
+
+        def views():
+            for i in range(3):
+                built.append(i)
+                yield {'id': i}
+
+        items = wsgi.StreamedList(views())
+        self.assertEqual([], built)
+        self.assertEqual([{'id': 0}, {'id': 1}, {'id': 2}],
+                         list(items.stream()))
+        self.assertEqual([0, 1, 2], built)
+
+    def test_iterate_keeps_items(self):
+        items = wsgi.StreamedList({'id': i} for i in range(3))
+        for item in items:
+            item['extended'] = True
+        self.assertEqual(3, len(items))
+        self.assertEqual([True] * 3,
+                         [item['extended'] for item in items.stream()])
+
+    def test_map_streamed(self):
+        built = []
+
+        def views():
+            for i in range(3):
+                built.append(i)
+                yield {'id': i}
+
+        items = wsgi.StreamedList(views())
+        wsgi.map_items(items, lambda item: item.update(extended=True))
+        self.assertEqual([], built)
+        self.assertEqual([True] * 3,
+                         [item['extended'] for item in items.stream()])
+
+    def test_map_built_items(self):
+        items = wsgi.StreamedList({'id': i} for i in range(3))
+        self.assertEqual(3, len(items))
+        wsgi.map_items(items, lambda item: item.update(extended=True))
+        self.assertEqual([True] * 3,
+                         [item['extended'] for item in items.stream()])
+
+    def test_map_list(self):
+        items = [{'id': i} for i in range(3)]
+        wsgi.map_items(items, lambda item: item.update(extended=True))
+        self.assertEqual([True] * 3, [item['extended'] for item in items])
+
+
 class ResponseObjectTest(test.TestCase):
     def test_default_code(self):
         robj = wsgi.ResponseObject({})
         self.assertEqual(robj.code, 200)
 
+    def test_serialize_streamed_list(self):
+        items = [{'id': i} for i in range(3)]
+        robj = wsgi.ResponseObject({'volumes': wsgi.StreamedList(items)})
+        response = robj.serialize(None, 'application/json',
+                                  {'json': wsgi.JSONDictSerializer})
+        self.assertIsNone(response.content_length)
+        self.assertEqual(jsonutils.dumps({'volumes': items}),
+                         response.body)
+
+    def test_serialize_streamed_list_unsupported(self):
+        items = [{'id': i} for i in range(3)]
+        robj = wsgi.ResponseObject({'volumes': wsgi.StreamedList(items)})
+        response = robj.serialize(None, 'application/xml',
+                                  {'xml': wsgi.XMLDictSerializer})
+        expected = wsgi.XMLDictSerializer().serialize({'volumes': items})
+        self.assertEqual(expected, response.body)
+
     def test_modified_code(self):
         robj = wsgi.ResponseObject({})
         robj._default_code = 202
@@ -15,6 +15,7 @@
 
 from lxml import etree
 
+from cinder.api.openstack import wsgi
 from cinder.api import xmlutil
 from cinder import test
 
@@ -654,6 +655,29 @@ class TemplateTest(test.TestCase):
         result = result.replace('\n', '').replace(' ', '')
         self.assertEqual(result, expected_xml)
 
+    def test_serialize_iter(self):
+        self.stubs.Set(xmlutil, 'STREAM_BATCH_SIZE', 2)
+        items = [{'id': str(i), 'name': 'vol<%d>' % i} for i in range(5)]
+        obj = {'volumes': items}
+
+        root = xmlutil.TemplateElement('volumes')
+        elem = xmlutil.SubTemplateElement(root, 'volume', selector='volumes')
+        elem.set('id')
+        elem.set('name')
+        serializer = xmlutil.MasterTemplate(
+            root, 1, nsmap={None: xmlutil.XMLNS_VOLUME_V2})
+
+        streamed = {'volumes': wsgi.StreamedList(iter(items))}
+        chunks = list(serializer.serialize_iter(streamed, 'volumes'))
+        # The root element, three batches of items, and its end.
+        self.assertEqual(5, len(chunks))
+        self.assertEqual(serializer.serialize(obj), ''.join(chunks))
+
+        streamed = {'volumes': wsgi.StreamedList([])}
+        self.assertEqual(serializer.serialize({'volumes': []}),
+                         ''.join(serializer.serialize_iter(streamed,
+                                                           'volumes')))
+
 
 class MasterTemplateBuilder(xmlutil.TemplateBuilder):
     def construct(self):
@@ -119,14 +119,27 @@ def stub_snapshot(id, **kwargs):
     return snapshot
 
 
-def stub_snapshot_get_all(self):
-    return [stub_snapshot(100, project_id='fake'),
-            stub_snapshot(101, project_id='superfake'),
-            stub_snapshot(102, project_id='superduperfake')]
-
-
-def stub_snapshot_get_all_by_project(self, context):
-    return [stub_snapshot(1)]
+def filter_and_page(items, filters=None, limit=None, offset=None):
+    """Filter and page items the way the snapshot DB listings do."""
+    if filters:
+        items = [item for item in items
+                 if all(item.get(key) == value
+                        for key, value in filters.items())]
+    start = offset or 0
+    end = start + limit if limit is not None else None
+    return items[start:end]
+
+
+def stub_snapshot_get_all(self, filters=None, limit=None, offset=None):
+    return filter_and_page([stub_snapshot(100, project_id='fake'),
+                            stub_snapshot(101, project_id='superfake'),
+                            stub_snapshot(102, project_id='superduperfake')],
+                           filters, limit, offset)
+
+
+def stub_snapshot_get_all_by_project(self, context, filters=None, limit=None,
+                                     offset=None):
+    return filter_and_page([stub_snapshot(1)], filters, limit, offset)
 
 
 def stub_snapshot_update(self, context, *args, **param):
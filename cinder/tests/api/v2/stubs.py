@@ -112,7 +112,8 @@ def stub_volume_get_db(context, volume_id):
 
 def stub_volume_get_all(context, search_opts=None, marker=None, limit=None,
                         sort_key='created_at', sort_dir='desc', filters=None,
-                        viewable_admin_meta=False):
+                        viewable_admin_meta=False,
+                        offset=None, columns=None):
     return [stub_volume(100, project_id='fake'),
             stub_volume(101, project_id='superfake'),
             stub_volume(102, project_id='superduperfake')]
@@ -120,7 +121,8 @@ def stub_volume_get_all(context, search_opts=None, marker=None, limit=None,
 
 def stub_volume_get_all_by_project(self, context, marker, limit, sort_key,
                                    sort_dir, filters=None,
-                                   viewable_admin_meta=False):
+                                   viewable_admin_meta=False,
+                                   offset=None, columns=None):
     filters = filters or {}
     return [stub_volume_get(self, context, '1')]
 
@@ -139,14 +141,27 @@ def stub_snapshot(id, **kwargs):
     return snapshot
 
 
-def stub_snapshot_get_all(self):
-    return [stub_snapshot(100, project_id='fake'),
-            stub_snapshot(101, project_id='superfake'),
-            stub_snapshot(102, project_id='superduperfake')]
+def filter_and_page(items, filters=None, limit=None, offset=None):
+    """Filter and page items the way the snapshot DB listings do."""
+    if filters:
+        items = [item for item in items
+                 if all(item.get(key) == value
+                        for key, value in filters.items())]
+    start = offset or 0
+    end = start + limit if limit is not None else None
+    return items[start:end]
 
 
-def stub_snapshot_get_all_by_project(self, context):
-    return [stub_snapshot(1)]
+def stub_snapshot_get_all(self, filters=None, limit=None, offset=None):
+    return filter_and_page([stub_snapshot(100, project_id='fake'),
+                            stub_snapshot(101, project_id='superfake'),
+                            stub_snapshot(102, project_id='superduperfake')],
+                           filters, limit, offset)
+
+
+def stub_snapshot_get_all_by_project(self, context, filters=None, limit=None,
+                                     offset=None):
+    return filter_and_page([stub_snapshot(1)], filters, limit, offset)
 
 
 def stub_snapshot_update(self, context, *args, **param):
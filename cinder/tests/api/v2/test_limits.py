@@ -18,6 +18,9 @@ Tests dealing with HTTP rate-limiting.
 """
 
 import httplib
+import os
+import shutil
+import tempfile
 
 from lxml import etree
 import six
@@ -564,6 +567,94 @@ class LimiterTest(BaseLimitTestSuite):
         self.assertEqual(expected, results)
 
 
+class SlidingWindowLimiterTest(BaseLimitTestSuite):
+
+    """Tests for the `limits.SlidingWindowLimiter` class."""
+
+    def setUp(self):
+        """Run before each test."""
+        super(SlidingWindowLimiterTest, self).setUp()
+        self.stubs.Set(limits.SlidingWindowLimiter, "_get_time",
+                       self._get_time)
+        self.userlimits = {'limits.user0': '(put, *, .*, 2, minute)'}
+        self.limiter = limits.SlidingWindowLimiter(TEST_LIMITS,
+                                                   **self.userlimits)
+        self.time = 30.0
+
+    def _check(self, num, verb, url, username=None, limiter=None):
+        """Check and yield results from checks."""
+        limiter = limiter or self.limiter
+        for x in xrange(num):
+            yield limiter.check_for_delay(verb, url, username)[0]
+
+    def test_delay_PUT(self):
+        """The 11th PUT waits for the next window to slide in."""
+        results = list(self._check(11, "PUT", "/anything"))
+        self.assertEqual([None] * 10, results[:10])
+        self.assertAlmostEqual(36.0, results[10])
+
+    def test_sliding_window(self):
+        """Requests of the previous window count for what is left of it."""
+        list(self._check(10, "PUT", "/anything"))
+
+        # Half of the previous window's requests still count.
+        self.time = 90.0
+        results = list(self._check(6, "PUT", "/anything"))
+        self.assertEqual([None] * 5, results[:5])
+        self.assertAlmostEqual(6.0, results[5])
+
+        self.time = 97.0
+        self.assertEqual([None], list(self._check(1, "PUT", "/anything")))
+
+    def test_user_limits(self):
+        results = list(self._check(3, "PUT", "/anything", "user0"))
+        self.assertEqual([None, None], results[:2])
+        self.assertTrue(results[2])
+        self.assertEqual([None] * 3,
+                         list(self._check(3, "PUT", "/anything", "user1")))
+
+    def test_get_limits(self):
+        list(self._check(3, "PUT", "/anything"))
+        put_limit = self.limiter.get_limits()[3]
+        self.assertEqual("PUT", put_limit["verb"])
+        self.assertEqual(7, put_limit["remaining"])
+        self.assertEqual(30, put_limit["resetTime"])
+
+    def test_shared_store(self):
+        """Limiters of several API workers share their counts."""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        store = os.path.join(tmpdir, 'ratelimit.sqlite')
+        worker1 = limits.SlidingWindowLimiter(TEST_LIMITS, store=store,
+                                              sync_interval='0')
+        worker2 = limits.SlidingWindowLimiter(TEST_LIMITS, store=store,
+                                              sync_interval='0')
+
+        self.assertEqual([None] * 6, list(self._check(6, "PUT", "/anything",
+                                                      limiter=worker1)))
+        # The last request of worker1 is not synced yet.
+        results = list(self._check(6, "PUT", "/anything", limiter=worker2))
+        self.assertEqual([None] * 5, results[:5])
+        self.assertTrue(results[5])
+
+    def test_batch_sync(self):
+        """Counts are only synced with the store every sync_interval."""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        limiter = limits.SlidingWindowLimiter(
+            TEST_LIMITS, store=os.path.join(tmpdir, 'ratelimit.sqlite'),
+            sync_interval='5')
+        self.stubs.Set(limiter.store, "add", self.mox.CreateMockAnything())
+        limiter.store.add({}, 30.0).AndReturn({})
+        limiter.store.add({'/3/0': [3, 120]}, 35.0).AndReturn({'/3/0': 3})
+        self.mox.ReplayAll()
+
+        list(self._check(3, "PUT", "/anything", limiter=limiter))
+        self.time = 35.0
+        list(self._check(1, "PUT", "/anything", limiter=limiter))
+        self.assertEqual(4, limiter._count('/3/0'))
+
+
 class WsgiLimiterTest(BaseLimitTestSuite):
 
     """Tests for `limits.WsgiLimiter` class."""
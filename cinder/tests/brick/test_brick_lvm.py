@@ -13,12 +13,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+
 import mox
 
 from cinder.brick import exception
 from cinder.brick.local_dev import lvm as brick
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import processutils
+from cinder.openstack.common import timeutils
 from cinder import test
 from cinder.volume import configuration as conf
 
@@ -265,3 +268,86 @@ class BrickLvmTestCase(test.TestCase):
 
     def test_get_mirrored_available_capacity(self):
         self.assertEqual(self.vg.vg_mirror_free_space(1), 2.0)
+
+    def test_get_volume_queries_named_lv(self):
+        commands = []
+
+        def fake_execute(*cmd, **kwargs):
+            commands.append(cmd)
+            return self.fake_execute(*cmd, **kwargs)
+
+        self.stubs.Set(processutils, 'execute', fake_execute)
+        self.assertEqual(self.vg.get_volume('fake-2')['name'], 'fake-2')
+        self.assertEqual(len(commands), 1)
+        self.assertEqual(commands[0][-1], 'fake-vg/fake-2')
+        self.assertIsNone(self.vg.get_volume('fake-non-existent'))
+
+    def test_get_volume_not_found(self):
+        for stderr in ('One or more specified logical volume(s) not found.',
+                       'Failed to find logical volume '
+                       '"fake-vg/fake-non-existent"'):
+            commands = []
+
+            def fake_execute(*cmd, **kwargs):
+                commands.append(cmd)
+                if cmd[-1] == 'fake-vg/fake-non-existent':
+                    raise processutils.ProcessExecutionError(stderr=stderr)
+                return self.fake_execute(*cmd, **kwargs)
+
+            self.stubs.Set(processutils, 'execute', fake_execute)
+            self.assertIsNone(self.vg.get_volume('fake-non-existent'))
+            self.assertEqual(len(commands), 1)
+        self.assertNotIn('get_volumes', self.vg.inventory_stats)
+
+    def test_get_volume_lists_vg_when_lv_query_fails(self):
+        def fake_execute(*cmd, **kwargs):
+            if cmd[-1] == 'fake-vg/fake-2':
+                raise processutils.ProcessExecutionError(
+                    stderr='fake-error')
+            return self.fake_execute(*cmd, **kwargs)
+
+        self.stubs.Set(processutils, 'execute', fake_execute)
+        self.assertEqual(self.vg.get_volume('fake-2')['name'], 'fake-2')
+        self.assertEqual(self.vg.inventory_stats['get_volumes'],
+                         {'executed': 1, 'saved': 0})
+
+    def test_inventory_cache(self):
+        self.addCleanup(timeutils.clear_time_override)
+        timeutils.set_time_override(datetime.datetime(2014, 1, 1))
+        self.vg.inventory_ttl = 60
+
+        self.vg.get_volume('fake-1')
+        self.vg.get_volume('fake-1')
+        self.assertEqual(self.vg.inventory_stats['get_volume'],
+                         {'executed': 1, 'saved': 1})
+
+        # A listing of the VG answers lookups of any LV.
+        self.vg.get_volumes()
+        self.assertEqual(self.vg.get_volume('fake-2')['name'], 'fake-2')
+        self.assertIsNone(self.vg.get_volume('fake-non-existent'))
+        self.vg.get_physical_volumes()
+        self.vg.get_physical_volumes()
+        self.vg.update_volume_group_info()
+        self.vg.update_volume_group_info()
+        self.assertEqual(self.vg.inventory_stats,
+                         {'get_volume': {'executed': 1, 'saved': 3},
+                          'get_volumes': {'executed': 1, 'saved': 0},
+                          'get_physical_volumes': {'executed': 1, 'saved': 1},
+                          'update_volume_group_info': {'executed': 1,
+                                                       'saved': 1}})
+
+        # Changing the VG drops the cache.
+        self.vg.create_thin_pool(size_str='1g')
+        self.vg.get_volume('fake-1')
+        self.vg.update_volume_group_info()
+        # The VG update looks up the new thin pool too.
+        self.assertEqual(self.vg.inventory_stats['get_volume'],
+                         {'executed': 3, 'saved': 3})
+        self.assertEqual(self.vg.inventory_stats['update_volume_group_info'],
+                         {'executed': 2, 'saved': 1})
+
+        # So does expiry.
+        timeutils.advance_time_seconds(61)
+        self.vg.get_volume('fake-1')
+        self.assertEqual(self.vg.inventory_stats['get_volume'],
+                         {'executed': 4, 'saved': 3})
@@ -149,8 +149,10 @@ class _FakeImageService(object):
         """Return list of detailed image information."""
         return copy.deepcopy(self.images.values())
 
-    def download(self, context, image_id, data):
+    def download(self, context, image_id, data=None):
         self.show(context, image_id)
+        if data is None:
+            return [self._imagedata.get(image_id, '')]
         data.write(self._imagedata.get(image_id, ''))
 
     def show(self, context, image_id):
@@ -87,6 +87,76 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
         self.assertIsNotNone(weighed_host.obj)
         self.assertTrue(_mock_service_get_all_by_topic.called)
 
+    @mock.patch('cinder.db.volume_update')
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    def test_schedule_create_volumes(self, _mock_service_get_all_by_topic,
+                                     _mock_volume_update):
+        self.flags(scheduler_host_state_refresh_interval=60)
+        sched = fakes.FakeFilterScheduler()
+        sched.host_manager = fakes.FakeHostManager()
+        sched.volume_rpcapi = mock.Mock()
+        fake_context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        fakes.mock_host_manager_db_calls(_mock_service_get_all_by_topic)
+
+        def _request_spec(volume_id, size):
+            return {'volume_id': volume_id,
+                    'snapshot_id': None,
+                    'image_id': None,
+                    'volume_type': {'name': 'LVM_iSCSI'},
+                    'volume_properties': {'project_id': 1,
+                                          'size': size}}
+
+        # host1 has the most free space, and room for one 800G volume.
+        request_specs = [_request_spec('fake-id%d' % i, 800)
+                         for i in xrange(3)]
+        request_specs.append(_request_spec('fake-id3', 1))
+
+        placements = sched.schedule_create_volumes(fake_context,
+                                                   request_specs, {})
+        self.assertEqual([('fake-id0', 'host1'), ('fake-id1', None),
+                          ('fake-id2', None), ('fake-id3', 'host2')],
+                         [placement[:2] for placement in placements])
+        for volume_id, host, ex in placements:
+            if host is None:
+                self.assertIsInstance(ex, exception.NoValidHost)
+            else:
+                self.assertIsNone(ex)
+        self.assertEqual(1, _mock_service_get_all_by_topic.call_count)
+        self.assertEqual(2, sched.volume_rpcapi.create_volume.call_count)
+        host_states = dict((host_state.host, host_state) for host_state in
+                           sched.host_manager.host_state_map.values())
+        self.assertEqual(800, host_states['host1'].allocated_capacity_gb)
+        self.assertEqual(1749, host_states['host2'].allocated_capacity_gb)
+
+    @mock.patch('cinder.db.volume_update')
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    def test_schedule_create_volumes_cast_error(
+            self, _mock_service_get_all_by_topic, _mock_volume_update):
+        sched = fakes.FakeFilterScheduler()
+        sched.host_manager = fakes.FakeHostManager()
+        sched.volume_rpcapi = mock.Mock()
+        ex = exception.CinderException('cast failed')
+        sched.volume_rpcapi.create_volume.side_effect = [ex, None]
+        fake_context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        fakes.mock_host_manager_db_calls(_mock_service_get_all_by_topic)
+
+        request_specs = [{'volume_id': 'fake-id%d' % i,
+                          'snapshot_id': None,
+                          'image_id': None,
+                          'volume_type': {'name': 'LVM_iSCSI'},
+                          'volume_properties': {'project_id': 1,
+                                                'size': 1}}
+                         for i in xrange(2)]
+
+        placements = sched.schedule_create_volumes(fake_context,
+                                                   request_specs, {})
+        self.assertEqual(('fake-id0', None, ex), placements[0])
+        self.assertEqual('fake-id1', placements[1][0])
+        self.assertIsNotNone(placements[1][1])
+        self.assertEqual(2, sched.volume_rpcapi.create_volume.call_count)
+
     def test_max_attempts(self):
         self.flags(scheduler_max_attempts=4)
 
@@ -193,6 +193,28 @@ class HostFiltersTestCase(test.TestCase):
 
         self.assertFalse(filt_cls.host_passes(host, filter_properties))
 
+    def test_affinity_filters_query_once(self):
+        hosts = [fakes.FakeHostState('host%d' % i, {}) for i in range(1, 4)]
+        volume1 = utils.create_volume(self.context, host='host1')
+        volume2 = utils.create_volume(self.context, host='host3')
+        filter_properties = {'context': self.context.elevated(),
+                             'scheduler_hints': {
+            'different_host': [volume1.id, volume2.id],
+            'same_host': volume2.id}}
+
+        different_filter = self.class_map['DifferentBackendFilter']()
+        same_filter = self.class_map['SameBackendFilter']()
+        with mock.patch.object(different_filter.volume_api, 'get_all',
+                               wraps=different_filter.volume_api.get_all) \
+                as mock_get_all:
+            self.assertEqual([hosts[1]],
+                             list(different_filter.filter_all(
+                                 hosts, filter_properties)))
+            self.assertEqual(1, mock_get_all.call_count)
+        self.assertEqual([hosts[2]],
+                         list(same_filter.filter_all(hosts,
+                                                     filter_properties)))
+
     def test_affinity_same_filter_no_list_passes(self):
         filt_cls = self.class_map['SameBackendFilter']()
         host = fakes.FakeHostState('host1', {})
@@ -16,12 +16,16 @@
 Tests For HostManager
 """
 
+import datetime
+
 import mock
 
 from oslo.config import cfg
 
 from cinder import exception
 from cinder.openstack.common.scheduler import filters
+from cinder.openstack.common.scheduler.filters import availability_zone_filter
+from cinder.openstack.common.scheduler.filters import capabilities_filter
 from cinder.openstack.common import timeutils
 from cinder.scheduler import host_manager
 from cinder import test
@@ -85,6 +89,90 @@ class HostManagerTestCase(test.TestCase):
         self.assertEqual(expected, mock_func.call_args_list)
         self.assertEqual(set(result), set(self.fake_hosts))
 
+    def _indexed_host(self, host, zone='zone1', **capabilities):
+        host_state = host_manager.HostState(
+            host, capabilities=capabilities,
+            service={'availability_zone': zone})
+        self.host_manager.host_state_map[host] = host_state
+        self.host_manager.host_index.update(host_state)
+        return host_state
+
+    def test_get_filtered_hosts_indexed(self):
+        self.host_manager.filter_classes = [FakeFilterClass1]
+        hosts = [self._indexed_host('host1', storage_protocol='iSCSI',
+                                    volume_backend_name='lvm'),
+                 self._indexed_host('host2', storage_protocol='FC',
+                                    volume_backend_name='lvm'),
+                 self._indexed_host('host3', zone='zone2',
+                                    storage_protocol='iSCSI',
+                                    volume_backend_name='lvm'),
+                 self._indexed_host('host4', volume_backend_name='lvm')]
+        unindexed = host_manager.HostState('host5')
+        fake_properties = {
+            'resource_type': {'extra_specs': {
+                'capabilities:storage_protocol': '<or> iSCSI <or> iSER',
+                'volume_backend_name': 'lvm',
+                'other:scope': 'ignored'}},
+            'request_spec': {
+                'resource_properties': {'availability_zone': 'zone1'}}}
+
+        with mock.patch.object(FakeFilterClass1, 'host_passes',
+                               return_value=True) as mock_passes:
+            self.host_manager.get_filtered_hosts(hosts + [unindexed],
+                                                 fake_properties,
+                                                 ['FakeFilterClass1'])
+            # Only indexed filters narrow down the hosts.
+            self.assertEqual(5, mock_passes.call_count)
+
+        self.host_manager.filter_classes = [
+            FakeFilterClass1, capabilities_filter.CapabilitiesFilter,
+            availability_zone_filter.AvailabilityZoneFilter]
+        with mock.patch.object(FakeFilterClass1, 'host_passes',
+                               return_value=True) as mock_passes:
+            result = self.host_manager.get_filtered_hosts(
+                hosts + [unindexed], fake_properties,
+                ['FakeFilterClass1', 'CapabilitiesFilter'])
+            self.assertEqual([mock.call(hosts[0], fake_properties),
+                              mock.call(hosts[2], fake_properties),
+                              mock.call(unindexed, fake_properties)],
+                             mock_passes.call_args_list)
+            self.assertEqual([hosts[0], hosts[2]], result)
+
+            mock_passes.reset_mock()
+            result = self.host_manager.get_filtered_hosts(
+                hosts, fake_properties,
+                ['FakeFilterClass1', 'CapabilitiesFilter',
+                 'AvailabilityZoneFilter'])
+            self.assertEqual([mock.call(hosts[0], fake_properties)],
+                             mock_passes.call_args_list)
+            self.assertEqual([hosts[0]], result)
+
+    def test_host_index_update(self):
+        host_state = self._indexed_host('host1', storage_protocol='iSCSI',
+                                        pools={'pool1': {}})
+        index = self.host_manager.host_index
+        self.assertEqual(set(['host1']),
+                         index.hosts_matching('storage_protocol', 'iSCSI'))
+        # Unhashable capabilities are left for the filter to check.
+        self.assertEqual(set(['host1']),
+                         index.hosts_matching('pools', 'pool2'))
+
+        host_state.update_capabilities({'storage_protocol': 'FC'},
+                                       {'availability_zone': 'zone2'})
+        index.update(host_state)
+        self.assertEqual(set(),
+                         index.hosts_matching('storage_protocol', 'iSCSI'))
+        self.assertEqual(set(['host1']),
+                         index.hosts_matching('storage_protocol', 'FC'))
+        self.assertEqual(set(), index.hosts_matching('pools', 'pool2'))
+        self.assertEqual(set(), index.hosts_in_zone('zone1'))
+        self.assertEqual(set(['host1']), index.hosts_in_zone('zone2'))
+
+        index.remove('host1')
+        self.assertFalse(index.indexes(host_state))
+        self.assertEqual(set(),
+                         index.hosts_matching('storage_protocol', 'FC'))
+
     @mock.patch('cinder.openstack.common.timeutils.utcnow')
     def test_update_service_capabilities(self, _mock_utcnow):
         service_states = self.host_manager.service_states
@@ -189,6 +277,88 @@ class HostManagerTestCase(test.TestCase):
             self.assertEqual(host_state_map[host].service,
                              volume_node)
 
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    @mock.patch('cinder.utils.service_is_up')
+    def test_get_all_host_states_cached(self, _mock_service_is_up,
+                                        _mock_service_get_all_by_topic):
+        self.flags(scheduler_host_state_refresh_interval=60)
+        context = 'fake_context'
+        services = [
+            dict(id=1, host='host1', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+        ]
+        _mock_service_get_all_by_topic.return_value = services
+        _mock_service_is_up.return_value = True
+
+        self.host_manager.get_all_host_states(context)
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(1, _mock_service_get_all_by_topic.call_count)
+        self.assertEqual({'served': 1, 'refreshed': 1},
+                         self.host_manager.host_state_cache_stats)
+
+        # Capability updates are applied to the cached host state.
+        capabilities = dict(total_capacity_gb=1024, free_capacity_gb=512,
+                            reserved_percentage=0)
+        self.host_manager.update_service_capabilities('volume', 'host1',
+                                                      capabilities)
+        host_states = list(self.host_manager.get_all_host_states(context))
+        self.assertEqual(1, _mock_service_get_all_by_topic.call_count)
+        self.assertEqual(512, host_states[0].free_capacity_gb)
+        self.assertEqual(services[0], host_states[0].service)
+
+        # An unknown host causes a refresh on the next request.
+        self.host_manager.update_service_capabilities('volume', 'host2',
+                                                      capabilities)
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(2, _mock_service_get_all_by_topic.call_count)
+
+        # And so does the refresh interval passing.
+        timeutils.set_time_override(timeutils.utcnow() +
+                                    datetime.timedelta(seconds=61))
+        self.addCleanup(timeutils.clear_time_override)
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(3, _mock_service_get_all_by_topic.call_count)
+        self.assertEqual({'served': 2, 'refreshed': 3},
+                         self.host_manager.host_state_cache_stats)
+
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    @mock.patch('cinder.utils.service_is_up')
+    def test_get_all_host_states_stale_stats(self, _mock_service_is_up,
+                                             _mock_service_get_all_by_topic):
+        self.flags(scheduler_max_stats_age=300)
+        context = 'fake_context'
+        now = timeutils.utcnow()
+        timeutils.set_time_override(now)
+        self.addCleanup(timeutils.clear_time_override)
+        _mock_service_get_all_by_topic.return_value = [
+            dict(id=1, host='host1', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=now),
+            dict(id=2, host='host2', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=now),
+            dict(id=3, host='host3', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=now),
+        ]
+        _mock_service_is_up.return_value = True
+        capabilities = dict(total_capacity_gb=1024, free_capacity_gb=512,
+                            reserved_percentage=0)
+        old = now - datetime.timedelta(seconds=301)
+        self.host_manager.update_service_capabilities(
+            'volume', 'host1',
+            dict(capabilities, stats_timestamp=timeutils.isotime(now)))
+        self.host_manager.update_service_capabilities(
+            'volume', 'host2',
+            dict(capabilities, stats_timestamp=timeutils.isotime(old)))
+        self.host_manager.update_service_capabilities('volume', 'host3',
+                                                      capabilities)
+
+        host_states = self.host_manager.get_all_host_states(context)
+        self.assertEqual(['host1', 'host3'],
+                         sorted(state.host for state in host_states))
+
+        self.flags(scheduler_max_stats_age=0)
+        host_states = self.host_manager.get_all_host_states(context)
+        self.assertEqual(3, len(list(host_states)))
+
 
 class HostStateTestCase(test.TestCase):
     """Test case for HostState class."""
@@ -102,6 +102,32 @@ class SchedulerManagerTestCase(test.TestCase):
         _mock_sched_create.assert_called_once_with(self.context, request_spec,
                                                    {})
 
+    @mock.patch('cinder.scheduler.driver.Scheduler.schedule_create_volumes')
+    @mock.patch('cinder.db.volume_update')
+    def test_create_volumes_unplaced_volume_in_error_state(
+            self, _mock_volume_update, _mock_sched_create):
+        # Volumes the batch could not place are put in 'error' state.
+        ex = exception.NoValidHost(reason="")
+        _mock_sched_create.return_value = [(1, 'host1', None), (2, None, ex)]
+        request_specs = [{'volume_id': 1}, {'volume_id': 2}]
+
+        set_state = self.manager._set_volume_state_and_notify
+        with mock.patch.object(self.manager,
+                               '_set_volume_state_and_notify') as mock_set:
+            mock_set.side_effect = set_state
+            placements = self.manager.create_volumes(self.context,
+                                                     'fake_topic',
+                                                     request_specs,
+                                                     filter_properties={})
+            mock_set.assert_called_once_with(
+                'create_volume', {'volume_state': {'status': 'error'}},
+                self.context, ex, request_specs[1])
+        self.assertEqual([(1, 'host1'), (2, None)], placements)
+        _mock_volume_update.assert_called_once_with(self.context, 2,
+                                                    {'status': 'error'})
+        _mock_sched_create.assert_called_once_with(self.context,
+                                                   request_specs, {})
+
     @mock.patch('cinder.scheduler.driver.Scheduler.host_passes_filters')
     @mock.patch('cinder.db.volume_update')
     def test_migrate_volume_exception_returns_volume_state(
@@ -226,6 +252,23 @@ class SchedulerDriverBaseTestCase(SchedulerTestCase):
                           self.context, self.topic, 'schedule_something',
                           *fake_args, **fake_kwargs)
 
+    @mock.patch('cinder.db.volume_get')
+    @mock.patch('cinder.scheduler.driver.Scheduler.schedule_create_volume')
+    def test_schedule_create_volumes_one_at_a_time(self, _mock_sched_create,
+                                                   _mock_volume_get):
+        ex = exception.NoValidHost(reason="")
+        _mock_sched_create.side_effect = [None, ex, None]
+        _mock_volume_get.return_value = {'host': 'fake_host'}
+        request_specs = [{'volume_id': i} for i in range(3)]
+
+        placements = self.driver.schedule_create_volumes(self.context,
+                                                         request_specs, None)
+        self.assertEqual([(0, 'fake_host', None), (1, None, ex),
+                          (2, 'fake_host', None)], placements)
+        self.assertEqual([mock.call(self.context, spec, {})
+                          for spec in request_specs],
+                         _mock_sched_create.call_args_list)
+
 
 class SchedulerDriverModuleTestCase(test.TestCase):
     """Test case for scheduler driver module methods."""
@@ -28,6 +28,7 @@ from cinder import exception
 from cinder.openstack.common import importutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import timeutils
+from cinder.openstack.common import units
 from cinder import test
 
 
@@ -204,6 +205,25 @@ class BackupTestCase(test.TestCase):
         self.assertEqual(backup['size'], vol_size)
         self.assertTrue(_mock_volume_backup.called)
 
+    @mock.patch('%s.%s' % (CONF.volume_driver, 'backup_volume'))
+    def test_create_backup_admission(self, _mock_volume_backup):
+        """Test backup creation waits for admission."""
+        vol_id = self._create_volume_db_entry(size=2)
+        backup_id = self._create_backup_db_entry(volume_id=vol_id)
+
+        def fake_backup_volume(context, backup, backup_service):
+            stats = self.backup_mgr.admission.stats()
+            self.assertEqual(1, stats['running'])
+            self.assertEqual(2 * units.Gi, stats['running_bytes'])
+
+        _mock_volume_backup.side_effect = fake_backup_volume
+        with mock.patch.object(self.backup_mgr.admission, 'admit',
+                               wraps=self.backup_mgr.admission.admit) as \
+                mock_admit:
+            self.backup_mgr.create_backup(self.ctxt, backup_id)
+        mock_admit.assert_called_once_with('default', 'fake', 2 * units.Gi)
+        self.assertEqual(0, self.backup_mgr.admission.stats()['running'])
+
     def test_restore_backup_with_bad_volume_status(self):
         """Test error handling when restoring a backup to a volume
         with a bad status.
@@ -0,0 +1,146 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests for the backup admission queue.
+
+"""
+
+import eventlet
+from eventlet import event
+
+from cinder.backup import admission
+from cinder import test
+
+
+class AdmissionQueueTestCase(test.TestCase):
+    """Test Case for AdmissionQueue."""
+
+    def setUp(self):
+        super(AdmissionQueueTestCase, self).setUp()
+        self.started = []
+        self.done = {}
+
+    def _run(self, queue, name, backend, project_id, size_bytes=0):
+        self.done[name] = event.Event()
+
+        def _operation():
+            with queue.admit(backend, project_id, size_bytes):
+                self.started.append(name)
+                self.done[name].wait()
+
+        return eventlet.spawn(_operation)
+
+    def _finish(self, name):
+        self.done[name].send()
+        eventlet.sleep(0)
+        eventlet.sleep(0)
+
+    def test_unlimited(self):
+        queue = admission.AdmissionQueue()
+        for i in range(5):
+            self._run(queue, i, 'b1', 'p1')
+        eventlet.sleep(0)
+        self.assertEqual(range(5), self.started)
+        self.assertEqual(0, queue.stats()['queue_depth'])
+        self.assertEqual(5, queue.stats()['running'])
+
+    def test_host_limit(self):
+        queue = admission.AdmissionQueue(max_running=2)
+        for i in range(4):
+            self._run(queue, i, 'b%d' % i, 'p1', 10)
+        eventlet.sleep(0)
+        self.assertEqual([0, 1], self.started)
+        stats = queue.stats()
+        self.assertEqual(2, stats['queue_depth'])
+        self.assertEqual(2, stats['running'])
+        self.assertEqual(20, stats['running_bytes'])
+        self.assertEqual(20, stats['waiting_bytes'])
+
+        self._finish(0)
+        self.assertEqual([0, 1, 2], self.started)
+        self._finish(1)
+        self._finish(2)
+        self._finish(3)
+        self.assertEqual([0, 1, 2, 3], self.started)
+        self.assertEqual(0, queue.stats()['running'])
+
+    def test_backend_limit(self):
+        queue = admission.AdmissionQueue(max_running_per_backend=1)
+        self._run(queue, 'a1', 'a', 'p1')
+        self._run(queue, 'a2', 'a', 'p1')
+        self._run(queue, 'b1', 'b', 'p1')
+        eventlet.sleep(0)
+        self.assertEqual(['a1', 'b1'], self.started)
+        stats = queue.stats()
+        self.assertEqual({'running': 1, 'waiting': 1, 'running_bytes': 0},
+                         stats['backends']['a'])
+
+        self._finish('b1')
+        self.assertEqual(['a1', 'b1'], self.started)
+        self._finish('a1')
+        self.assertEqual(['a1', 'b1', 'a2'], self.started)
+
+    def test_fair_share(self):
+        queue = admission.AdmissionQueue(max_running=1)
+        self._run(queue, 'p1-1', 'b1', 'p1')
+        self._run(queue, 'p1-2', 'b1', 'p1')
+        self._run(queue, 'p1-3', 'b1', 'p1')
+        self._run(queue, 'p2-1', 'b1', 'p2')
+        eventlet.sleep(0)
+        self.assertEqual(['p1-1'], self.started)
+
+        # p2 was never admitted, so it goes before p1's queued operations
+        self._finish('p1-1')
+        self.assertEqual(['p1-1', 'p2-1'], self.started)
+        self.assertEqual(2, queue.stats()['queue_depth'])
+        self._finish('p2-1')
+        self._finish('p1-2')
+        self.assertEqual(['p1-1', 'p2-1', 'p1-2', 'p1-3'], self.started)
+
+    def test_fair_share_running_project(self):
+        queue = admission.AdmissionQueue(max_running=2)
+        self._run(queue, 'p1-1', 'b1', 'p1')
+        self._run(queue, 'p2-1', 'b1', 'p2')
+        self._run(queue, 'p1-2', 'b1', 'p1')
+        self._run(queue, 'p1-3', 'b1', 'p1')
+        self._run(queue, 'p2-2', 'b1', 'p2')
+        eventlet.sleep(0)
+        self.assertEqual(['p1-1', 'p2-1'], self.started)
+
+        # p1 still has an operation running and p2 does not
+        self._finish('p2-1')
+        self.assertEqual(['p1-1', 'p2-1', 'p2-2'], self.started)
+
+    def test_operation_failure_releases_slot(self):
+        queue = admission.AdmissionQueue(max_running=1)
+
+        def _failing_operation():
+            with queue.admit('b1', 'p1'):
+                raise ValueError()
+
+        self.assertRaises(ValueError, _failing_operation)
+        self.assertEqual(0, queue.stats()['running'])
+        self._run(queue, 'next', 'b1', 'p1')
+        eventlet.sleep(0)
+        self.assertEqual(['next'], self.started)
+
+    def test_killed_while_waiting(self):
+        queue = admission.AdmissionQueue(max_running=1)
+        self._run(queue, 'first', 'b1', 'p1')
+        waiting = self._run(queue, 'second', 'b1', 'p1')
+        eventlet.sleep(0)
+        self.assertEqual(1, queue.stats()['queue_depth'])
+        waiting.kill()
+        self.assertEqual(0, queue.stats()['queue_depth'])
+        self._finish('first')
+        self.assertEqual(['first'], self.started)
+        self.assertEqual(0, queue.stats()['running'])
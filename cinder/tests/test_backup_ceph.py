@@ -190,6 +190,7 @@ class BackupCephTestCase(test.TestCase):
         mock_exec = mock.Mock()
         mock_exec.side_effect = processutils.ProcessExecutionError
 
+        self.stubs.Set(rbddriver, '_rados_connection_pool', None)
         self.service = ceph.CephBackupDriver(self.ctxt, execute=mock_exec)
 
         # Ensure that time.time() always returns more than the last time it was
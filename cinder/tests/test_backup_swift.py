@@ -23,6 +23,7 @@ import os
 import tempfile
 import zlib
 
+import eventlet
 from swiftclient import client as swift
 
 from cinder.backup.drivers.swift import SwiftBackupDriver
@@ -33,6 +34,7 @@ from cinder.openstack.common.gettextutils import _
 from cinder.openstack.common import log as logging
 from cinder import test
 from cinder.tests.backup.fake_swift_client import FakeSwiftClient
+from cinder.tests.backup.fake_swift_client import FakeSwiftConnection
 
 
 LOG = logging.getLogger(__name__)
@@ -56,11 +58,13 @@ class BackupSwiftTestCase(test.TestCase):
                'status': 'available'}
         return db.volume_create(self.ctxt, vol)['id']
 
-    def _create_backup_db_entry(self, container='test-container'):
-        backup = {'id': 123,
+    def _create_backup_db_entry(self, container='test-container',
+                                backup_id=123, parent_id=None):
+        backup = {'id': backup_id,
                   'size': 1,
                   'container': container,
-                  'volume_id': '1234-5678-1234-8888'}
+                  'volume_id': '1234-5678-1234-8888',
+                  'parent_id': parent_id}
         return db.backup_create(self.ctxt, backup)['id']
 
     def setUp(self):
@@ -129,6 +133,204 @@ class BackupSwiftTestCase(test.TestCase):
                           service.backup,
                           backup, self.volume_file)
 
+    def test_backup_pipelined(self):
+        self._create_backup_db_entry()
+        self.flags(backup_swift_object_size=16 * 1024)
+        self.flags(backup_swift_upload_concurrency=4)
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 123)
+
+        real_put_object = FakeSwiftConnection.put_object
+        delays = {}
+
+        def slow_put_object(conn, container, name, reader, **kwargs):
+            # Make earlier chunks finish last.
+            delays.setdefault(name, 0.001 * (8 - len(delays)))
+            eventlet.sleep(delays[name])
+            return real_put_object(conn, container, name, reader, **kwargs)
+
+        self.stubs.Set(FakeSwiftConnection, 'put_object', slow_put_object)
+
+        written = {}
+
+        def fake_write_metadata(self, backup, volume_id, container,
+                                object_list, volume_meta):
+            written['objects'] = object_list
+
+        self.stubs.Set(SwiftBackupDriver, '_write_metadata',
+                       fake_write_metadata)
+        service.backup(backup, self.volume_file)
+
+        names = [obj.keys()[0] for obj in written['objects']]
+        self.assertEqual(8, len(names))
+        self.assertEqual(sorted(names), names)
+        offsets = [obj.values()[0]['offset'] for obj in written['objects']]
+        self.assertEqual([16 * 1024 * i for i in range(1, 9)], offsets)
+        backup = db.backup_get(self.ctxt, 123)
+        self.assertEqual(9, backup['object_count'])
+
+    def test_backup_pipelined_wraps_socket_error(self):
+        container_name = 'socket_error_on_put'
+        self._create_backup_db_entry(container=container_name)
+        self.flags(backup_swift_object_size=16 * 1024)
+        self.flags(backup_swift_upload_concurrency=4)
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 123)
+        self.assertRaises(exception.SwiftConnectionFailed,
+                          service.backup,
+                          backup, self.volume_file)
+
+    def _stub_metadata_store(self):
+        """Keep written backup metadata so that it can be read back."""
+        store = {}
+
+        def fake_write_metadata(self, backup, volume_id, container,
+                                object_list, volume_meta):
+            store[backup['id']] = {'version': self.DRIVER_VERSION,
+                                   'objects': object_list}
+
+        def fake_read_metadata(self, backup):
+            return store[backup['id']]
+
+        self.stubs.Set(SwiftBackupDriver, '_write_metadata',
+                       fake_write_metadata)
+        self.stubs.Set(SwiftBackupDriver, '_read_metadata',
+                       fake_read_metadata)
+        return store
+
+    def test_backup_incremental(self):
+        self.flags(backup_swift_object_size=16 * 1024)
+        self.flags(backup_compression_algorithm='none')
+        store = self._stub_metadata_store()
+        self._create_backup_db_entry()
+        self._create_backup_db_entry(container='other-container',
+                                     backup_id=124, parent_id=123)
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        service.backup(db.backup_get(self.ctxt, 123), self.volume_file)
+        self.assertEqual(8, len(store['123']['objects']))
+
+        # Change the third chunk only.
+        self.volume_file.seek(2 * 16 * 1024)
+        self.volume_file.write(os.urandom(1024))
+        self.volume_file.seek(0)
+
+        uploaded = []
+        real_put_object = FakeSwiftConnection.put_object
+
+        def fake_put_object(conn, container, name, reader, **kwargs):
+            uploaded.append(name)
+            return real_put_object(conn, container, name, reader, **kwargs)
+
+        self.stubs.Set(FakeSwiftConnection, 'put_object', fake_put_object)
+        service.backup(db.backup_get(self.ctxt, 124), self.volume_file)
+
+        self.assertEqual(1, len(uploaded))
+        objects = store['124']['objects']
+        self.assertEqual(8, len(objects))
+        self.assertEqual(uploaded[0], objects[2].keys()[0])
+        for i, obj in enumerate(objects):
+            entry = obj.values()[0]
+            if i == 2:
+                self.assertNotIn('container', entry)
+            else:
+                self.assertEqual('test-container', entry['container'])
+                self.assertEqual(store['123']['objects'][i].keys(), obj.keys())
+        backup = db.backup_get(self.ctxt, 124)
+        self.assertEqual(2, backup['object_count'])
+
+    def test_backup_zero_chunks(self):
+        self.flags(backup_swift_object_size=16 * 1024)
+        store = self._stub_metadata_store()
+        self._create_backup_db_entry()
+        for chunk in (2, 7):
+            self.volume_file.seek(chunk * 16 * 1024)
+            self.volume_file.write('\0' * 16 * 1024)
+        self.volume_file.seek(0)
+
+        uploaded = []
+        real_put_object = FakeSwiftConnection.put_object
+
+        def fake_put_object(conn, container, name, reader, **kwargs):
+            uploaded.append(name)
+            return real_put_object(conn, container, name, reader, **kwargs)
+
+        self.stubs.Set(FakeSwiftConnection, 'put_object', fake_put_object)
+        service = SwiftBackupDriver(self.ctxt)
+        service.backup(db.backup_get(self.ctxt, 123), self.volume_file)
+
+        self.assertEqual(6, len(uploaded))
+        objects = store['123']['objects']
+        self.assertEqual(8, len(objects))
+        for chunk in (2, 7):
+            extent = {'offset': (chunk + 1) * 16 * 1024, 'length': 16 * 1024}
+            self.assertEqual({'zero_extent': extent}, objects[chunk])
+
+    def test_restore_zero_extent(self):
+        store = self._stub_metadata_store()
+        self._create_backup_db_entry()
+        store['123'] = {'version': '2.0.0', 'objects': [
+            {'zero_extent': {'offset': 4096, 'length': 4096}},
+            {'backup_001': {'compression': 'none', 'length': 10,
+                            'offset': 20, 'sha256': 'fake'}},
+            {'zero_extent': {'offset': 8192, 'length': 4096}},
+            {'backup_002': {'compression': 'none', 'length': 10,
+                            'offset': 30, 'sha256': 'fake'}},
+            {'backup_003': {'compression': 'none', 'length': 10,
+                            'offset': 40, 'sha256': 'fake'}},
+            {'zero_extent': {'offset': 12288, 'length': 4096}}]}
+
+        def fake_get_object(conn, container, name):
+            return None, 'x' * 10
+
+        self.stubs.Set(FakeSwiftConnection, 'get_object', fake_get_object)
+        service = SwiftBackupDriver(self.ctxt)
+        with tempfile.NamedTemporaryFile() as volume_file:
+            volume_file.write('y' * 20000)
+            volume_file.seek(0)
+            backup = db.backup_get(self.ctxt, 123)
+            service.restore(backup, '1234-5678-1234-8888', volume_file)
+            volume_file.seek(0)
+            restored = volume_file.read()
+        self.assertEqual('\0' * 4096 + 'x' * 10 + '\0' * 4096 + 'x' * 20 +
+                         '\0' * 4096 + 'y' * (20000 - 3 * 4096 - 30),
+                         restored)
+
+    def test_restore_incremental(self):
+        self.flags(backup_swift_object_size=16 * 1024)
+        store = self._stub_metadata_store()
+        self._create_backup_db_entry(container='other-container',
+                                     backup_id=124, parent_id=123)
+        store['124'] = {'version': '2.0.0', 'objects': [
+            {'parent-00001': {'compression': 'zlib', 'length': 10,
+                              'offset': 10, 'sha256': 'fake',
+                              'container': 'test-container'}},
+            {'backup_001': {'compression': 'zlib', 'length': 10,
+                            'offset': 20, 'sha256': 'fake'}},
+            {'backup_002': {'compression': 'zlib', 'length': 10,
+                            'offset': 30, 'sha256': 'fake'}},
+            {'backup_003': {'compression': 'zlib', 'length': 10,
+                            'offset': 40, 'sha256': 'fake'}}]}
+
+        fetched = []
+        real_get_object = FakeSwiftConnection.get_object
+
+        def fake_get_object(conn, container, name):
+            fetched.append((container, name))
+            return real_get_object(conn, container, name)
+
+        self.stubs.Set(FakeSwiftConnection, 'get_object', fake_get_object)
+        service = SwiftBackupDriver(self.ctxt)
+        with tempfile.NamedTemporaryFile() as volume_file:
+            backup = db.backup_get(self.ctxt, 124)
+            service.restore(backup, '1234-5678-1234-8888', volume_file)
+        self.assertEqual([('test-container', 'parent-00001'),
+                          ('other-container', 'backup_001'),
+                          ('other-container', 'backup_002'),
+                          ('other-container', 'backup_003')], fetched)
+
     def test_backup_backup_metadata_fail(self):
         """Test of when an exception occurs in backup().
 
@@ -193,6 +395,53 @@ class BackupSwiftTestCase(test.TestCase):
             backup = db.backup_get(self.ctxt, 123)
             service.restore(backup, '1234-5678-1234-8888', volume_file)
 
+    def test_restore_prefetch(self):
+        store = self._stub_metadata_store()
+        self._create_backup_db_entry()
+        store['123'] = {'version': '2.0.0', 'objects': [
+            {'backup_001': {'compression': 'zlib', 'length': 10}},
+            {'backup_002': {'compression': 'zlib', 'length': 10}},
+            {'backup_003': {'compression': 'zlib', 'length': 10}}]}
+        self.flags(backup_swift_restore_prefetch=1)
+        service = SwiftBackupDriver(self.ctxt)
+
+        events = []
+        real_get_object = FakeSwiftConnection.get_object
+
+        def fake_get_object(conn, container, name):
+            events.append('get %s' % name)
+            return real_get_object(conn, container, name)
+
+        self.stubs.Set(FakeSwiftConnection, 'get_object', fake_get_object)
+
+        class RecordingFile(object):
+            def __init__(self, volume_file):
+                self.volume_file = volume_file
+
+            def write(self, data):
+                events.append('write')
+                self.volume_file.write(data)
+
+            def __getattr__(self, name):
+                return getattr(self.volume_file, name)
+
+        with tempfile.NamedTemporaryFile() as volume_file:
+            backup = db.backup_get(self.ctxt, 123)
+            service.restore(backup, '1234-5678-1234-8888',
+                            RecordingFile(volume_file))
+            self.assertEqual(3 * 1024 * 1024,
+                             os.path.getsize(volume_file.name))
+
+        gets = [event for event in events if event != 'write']
+        self.assertEqual(['get backup_001', 'get backup_002',
+                          'get backup_003'], gets)
+        writes = [i for i, event in enumerate(events) if event == 'write']
+        self.assertEqual(3, len(writes))
+        # The download of each following object is issued before the
+        # previous object has been written to the volume.
+        self.assertLess(events.index('get backup_002'), writes[0])
+        self.assertLess(events.index('get backup_003'), writes[1])
+
     def test_restore_wraps_socket_error(self):
         container_name = 'socket_error_on_get'
         self._create_backup_db_entry(container=container_name)
@@ -239,3 +488,39 @@ class BackupSwiftTestCase(test.TestCase):
         compressor = service._get_compressor('bz2')
         self.assertEqual(compressor, bz2)
         self.assertRaises(ValueError, service._get_compressor, 'fake')
+
+    def test_get_compressor_plugins(self):
+        self.flags(backup_compression_plugins={'Fake': 'zlib',
+                                               'fake2': 'os',
+                                               'fake3': 'cinder.fake'})
+        service = SwiftBackupDriver(self.ctxt)
+        self.assertEqual(zlib, service._get_compressor('fake'))
+        # Modules without compress and decompress are not compressors
+        self.assertRaises(ValueError, service._get_compressor, 'fake2')
+        self.assertRaises(ValueError, service._get_compressor, 'fake3')
+
+    def _backup_compression_fields(self):
+        store = self._stub_metadata_store()
+        self._create_backup_db_entry()
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        service.backup(db.backup_get(self.ctxt, 123), self.volume_file)
+        return [obj.values()[0]['compression']
+                for obj in store['123']['objects']]
+
+    def test_backup_compression_adaptive(self):
+        self.flags(backup_swift_object_size=128 * 1024)
+        self.flags(backup_compression_adaptive=True)
+        self.flags(backup_compression_algorithm='zlib')
+        self.volume_file.seek(0)
+        self.volume_file.write('a' * 64 * 1024)
+        # The second chunk is random data, which does not compress
+        self.volume_file.write(os.urandom(64 * 1024))
+        self.volume_file.write(os.urandom(128 * 1024))
+        self.assertEqual(['zlib', 'none'], self._backup_compression_fields())
+
+    def test_backup_compression_threads(self):
+        self.flags(backup_swift_object_size=16 * 1024)
+        self.flags(backup_swift_upload_concurrency=4)
+        self.flags(backup_compression_threads=2)
+        self.assertEqual(['zlib'] * 8, self._backup_compression_fields())
@@ -0,0 +1,127 @@
+# Copyright (c) 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the in-process block copy engine."""
+
+import errno
+import os
+import shutil
+import tempfile
+import time
+
+import mock
+
+from cinder import test
+from cinder.volume import block_copy
+
+
+class TokenBucketTestCase(test.TestCase):
+    def setUp(self):
+        super(TokenBucketTestCase, self).setUp()
+        self.now = 0.0
+        self.sleeps = []
+
+    def _sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def _bucket(self, rate):
+        return block_copy.TokenBucket(rate, clock=lambda: self.now,
+                                      sleep=self._sleep)
+
+    def test_burst(self):
+        bucket = self._bucket(100)
+        bucket.consume(60)
+        bucket.consume(40)
+        self.assertEqual([], self.sleeps)
+
+    def test_limits_rate(self):
+        bucket = self._bucket(100)
+        for i in range(5):
+            bucket.consume(100)
+        self.assertEqual([1.0, 1.0, 1.0, 1.0], self.sleeps)
+
+    def test_refills(self):
+        bucket = self._bucket(100)
+        bucket.consume(100)
+        self.now += 0.5
+        bucket.consume(50)
+        self.assertEqual([], self.sleeps)
+
+
+class BlockCopyTestCase(test.TestCase):
+    BLOCKSIZE = 4096
+    DATA = ('a' * 5000 + '\0' * 8192 + 'b' * 100 + '\0' * 9000)
+
+    def setUp(self):
+        super(BlockCopyTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.src = os.path.join(self.tmpdir, 'src')
+        self.dst = os.path.join(self.tmpdir, 'dst')
+        with open(self.src, 'w') as f:
+            f.write(self.DATA)
+
+    def _read_dst(self):
+        with open(self.dst) as f:
+            return f.read()
+
+    def test_copy(self):
+        progress = []
+        copied = block_copy.copy(self.src, self.dst, 2 * len(self.DATA),
+                                 self.BLOCKSIZE,
+                                 progress=lambda *args: progress.append(args))
+        self.assertEqual(len(self.DATA), copied)
+        self.assertEqual(self.DATA, self._read_dst())
+        self.assertEqual([(len(self.DATA), 2 * len(self.DATA))], progress)
+
+    def test_copy_size(self):
+        copied = block_copy.copy(self.src, self.dst, 6000, self.BLOCKSIZE,
+                                 direct=False)
+        self.assertEqual(6000, copied)
+        self.assertEqual(self.DATA[:6000], self._read_dst())
+
+    def test_copy_truncates_file(self):
+        with open(self.dst, 'w') as f:
+            f.write('x' * 2 * len(self.DATA))
+        block_copy.copy(self.src, self.dst, len(self.DATA), self.BLOCKSIZE,
+                        sync=True)
+        self.assertEqual(self.DATA, self._read_dst())
+
+    def test_copy_unaligned_blocksize(self):
+        block_copy.copy(self.src, self.dst, len(self.DATA), 1000)
+        self.assertEqual(self.DATA, self._read_dst())
+
+    def test_copy_write_error_waits_for_read(self):
+        read_block = block_copy._read_block
+        reads = []
+
+        def slow_read(src, buf):
+            time.sleep(0.1)
+            length = read_block(src, buf)
+            reads.append(src.closed)
+            return length
+
+        with mock.patch.object(block_copy, '_read_block', slow_read):
+            with mock.patch.object(block_copy, '_write_block',
+                                   side_effect=IOError(errno.EIO, 'fail')):
+                self.assertRaises(IOError, block_copy.copy, self.src,
+                                  self.dst, len(self.DATA), self.BLOCKSIZE)
+        # The block read ahead of the failed write finished before src
+        # was closed.
+        self.assertEqual([False, False], reads)
+
+    def test_can_copy(self):
+        self.assertTrue(block_copy.can_copy(self.src, self.dst))
+        self.assertFalse(block_copy.can_copy(self.dst, self.src))
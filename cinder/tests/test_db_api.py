@@ -16,10 +16,12 @@
 
 import datetime
 
+import mock
 from oslo.config import cfg
 
 from cinder import context
 from cinder import db
+from cinder.db.sqlalchemy import api as sqlalchemy_api
 from cinder import exception
 from cinder.openstack.common import uuidutils
 from cinder.quota import ReservableResource
@@ -370,6 +372,24 @@ class DBAPIVolumeTestCase(BaseTest):
         self._assertEqualListsOfObjects(volumes[2:], db.volume_get_all(
                                         self.ctxt, 2, 2, 'id', None))
 
+    def test_volume_get_all_offset_columns(self):
+        for i in xrange(1, 5):
+            db.volume_create(self.ctxt, {'id': i, 'project_id': 'p1',
+                                         'display_name': 'vol%d' % i,
+                                         'metadata': {'key': 'value'}})
+
+        volumes = db.volume_get_all_by_project(self.ctxt, 'p1', None, 2,
+                                               'id', 'asc', offset=1,
+                                               columns=['id',
+                                                        'display_name'])
+        self.assertEqual([{'id': '2', 'display_name': 'vol2'},
+                          {'id': '3', 'display_name': 'vol3'}], volumes)
+
+        volumes = db.volume_get_all(self.ctxt, '2', None, 'id', 'asc',
+                                    filters={'metadata': {'key': 'value'}},
+                                    columns=['id'])
+        self.assertEqual([{'id': '3'}, {'id': '4'}], volumes)
+
     def test_volume_get_all_by_host(self):
         volumes = []
         for i in xrange(3):
@@ -667,6 +687,20 @@ class DBAPIVolumeTestCase(BaseTest):
         self.assertRaises(exception.VolumeNotFound, db.volume_update,
                           self.ctxt, 42, {})
 
+    def test_volume_update_all_by_ids(self):
+        volumes = [db.volume_create(self.ctxt, {'status': 'in-use'})
+                   for i in range(3)]
+        self.assertEqual(2, db.volume_update_all_by_ids(
+            self.ctxt, [volumes[0]['id'], volumes[2]['id']],
+            {'status': 'error'}))
+        self.assertEqual(['error', 'in-use', 'error'],
+                         [db.volume_get(self.ctxt, volume['id'])['status']
+                          for volume in volumes])
+
+    def test_volume_update_all_by_ids_no_ids(self):
+        self.assertEqual(0, db.volume_update_all_by_ids(self.ctxt, [],
+                                                        {'status': 'error'}))
+
     def test_volume_metadata_get(self):
         metadata = {'a': 'b', 'c': 'd'}
         db.volume_create(self.ctxt, {'id': 1, 'metadata': metadata})
@@ -724,6 +758,28 @@ class DBAPISnapshotTestCase(BaseTest):
                                         db.snapshot_get_all(self.ctxt),
                                         ignored_keys=['metadata', 'volume'])
 
+    def test_snapshot_get_all_filters_and_pages(self):
+        db.volume_create(self.ctxt, {'id': 1})
+        snapshots = [db.snapshot_create(self.ctxt,
+                                        {'id': i + 1, 'volume_id': 1,
+                                         'project_id': 'project1',
+                                         'status': status})
+                     for i, status in enumerate(['available', 'error',
+                                                 'available', 'available'])]
+        available = [snapshots[0], snapshots[2], snapshots[3]]
+        self._assertEqualListsOfObjects(
+            available,
+            db.snapshot_get_all(self.ctxt, filters={'status': 'available'}),
+            ignored_keys=['metadata', 'volume'])
+        self._assertEqualListsOfObjects(
+            available[1:2],
+            db.snapshot_get_all_by_project(self.ctxt, 'project1',
+                                           filters={'status': 'available'},
+                                           limit=1, offset=1),
+            ignored_keys=['metadata', 'volume'])
+        self.assertEqual([], db.snapshot_get_all(self.ctxt,
+                                                 filters={'fake': 'x'}))
+
     def test_snapshot_metadata_get(self):
         metadata = {'a': 'b', 'c': 'd'}
         db.volume_create(self.ctxt, {'id': 1})
@@ -1062,6 +1118,45 @@ class DBAPIQuotaTestCase(BaseTest):
                           'volumes': {'reserved': 1, 'in_use': 0}},
                          quota_usage)
 
+    def test_quota_reserve_conditional(self):
+        resources = {'volumes': ReservableResource('volumes',
+                                                   '_sync_volumes'),
+                     'gigabytes': ReservableResource('gigabytes',
+                                                     '_sync_gigabytes')}
+        quotas = {'volumes': 2, 'gigabytes': 10}
+        deltas = {'volumes': 1, 'gigabytes': 5}
+        expire = datetime.datetime.utcnow() + datetime.timedelta(days=1)
+
+        # The usages are created by the locking path.
+        db.quota_reserve(self.ctxt, resources, quotas, deltas, expire,
+                         0, 0, project_id='project1')
+        with mock.patch.object(sqlalchemy_api,
+                               '_get_quota_usages') as locked:
+            reservations = db.quota_reserve(self.ctxt, resources, quotas,
+                                            deltas, expire, 0, 0,
+                                            project_id='project1')
+            self.assertFalse(locked.called)
+        self.assertEqual(2, len(reservations))
+        expected = {'project_id': 'project1',
+                    'gigabytes': {'reserved': 10, 'in_use': 0},
+                    'volumes': {'reserved': 2, 'in_use': 0}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+
+        # Over quota falls back to the locking path, which raises.
+        self.assertRaises(exception.OverQuota, db.quota_reserve, self.ctxt,
+                          resources, quotas, deltas, expire, 0, 0,
+                          project_id='project1')
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+
+        db.reservation_commit(self.ctxt, reservations, 'project1')
+        expected = {'project_id': 'project1',
+                    'gigabytes': {'reserved': 5, 'in_use': 5},
+                    'volumes': {'reserved': 1, 'in_use': 1}}
+        self.assertEqual(expected, db.quota_usage_get_all_by_project(
+            self.ctxt, 'project1'))
+
     def test_quota_destroy(self):
         db.quota_create(self.ctxt, 'project1', 'resource1', 41)
         self.assertIsNone(db.quota_destroy(self.ctxt, 'project1',
@@ -1157,7 +1252,8 @@ class DBAPIBackupTestCase(BaseTest):
             'service_metadata': 'metadata',
             'service': 'service',
             'size': 1000,
-            'object_count': 100}
+            'object_count': 100,
+            'parent_id': 'parent'}
         if one:
             return base_values
 
@@ -1197,6 +1293,17 @@ class DBAPIBackupTestCase(BaseTest):
         filtered_backups = db.backup_get_all(self.ctxt, filters=filters)
         self._assertEqualListsOfObjects([self.created[1]], filtered_backups)
 
+    def test_backup_get_all_paged(self):
+        ordered = sorted(self.created,
+                         key=lambda b: (b['created_at'], b['id']))
+        paged = db.backup_get_all(self.ctxt, limit=1, offset=1)
+        self._assertEqualListsOfObjects(ordered[1:2], paged)
+
+        paged = db.backup_get_all_by_project(self.ctxt,
+                                             self.created[1]['project_id'],
+                                             limit=1, offset=1)
+        self.assertEqual([], paged)
+
     def test_backup_get_all_by_host(self):
         byhost = db.backup_get_all_by_host(self.ctxt,
                                            self.created[1]['host'])
@@ -338,6 +338,8 @@ class HP3PARBaseDriver(object):
         configuration.hp3par_snapshot_expiration = ""
         configuration.hp3par_snapshot_retention = ""
         configuration.hp3par_iscsi_ips = []
+        configuration.hp3par_session_timeout = 0
+        configuration.hp3par_lookup_cache_time = 0
         return configuration
 
     @mock.patch(
@@ -1922,6 +1924,59 @@ class TestHP3PARFCDriver(HP3PARBaseDriver, test.TestCase):
         self.driver.common.client.deleteCPG(HP3PAR_CPG)
         self.driver.common.client.createCPG(HP3PAR_CPG, {})
 
+    def test_session_reuse(self):
+        conf = self.setup_configuration()
+        conf.hp3par_session_timeout = 600
+        mock_client = self.setup_mock_client(
+            conf=conf,
+            driver=hpfcdriver.HP3PARFCDriver)
+
+        self.driver.create_volume(self.volume)
+        self.driver.delete_volume(self.volume)
+        mock_client.login.assert_called_once_with(HP3PAR_USER_NAME,
+                                                  HP3PAR_USER_PASS)
+        self.assertFalse(mock_client.logout.called)
+
+        # the session has been idle for longer than the timeout
+        self.driver.common._session_released -= 600
+        self.driver.delete_volume(self.volume)
+        self.assertEqual(2, mock_client.login.call_count)
+        mock_client.logout.assert_called_once_with()
+
+    def test_session_renewed_when_rejected(self):
+        conf = self.setup_configuration()
+        conf.hp3par_session_timeout = 600
+        mock_client = self.setup_mock_client(
+            conf=conf,
+            driver=hpfcdriver.HP3PARFCDriver)
+        self.driver.create_volume(self.volume)
+        mock_client.reset_mock()
+
+        # the array ended the session before it was idle for the timeout
+        mock_client.deleteVolume.side_effect = [
+            hpexceptions.HTTPUnauthorized('fake'), None]
+        self.driver.delete_volume(self.volume)
+
+        self.assertEqual(2, mock_client.deleteVolume.call_count)
+        mock_client.logout.assert_called_once_with()
+        mock_client.login.assert_called_once_with(HP3PAR_USER_NAME,
+                                                  HP3PAR_USER_PASS)
+
+    def test_lookup_cache(self):
+        conf = self.setup_configuration()
+        conf.hp3par_lookup_cache_time = 600
+        mock_client = self.setup_driver(config=conf)
+        mock_client.getCPG.return_value = {'domain': 'OpenStack'}
+        mock_client.getPorts.return_value = {'members': self.FAKE_FC_PORTS}
+
+        for i in range(2):
+            self.assertEqual('OpenStack',
+                             self.driver.common.get_domain(HP3PAR_CPG))
+            self.assertEqual(2, len(
+                self.driver.common.get_active_fc_target_ports()))
+        mock_client.getCPG.assert_called_once_with(HP3PAR_CPG)
+        mock_client.getPorts.assert_called_once_with()
+
     def test_create_host(self):
         # setup_mock_client drive with default configuration
         # and return the mock HTTP 3PAR client
@@ -16,7 +16,11 @@
 """Unit tests for image utils."""
 
 import contextlib
+import mock
 import mox
+import os
+import shutil
+import StringIO
 import tempfile
 
 from oslo.config import cfg
@@ -497,6 +501,281 @@ class TestUtils(test.TestCase):
         m.VerifyAll()
 
 
+class FakeRawImageService(FakeImageService):
+    def __init__(self, data, chunk_size=4):
+        self._data = data
+        self._chunk_size = chunk_size
+
+    def download(self, context, image_id, data=None):
+        return [self._data[i:i + self._chunk_size]
+                for i in range(0, len(self._data), self._chunk_size)]
+
+    def show(self, context, image_id):
+        return {'size': len(self._data),
+                'disk_format': 'raw',
+                'container_format': 'bare'}
+
+
+class TestStreamRawImage(test.TestCase):
+    TEST_IMAGE_ID = 321
+    DATA = 'boot' + '\0' * 8 + 'data' + '\0' * 500 + 'end'
+
+    def setUp(self):
+        super(TestStreamRawImage, self).setUp()
+        self.flags(stream_raw_images=True)
+        self.dest = StringIO.StringIO()
+
+    @contextlib.contextmanager
+    def _open_dest(self):
+        yield self.dest
+
+    def _stream(self, image_service, **kwargs):
+        return image_utils.stream_raw_image(context, image_service,
+                                            self.TEST_IMAGE_ID,
+                                            self._open_dest, **kwargs)
+
+    def test_detect_image_format(self):
+        self.assertEqual('raw', image_utils.detect_image_format(self.DATA))
+        self.assertEqual('qcow',
+                         image_utils.detect_image_format('QFI\xfb\0\0\0'))
+        self.assertEqual('vdi', image_utils.detect_image_format(
+            '<<< Oracle VM VirtualBox Disk Image >>>\n'.ljust(64, '\0') +
+            '\x7f\x10\xda\xbe'))
+
+    def test_stream_raw_image(self):
+        self.assertTrue(self._stream(FakeRawImageService(self.DATA)))
+        self.assertEqual(self.DATA, self.dest.getvalue())
+
+    def _record_writes(self):
+        writes = []
+        write = self.dest.write
+
+        def record_write(data):
+            writes.append(data)
+            write(data)
+
+        self.stubs.Set(self.dest, 'write', record_write)
+        return writes
+
+    def test_stream_raw_image_skip_zeros(self):
+        writes = self._record_writes()
+        self.assertTrue(self._stream(FakeRawImageService(self.DATA),
+                                     skip_zeros=True, chunk_size=4))
+        self.assertEqual(['boot', 'data', 'end'], writes)
+        self.assertEqual(self.DATA, self.dest.getvalue())
+
+    def test_stream_raw_image_rechunks(self):
+        writes = self._record_writes()
+        self.assertTrue(self._stream(FakeRawImageService(self.DATA),
+                                     skip_zeros=True, chunk_size=256))
+        self.assertEqual([self.DATA[:256], self.DATA[512:]], writes)
+        self.assertEqual(self.DATA, self.dest.getvalue())
+
+    def test_stream_raw_image_disabled(self):
+        self.flags(stream_raw_images=False)
+        self.assertFalse(self._stream(FakeRawImageService(self.DATA)))
+        self.assertEqual('', self.dest.getvalue())
+
+    def test_stream_raw_image_not_raw_meta(self):
+        self.assertFalse(self._stream(FakeImageService()))
+
+    def test_stream_raw_image_not_raw_data(self):
+        image_service = FakeRawImageService('QFI\xfb' + self.DATA)
+        self.assertFalse(self._stream(image_service))
+        self.assertEqual('', self.dest.getvalue())
+
+    def test_stream_raw_image_too_big(self):
+        image_service = FakeRawImageService(self.DATA)
+        image_meta = image_service.show(context, self.TEST_IMAGE_ID)
+        image_meta['size'] = 2 * units.Gi
+        self.assertRaises(exception.ImageUnacceptable, self._stream,
+                          image_service, image_meta=image_meta, size=1)
+
+    def test_fetch_to_raw_streams(self):
+        self.mox.StubOutWithMock(image_utils, '_open_device_for_streaming')
+        self.mox.StubOutWithMock(image_utils, 'qemu_img_info')
+        image_utils._open_device_for_streaming(
+            '/dev/fake', '1M').AndReturn(self._open_dest())
+        self.mox.ReplayAll()
+
+        image_utils.fetch_to_raw(context, FakeRawImageService(self.DATA),
+                                 self.TEST_IMAGE_ID, '/dev/fake', '1M', size=1)
+        self.assertEqual(self.DATA, self.dest.getvalue())
+
+
+class FakeDDProcess(object):
+    def __init__(self, returncode=0):
+        self.stdin = StringIO.StringIO()
+        self.returncode = returncode
+        self.killed = False
+
+    def communicate(self):
+        return '', 'dd: error' if self.returncode else ''
+
+    def kill(self):
+        self.killed = True
+
+    def wait(self):
+        return self.returncode
+
+
+class TestOpenDeviceForStreaming(test.TestCase):
+    def setUp(self):
+        super(TestOpenDeviceForStreaming, self).setUp()
+        self.stubs.Set(utils, 'get_root_helper', lambda: 'sudo rootwrap')
+        self.popen_args = []
+        self.proc = FakeDDProcess()
+        self.stubs.Set(image_utils.subprocess, 'Popen', self._fake_popen)
+
+    def _fake_popen(self, cmd, **kwargs):
+        self.popen_args.append((cmd, kwargs))
+        return self.proc
+
+    def _open(self):
+        return image_utils._open_device_for_streaming('/dev/fake', '1M')
+
+    def test_open_device_for_streaming(self):
+        with self._open() as dest:
+            dest.write('data')
+        self.assertEqual('data', self.proc.stdin.getvalue())
+        cmd, kwargs = self.popen_args[0]
+        self.assertEqual(['sudo', 'rootwrap', 'dd', 'of=/dev/fake', 'bs=1M',
+                          'conv=fdatasync'], cmd)
+        self.assertEqual(processutils._subprocess_setup,
+                         kwargs['preexec_fn'])
+        self.assertFalse(self.proc.killed)
+
+    def test_open_device_for_streaming_dd_error(self):
+        self.proc.returncode = 1
+
+        def stream():
+            with self._open() as dest:
+                dest.write('data')
+
+        exc = self.assertRaises(processutils.ProcessExecutionError, stream)
+        self.assertEqual('dd: error', exc.stderr)
+
+    def test_open_device_for_streaming_write_error(self):
+        self.proc.stdin.write = self._raise_ioerror
+
+        def stream():
+            with self._open() as dest:
+                dest.write('data')
+
+        self.assertRaises(IOError, stream)
+        self.assertTrue(self.proc.killed)
+
+    @staticmethod
+    def _raise_ioerror(data):
+        raise IOError('Broken pipe')
+
+
+class TestImageCache(test.TestCase):
+    TEST_IMAGE_ID = 321
+
+    def setUp(self):
+        super(TestImageCache, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.flags(image_cache_dir=self.cache_dir,
+                   image_cache_max_size_gb=1)
+        self.image_meta = {'status': 'active', 'checksum': 'abc', 'size': 4}
+        self.virtual_size = 4
+        self.fetches = []
+        self.stubs.Set(image_utils, '_fetch_and_convert',
+                       self._fake_fetch_and_convert)
+        self.stubs.Set(utils, 'execute', lambda *args, **kwargs: None)
+
+    def _fake_fetch_and_convert(self, context, image_service, image_id,
+                                image_meta, dest, volume_format, *args,
+                                **kwargs):
+        self.fetches.append((image_id, dest, volume_format))
+        check = kwargs.get('check')
+        if check and not check(mock.Mock(virtual_size=self.virtual_size)):
+            return False
+        with open(dest, 'w') as f:
+            f.write('data')
+        return True
+
+    def _fetch(self, image_id=TEST_IMAGE_ID, **kwargs):
+        return image_utils.fetch_to_cache(
+            context, FakeImageService(), image_id, '1M',
+            image_meta=kwargs.pop('image_meta', self.image_meta), **kwargs)
+
+    def _cache_path(self, image_id, checksum):
+        return os.path.join(self.cache_dir, '%s.%s' % (image_id, checksum))
+
+    def test_fetch_to_cache_disabled(self):
+        self.flags(image_cache_max_size_gb=0)
+        self.assertIsNone(self._fetch())
+        self.assertEqual([], self.fetches)
+
+    def test_fetch_to_cache_no_checksum(self):
+        self.image_meta['checksum'] = None
+        self.assertIsNone(self._fetch())
+        self.assertEqual([], self.fetches)
+
+    def test_fetch_to_cache_fetches_once(self):
+        path = self._cache_path(self.TEST_IMAGE_ID, 'abc')
+        self.assertEqual(path, self._fetch())
+        self.assertEqual(path, self._fetch())
+        self.assertEqual([(self.TEST_IMAGE_ID, path + '.part', 'raw')],
+                         self.fetches)
+        self.assertEqual(['321.abc'], os.listdir(self.cache_dir))
+
+    def test_fetch_to_cache_invalidates_changed_image(self):
+        self._fetch()
+        self.image_meta['checksum'] = 'def'
+        self.assertEqual(self._cache_path(self.TEST_IMAGE_ID, 'def'),
+                         self._fetch())
+        self.assertEqual(2, len(self.fetches))
+        self.assertEqual(['321.def'], os.listdir(self.cache_dir))
+
+    def test_fetch_to_cache_too_big(self):
+        self._fetch()
+        self.stubs.Set(os.path, 'getsize', lambda path: 2 * units.Gi)
+        self.assertRaises(exception.ImageUnacceptable, self._fetch, size=1)
+
+    def test_fetch_to_cache_virtual_size_too_big_for_cache(self):
+        self.virtual_size = 2 * units.Gi
+        self.assertIsNone(self._fetch())
+        self.assertEqual(1, len(self.fetches))
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+    def test_fetch_to_cache_virtual_size_too_big_for_volume(self):
+        self.flags(image_cache_max_size_gb=4)
+        self.virtual_size = 2 * units.Gi
+        self.assertRaises(exception.ImageUnacceptable, self._fetch, size=1)
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+    def test_fetch_to_cache_evicts_least_recently_used(self):
+        old = self._cache_path(123, 'abc')
+        used = self._cache_path(456, 'abc')
+        for path in (old, used):
+            with open(path, 'w') as f:
+                f.truncate(units.Gi / 2)
+            os.utime(path, (0, 0))
+        self._fetch(image_id=456)
+
+        self._fetch()
+        self.assertEqual(1, len(self.fetches))
+        self.assertEqual(sorted(['321.abc', '456.abc']),
+                         sorted(os.listdir(self.cache_dir)))
+
+    def test_fetch_to_raw_from_cache(self):
+        self.mox.StubOutWithMock(volume_utils, 'copy_volume')
+        volume_utils.copy_volume(self._cache_path(self.TEST_IMAGE_ID, 'abc'),
+                                 '/dev/fake', 1, '1M')
+        self.mox.ReplayAll()
+
+        image_service = FakeRawImageService('data')
+        self.stubs.Set(image_service, 'show',
+                       lambda context, image_id: self.image_meta)
+        image_utils.fetch_to_raw(context, image_service, self.TEST_IMAGE_ID,
+                                 '/dev/fake', '1M', size=1)
+        self.mox.VerifyAll()
+
+
 class TestExtractTo(test.TestCase):
     def test_extract_to_calls_tar(self):
         mox = self.mox
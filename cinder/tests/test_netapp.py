@@ -19,9 +19,13 @@ Tests for NetApp volume driver
 """
 
 import BaseHTTPServer
+import copy
+import errno
 import httplib
+import socket
 from lxml import etree
 
+import mock
 import six
 
 from cinder import exception
@@ -29,6 +33,7 @@ from cinder.openstack.common.gettextutils import _
 from cinder.openstack.common import log as logging
 from cinder import test
 from cinder.volume import configuration as conf
+from cinder.volume.drivers.netapp.api import NaApiError
 from cinder.volume.drivers.netapp.api import NaElement
 from cinder.volume.drivers.netapp.api import NaServer
 from cinder.volume.drivers.netapp import common
@@ -480,6 +485,9 @@ class FakeDirectCmodeHTTPConnection(object):
     def set_debuglevel(self, level):
         pass
 
+    def close(self):
+        pass
+
     def getresponse(self):
         self.http_response.begin()
         return self.http_response
@@ -1108,6 +1116,9 @@ class FakeDirect7modeHTTPConnection(object):
     def set_debuglevel(self, level):
         pass
 
+    def close(self):
+        pass
+
     def getresponse(self):
         self.http_response.begin()
         return self.http_response
@@ -1335,3 +1346,102 @@ class NetAppApiElementTransTests(test.TestCase):
         except Exception as e:
             if not isinstance(e, KeyError):
                 self.fail(_('Error not a KeyError.'))
+
+
+class NetAppApiServerTests(test.TestCase):
+    """Test case for NetApp api server connections."""
+
+    RESPONSE = ('<netapp version="1.15"><results status="passed">'
+                '<version>1.15</version></results></netapp>')
+
+    def setUp(self):
+        super(NetAppApiServerTests, self).setUp()
+        self.connections = []
+        self.stubs.Set(httplib, 'HTTPConnection', self._connect)
+        self.server = NaServer('filer', username='admin', password='pass')
+
+    def _connect(self, host, timeout=None):
+        conn = mock.Mock()
+        conn.host = host
+        conn.sock = None
+        conn.getresponse.return_value = mock.Mock(status=200, reason='OK',
+                                                  read=lambda: self.RESPONSE)
+        self.connections.append(conn)
+        return conn
+
+    def _invoke(self, server=None):
+        return (server or self.server).invoke_successfully(
+            NaElement('system-get-version'))
+
+    def test_connection_reused(self):
+        self._invoke()
+        self._invoke(server=copy.copy(self.server))
+        self.assertEqual(1, len(self.connections))
+        conn = self.connections[0]
+        self.assertEqual('filer:80', conn.host)
+        self.assertEqual(2, conn.request.call_count)
+        method, path, body, headers = conn.request.call_args[0]
+        self.assertEqual('POST', method)
+        self.assertEqual('/' + NaServer.URL_FILER, path)
+        self.assertEqual(str(len(body)), headers['Content-Length'])
+        self.assertEqual('Basic YWRtaW46cGFzcw==', headers['Authorization'])
+        stats = self.server.get_stats()['system-get-version']
+        self.assertEqual(2, stats['requests'])
+        self.assertEqual(0, stats['failures'])
+
+    def test_no_pool(self):
+        server = NaServer('filer', pool_size=0)
+        self._invoke(server=server)
+        self._invoke(server=server)
+        self.assertEqual(2, len(self.connections))
+        self.connections[0].close.assert_called_once_with()
+
+    def test_new_connection_on_port_change(self):
+        self._invoke()
+        self.server.set_port(8080)
+        self._invoke()
+        self.assertEqual(2, len(self.connections))
+        self.assertEqual('filer:8080', self.connections[1].host)
+        self.connections[0].close.assert_called_once_with()
+
+    def test_reconnect_closed_connection(self):
+        self._invoke()
+        self.connections[0].getresponse.side_effect = httplib.BadStatusLine('')
+        self._invoke()
+        self.assertEqual(2, len(self.connections))
+        self.connections[0].close.assert_called_once_with()
+        self.assertEqual(1, self.connections[1].request.call_count)
+
+    def test_resend_unsent_request(self):
+        self._invoke()
+        self.connections[0].request.side_effect = socket.error(
+            errno.EPIPE, 'Broken pipe')
+        self._invoke()
+        self.assertEqual(2, len(self.connections))
+        self.connections[0].close.assert_called_once_with()
+        self.assertEqual(1, self.connections[1].request.call_count)
+
+    def test_no_resend_of_delivered_request(self):
+        self._invoke()
+        self.connections[0].getresponse.side_effect = socket.error(
+            errno.ECONNRESET, 'Connection reset by peer')
+        self.assertRaises(NaApiError, self._invoke)
+        self.assertEqual(1, len(self.connections))
+        self.assertEqual(2, self.connections[0].request.call_count)
+        self.connections[0].close.assert_called_once_with()
+
+    def test_connection_error(self):
+        self.stubs.Set(httplib, 'HTTPConnection', mock.Mock(
+            return_value=mock.Mock(**{'request.side_effect': IOError})))
+        self.assertRaises(NaApiError, self._invoke)
+        stats = self.server.get_stats()['system-get-version']
+        self.assertEqual(1, stats['failures'])
+
+    def test_http_error(self):
+        self._invoke()
+        self.connections[0].getresponse.return_value = mock.Mock(
+            status=401, reason='Unauthorized', read=lambda: '')
+        e = self.assertRaises(NaApiError, self._invoke)
+        self.assertEqual(401, e.code)
+        self._invoke()
+        self.assertEqual(1, len(self.connections))
@@ -284,6 +284,9 @@ class FakeDirectCmodeHTTPConnection(object):
     def set_debuglevel(self, level):
         pass
 
+    def close(self):
+        pass
+
     def getresponse(self):
         self.http_response.begin()
         return self.http_response
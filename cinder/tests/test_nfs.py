@@ -28,6 +28,7 @@ from oslo.config import cfg
 from cinder import context
 from cinder import exception
 from cinder.image import image_utils
+from cinder.openstack.common import timeutils
 from cinder.openstack.common import units
 from cinder import test
 from cinder.volume import configuration as conf
@@ -135,6 +136,7 @@ class NfsDriverTestCase(test.TestCase):
         self.configuration.nfs_oversub_ratio = 1.0
         self.configuration.nfs_mount_point_base = self.TEST_MNT_POINT_BASE
         self.configuration.nfs_mount_options = None
+        self.configuration.nfs_capacity_refresh_interval = 0
         self.configuration.volume_dd_blocksize = '1M'
         self._driver = nfs.NfsDriver(configuration=self.configuration)
         self._driver.shares = {}
@@ -452,6 +454,71 @@ class NfsDriverTestCase(test.TestCase):
 
         mox.VerifyAll()
 
+    def test_find_share_cached_capacity(self):
+        """_find_share measures each share once when caching capacity."""
+        drv = self._driver
+        self.configuration.nfs_capacity_refresh_interval = 60
+        drv._mounted_shares = [self.TEST_NFS_EXPORT1, self.TEST_NFS_EXPORT2]
+        capacities = {
+            self.TEST_NFS_EXPORT1: (5 * units.Gi, 4 * units.Gi,
+                                    1 * units.Gi),
+            self.TEST_NFS_EXPORT2: (5 * units.Gi, 4 * units.Gi,
+                                    2 * units.Gi)}
+
+        with mock.patch.object(drv, '_get_capacity_info',
+                               side_effect=capacities.get) as mock_capacity:
+            self.assertEqual(self.TEST_NFS_EXPORT1, drv._find_share(2))
+            # The 2GB now accounted on share 1 tip the balance.
+            self.assertEqual(self.TEST_NFS_EXPORT2, drv._find_share(1))
+
+        self.assertEqual(2, mock_capacity.call_count)
+        self.assertEqual((5 * units.Gi, 4 * units.Gi, 3 * units.Gi),
+                         drv._get_share_capacity(self.TEST_NFS_EXPORT1))
+
+    def test_find_share_cached_capacity_expires(self):
+        drv = self._driver
+        self.configuration.nfs_capacity_refresh_interval = 60
+        drv._mounted_shares = [self.TEST_NFS_EXPORT1]
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+
+        with mock.patch.object(drv, '_get_capacity_info',
+                               return_value=(5 * units.Gi, 4 * units.Gi,
+                                             1 * units.Gi)) as mock_capacity:
+            drv._find_share(1)
+            timeutils.advance_time_seconds(61)
+            drv._find_share(1)
+
+        self.assertEqual(2, mock_capacity.call_count)
+
+    def test_cached_capacity_accounts_delete_and_extend(self):
+        drv = self._driver
+        self.configuration.nfs_capacity_refresh_interval = 60
+        self.configuration.nfs_sparsed_volumes = False
+        volume = {'id': '80ee16b6-75d2-4d54-9539-ffc1b4b0fb10', 'size': 1,
+                  'name': 'volume-123',
+                  'provider_location': self.TEST_NFS_EXPORT1}
+
+        with mock.patch.object(drv, '_get_capacity_info',
+                               return_value=(5 * units.Gi, 4 * units.Gi,
+                                             1 * units.Gi)):
+            drv._get_share_capacity(self.TEST_NFS_EXPORT1)
+
+        with mock.patch.object(image_utils, 'resize_image'):
+            with mock.patch.object(drv, 'local_path', return_value='path'):
+                with mock.patch.object(drv, '_is_file_size_equal',
+                                       return_value=True):
+                    drv.extend_volume(volume, 3)
+        self.assertEqual((5 * units.Gi, 2 * units.Gi, 3 * units.Gi),
+                         drv._get_share_capacity(self.TEST_NFS_EXPORT1))
+
+        volume['size'] = 3
+        with mock.patch.object(drv, '_ensure_share_mounted'):
+            with mock.patch.object(drv, '_execute'):
+                drv.delete_volume(volume)
+        self.assertEqual((5 * units.Gi, 5 * units.Gi, 0),
+                         drv._get_share_capacity(self.TEST_NFS_EXPORT1))
+
     def _simple_volume(self):
         volume = DumbVolume()
         volume['provider_location'] = '127.0.0.1:/mnt'
@@ -143,6 +143,9 @@ class RBDTestCase(test.TestCase):
         self.cfg.rbd_user = None
         self.cfg.volume_dd_blocksize = '1M'
         self.cfg.rbd_store_chunk_size = 4
+        self.cfg.rados_connection_pool_size = 4
+        self.cfg.rados_connection_pool_max_active = 0
+        self.stubs.Set(driver, '_rados_connection_pool', None)
 
         mock_exec = mock.Mock()
         mock_exec.return_value = ('', '')
@@ -614,6 +617,49 @@ class RBDTestCase(test.TestCase):
         self.cfg.volume_tmp_dir = '/var/run/cinder/tmp'
         self._copy_image()
 
+    @common_mocks
+    def test_copy_image_streamed(self):
+        self.flags(stream_raw_images=True)
+        image_service = mock.Mock()
+        image_service.show.return_value = {'disk_format': 'raw',
+                                           'container_format': 'bare',
+                                           'size': 8}
+        image_service.download.return_value = ['boot', '\0' * 4]
+        volume = {'name': 'test', 'size': 1}
+        rbd_image = self.mock_proxy.return_value.__enter__.return_value
+
+        with mock.patch.object(self.driver, 'delete_volume') as mock_delete:
+            with mock.patch.object(self.driver, 'create_volume') as \
+                    mock_create:
+                with mock.patch.object(self.driver, '_ensure_tmp_exists') as \
+                        mock_ensure_tmp_exists:
+                    self.driver.copy_image_to_volume(None, volume,
+                                                     image_service, None)
+
+        mock_delete.assert_called_once_with(volume)
+        mock_create.assert_called_once_with(volume)
+        self.assertFalse(mock_ensure_tmp_exists.called)
+        rbd_image.write.assert_called_once_with('boot\0\0\0\0', 0)
+
+    @common_mocks
+    def test_copy_image_cached(self):
+        volume = {'name': 'test', 'size': 1}
+        with mock.patch.object(image_utils, 'fetch_to_cache') as \
+                mock_fetch_to_cache:
+            mock_fetch_to_cache.return_value = '/cache/image'
+            with mock.patch.object(self.driver, '_import_image') as \
+                    mock_import:
+                with mock.patch.object(self.driver, '_resize') as \
+                        mock_resize:
+                    with mock.patch.object(image_utils, 'fetch_to_raw') as \
+                            mock_fetch_to_raw:
+                        self.driver.copy_image_to_volume(None, volume,
+                                                         mock.Mock(), None)
+
+        mock_import.assert_called_once_with(volume, '/cache/image')
+        mock_resize.assert_called_once_with(volume)
+        self.assertFalse(mock_fetch_to_raw.called)
+
     @common_mocks
     def test_update_volume_stats(self):
         client = self.mock_client.return_value
@@ -817,6 +863,114 @@ class RBDTestCase(test.TestCase):
         self.mock_rados.Rados.shutdown.assert_called_once()
 
 
+class RADOSConnectionPoolTestCase(test.TestCase):
+    def setUp(self):
+        super(RADOSConnectionPoolTestCase, self).setUp()
+        self.now = 0
+        self.stubs.Set(driver.time, 'time', lambda: self.now)
+        self.connect = mock.Mock(side_effect=self._connect)
+        self.pool = driver.RADOSConnectionPool(idle_timeout=300,
+                                               wait_timeout=0)
+
+    def _connect(self):
+        client = mock.Mock()
+        client.state = 'connected'
+        return client, mock.Mock()
+
+    def _get(self, key=('conf', 'user', 'rbd'), max_active=0):
+        return self.pool.get(key, self.connect, 1, max_active)
+
+    def test_get_reuses_returned_connection(self):
+        client, ioctx = self._get()
+        self.pool.put(client, ioctx)
+        self.assertEqual((client, ioctx), self._get())
+        self.connect.assert_called_once_with()
+        self.assertFalse(client.shutdown.called)
+        self.assertEqual({'connected': 1, 'reused': 1, 'closed': 0},
+                         self.pool.stats)
+
+    def test_get_connects_per_key(self):
+        client, ioctx = self._get()
+        self.pool.put(client, ioctx)
+        self.assertNotEqual((client, ioctx),
+                            self._get(('conf', 'user', 'backups')))
+        self.assertNotEqual((client, ioctx),
+                            self._get(('conf', 'admin', 'rbd')))
+        self.assertEqual(3, self.connect.call_count)
+
+    def test_get_drops_stale_connection(self):
+        client, ioctx = self._get()
+        self.pool.put(client, ioctx)
+        client.state = 'shutdown'
+        self.assertNotEqual((client, ioctx), self._get())
+        ioctx.close.assert_called_once_with()
+        client.shutdown.assert_called_once_with()
+        self.assertEqual(2, self.connect.call_count)
+
+    def test_get_limits_active_connections(self):
+        first = self._get(max_active=1)
+        self.assertRaises(exception.VolumeBackendAPIException,
+                          self._get, max_active=1)
+        self.pool.put(*first)
+        self.assertEqual(first, self._get(max_active=1))
+
+    def test_get_connect_error_releases_slot(self):
+        self.connect.side_effect = exception.VolumeBackendAPIException(
+            data='error')
+        self.assertRaises(exception.VolumeBackendAPIException,
+                          self._get, max_active=1)
+        self.connect.side_effect = self._connect
+        self._get(max_active=1)
+
+    def test_put_discard(self):
+        client, ioctx = self._get()
+        self.pool.put(client, ioctx, discard=True)
+        client.shutdown.assert_called_once_with()
+        self._get()
+        self.assertEqual(2, self.connect.call_count)
+
+    def test_put_closes_connections_beyond_max_idle(self):
+        first = self._get()
+        second = self._get()
+        self.pool.put(*first)
+        self.pool.put(*second)
+        self.assertFalse(first[0].shutdown.called)
+        second[0].shutdown.assert_called_once_with()
+        self.assertEqual(first, self._get())
+
+    def test_idle_connections_expire(self):
+        client, ioctx = self._get()
+        self.pool.put(client, ioctx)
+        self.now += 300
+        self.assertNotEqual((client, ioctx), self._get())
+        client.shutdown.assert_called_once_with()
+
+    def test_close_idle(self):
+        client, ioctx = self._get()
+        self.pool.put(client, ioctx)
+        self.assertEqual(1, self.pool.close_idle())
+        client.shutdown.assert_called_once_with()
+        self.assertEqual(0, self.pool.close_idle())
+
+    def test_shared_by_driver_instances(self):
+        self.stubs.Set(driver, '_rados_connection_pool', self.pool)
+        cfg = mock.Mock(spec=conf.Configuration)
+        cfg.rbd_pool = 'rbd'
+        cfg.rbd_ceph_conf = 'conf'
+        cfg.rbd_user = 'user'
+        cfg.rados_connection_pool_size = 1
+        cfg.rados_connection_pool_max_active = 0
+        drivers = [driver.RBDDriver(configuration=cfg) for i in range(2)]
+        with mock.patch.object(driver.RBDDriver,
+                               '_open_rados_connection') as mock_open:
+            mock_open.side_effect = lambda pool: self._connect()
+            with driver.RADOSClient(drivers[0]) as client:
+                conn = client.cluster, client.ioctx
+            with driver.RADOSClient(drivers[1]) as client:
+                self.assertEqual(conn, (client.cluster, client.ioctx))
+            mock_open.assert_called_once_with('rbd')
+
+
 class RBDImageIOWrapperTestCase(test.TestCase):
     def setUp(self):
         super(RBDImageIOWrapperTestCase, self).setUp()
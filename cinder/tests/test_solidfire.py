@@ -14,6 +14,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import errno
+import httplib
+import socket
+
+import mock
 import mox
 
 from cinder import context
@@ -47,6 +52,7 @@ class SolidFireVolumeTestCase(test.TestCase):
         self.configuration.sf_emulate_512 = True
         self.configuration.sf_account_prefix = 'cinder'
         self.configuration.reserved_percentage = 25
+        self.configuration.sf_volume_index_ttl = 0
 
         super(SolidFireVolumeTestCase, self).setUp()
         self.stubs.Set(SolidFireDriver, '_issue_api_request',
@@ -572,3 +578,114 @@ class SolidFireVolumeTestCase(test.TestCase):
         sfv._update_cluster_status()
         self.assertEqual(sfv.cluster_stats['free_capacity_gb'], 99.0)
         self.assertEqual(sfv.cluster_stats['total_capacity_gb'], 100.0)
+
+    def _setup_api_request(self, responses):
+        sfv = SolidFireDriver(configuration=self.configuration)
+        self.stubs.UnsetAll()
+        self.configuration.san_ip = '1.1.1.1'
+        self.configuration.sf_api_port = 443
+        self.configuration.san_login = 'admin'
+        self.configuration.san_password = 'password'
+        self.configuration.sf_api_pool_size = 4
+        connections = []
+        for response in responses:
+            connection = mock.Mock()
+            connection.getresponse.side_effect = response
+            connections.append(connection)
+        https = mock.Mock(side_effect=connections)
+        self.stubs.Set(httplib, 'HTTPSConnection', https)
+        return sfv, https, connections
+
+    def _api_response(self):
+        response = mock.Mock(status=200, reason='OK')
+        response.read.return_value = '{"result": {}, "id": 1}'
+        return response
+
+    def test_issue_api_request_reuses_connection(self):
+        response = self._api_response()
+        sfv, https, connections = self._setup_api_request(
+            [[response, response]])
+        for i in range(2):
+            self.assertEqual({'result': {}, 'id': 1},
+                             sfv._issue_api_request('GetClusterInfo', {}))
+        https.assert_called_once_with('1.1.1.1', 443)
+        self.assertEqual(2, connections[0].request.call_count)
+        self.assertFalse(connections[0].close.called)
+
+    def test_issue_api_request_reconnects(self):
+        response = self._api_response()
+        sfv, https, connections = self._setup_api_request(
+            [[response, httplib.BadStatusLine('')], [response]])
+        for i in range(2):
+            self.assertEqual({'result': {}, 'id': 1},
+                             sfv._issue_api_request('GetClusterInfo', {}))
+        self.assertEqual(2, https.call_count)
+        connections[0].close.assert_called_once_with()
+        self.assertEqual(1, connections[1].request.call_count)
+
+    def test_issue_api_request_resends_unsent_request(self):
+        response = self._api_response()
+        sfv, https, connections = self._setup_api_request(
+            [[response], [response]])
+        connections[0].request.side_effect = [
+            None, socket.error(errno.EPIPE, 'Broken pipe')]
+        for i in range(2):
+            self.assertEqual({'result': {}, 'id': 1},
+                             sfv._issue_api_request('GetClusterInfo', {}))
+        self.assertEqual(2, https.call_count)
+        connections[0].close.assert_called_once_with()
+        self.assertEqual(1, connections[1].request.call_count)
+
+    def test_issue_api_request_does_not_resend_delivered_request(self):
+        response = self._api_response()
+        sfv, https, connections = self._setup_api_request(
+            [[response, socket.error(errno.ECONNRESET, 'Reset')]])
+        sfv._issue_api_request('CreateVolume', {})
+        self.assertRaises(exception.SolidFireAPIException,
+                          sfv._issue_api_request, 'CreateVolume', {})
+        https.assert_called_once_with('1.1.1.1', 443)
+        self.assertEqual(2, connections[0].request.call_count)
+        connections[0].close.assert_called_once_with()
+
+    def test_issue_api_request_does_not_resend_on_bad_status(self):
+        response = self._api_response()
+        sfv, https, connections = self._setup_api_request(
+            [[response, httplib.BadStatusLine('garbage')]])
+        sfv._issue_api_request('CloneVolume', {})
+        self.assertRaises(exception.SolidFireAPIException,
+                          sfv._issue_api_request, 'CloneVolume', {})
+        https.assert_called_once_with('1.1.1.1', 443)
+
+    def test_get_sf_volume_indexed(self):
+        uuid = 'a720b3c0-d1f0-11e1-9b23-0800200c9a66'
+        calls = []
+
+        def _fake_issue_api_request(obj, method, params, version='1.0'):
+            calls.append(method)
+            if method == 'ListVolumesForAccount':
+                return {'result': {'volumes': [
+                    {'volumeID': 5, 'name': 'UUID-%s' % uuid,
+                     'accountID': 25, 'attributes': {}},
+                    {'volumeID': 6, 'name': 'UUID-other',
+                     'accountID': 25, 'attributes': {}}]}}
+            return self.fake_issue_api_request(method, params, version)
+
+        self.stubs.Set(SolidFireDriver, '_issue_api_request',
+                       _fake_issue_api_request)
+        self.configuration.sf_volume_index_ttl = 600
+        sfv = SolidFireDriver(configuration=self.configuration)
+        params = {'accountID': 25}
+
+        for i in range(2):
+            self.assertEqual(5, sfv._get_sf_volume(uuid, params)['volumeID'])
+        self.assertEqual(6,
+                         sfv._get_sf_volume('other', params)['volumeID'])
+        self.assertEqual(1, calls.count('ListVolumesForAccount'))
+
+        sfv.delete_volume({'project_id': 'testprjid', 'id': uuid})
+        self.assertEqual(1, calls.count('DeleteVolume'))
+        self.assertEqual(1, calls.count('ListVolumesForAccount'))
+
+        # a volume missing from the index is listed again
+        sfv._get_sf_volume(uuid, params)
+        self.assertEqual(2, calls.count('ListVolumesForAccount'))
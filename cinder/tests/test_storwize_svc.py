@@ -18,6 +18,7 @@
 Tests for the IBM Storwize family and SVC volume driver.
 """
 
+import contextlib
 import mock
 import random
 import re
@@ -2890,3 +2891,59 @@ class StorwizeHelpersTestCase(test.TestCase):
         with mock.patch.object(ssh.StorwizeSSH, 'lslicense') as lslicense:
             lslicense.return_value = fake_license
             self.assertTrue(self.helpers.compression_enabled())
+
+    def test_get_host_from_connector_indexed(self):
+        hosts = {'host1': ssh.CLIResponse('id!1\nname!host1\n'
+                                          'iscsi_name!iqn.host1\n',
+                                          with_header=False),
+                 'host2': ssh.CLIResponse('id!2\nname!host2\n'
+                                          'WWPN!AABB\nWWPN!CCDD\n',
+                                          with_header=False)}
+
+        def fake_lshost(host=None):
+            if host:
+                return hosts[host]
+            raw = 'id!name\n'
+            for i, name in enumerate(sorted(hosts)):
+                raw += '%s!%s\n' % (i, name)
+            return ssh.CLIResponse(raw)
+
+        iscsi_conn = {'host': 'host1', 'initiator': 'iqn.host1'}
+        fc_conn = {'host': 'host2', 'wwpns': ['ccdd']}
+        with contextlib.nested(
+                mock.patch.object(ssh.StorwizeSSH, 'lsfabric'),
+                mock.patch.object(ssh.StorwizeSSH, 'lshost'),
+                mock.patch.object(ssh.StorwizeSSH, 'lshost_if_exists'),
+                mock.patch.object(ssh.StorwizeSSH, 'rmhost')) as (
+                lsfabric, lshost, lshost_if_exists, rmhost):
+            lsfabric.return_value = []
+            lshost.side_effect = fake_lshost
+            lshost_if_exists.side_effect = hosts.get
+
+            # The first search goes through the hosts and indexes them
+            self.assertEqual('host2',
+                             self.helpers.get_host_from_connector(fc_conn))
+            self.assertEqual(3, lshost.call_count)
+            lshost.reset_mock()
+            lsfabric.reset_mock()
+
+            # Later searches only check the indexed host
+            self.assertEqual('host1',
+                             self.helpers.get_host_from_connector(iscsi_conn))
+            self.assertEqual('host2',
+                             self.helpers.get_host_from_connector(fc_conn))
+            self.assertFalse(lshost.called)
+            self.assertFalse(lsfabric.called)
+            self.assertEqual([mock.call('host1'), mock.call('host2')],
+                             lshost_if_exists.call_args_list)
+
+            # Deleted hosts are dropped from the index
+            self.helpers.delete_host('host1')
+            del hosts['host1']
+            self.assertIsNone(
+                self.helpers.get_host_from_connector(iscsi_conn))
+            del hosts['host2']
+            lshost_if_exists.reset_mock()
+            self.assertIsNone(self.helpers.get_host_from_connector(fc_conn))
+            lshost_if_exists.assert_called_once_with('host2')
+            self.assertEqual({}, self.helpers._host_index)
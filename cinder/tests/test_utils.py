@@ -1037,3 +1037,41 @@ class StringLengthTestCase(test.TestCase):
         self.assertRaises(exception.InvalidInput,
                           utils.check_string_length,
                           'a' * 256, 'name', max_length=255)
+
+
+class ZeroFileRangeTestCase(test.TestCase):
+    def test_zero_file_range_regular_file(self):
+        with tempfile.TemporaryFile() as f:
+            f.write('a' * 8192)
+            f.flush()
+            self.assertTrue(utils.zero_file_range(f.fileno(), 1024, 2048))
+            f.seek(0)
+            self.assertEqual('a' * 1024 + '\0' * 2048 + 'a' * 5120, f.read())
+
+    def test_zero_file_range_extends_regular_file(self):
+        with tempfile.TemporaryFile() as f:
+            f.write('a' * 1024)
+            f.flush()
+            self.assertTrue(utils.zero_file_range(f.fileno(), 512, 2048))
+            f.seek(0)
+            self.assertEqual('a' * 512 + '\0' * 2048, f.read())
+
+    def test_zero_file_range_unsupported(self):
+        read_fd, write_fd = os.pipe()
+        self.addCleanup(os.close, read_fd)
+        self.addCleanup(os.close, write_fd)
+        self.assertFalse(utils.zero_file_range(write_fd, 0, 1024))
+
+    @mock.patch('fcntl.ioctl')
+    @mock.patch('os.fstat')
+    def test_zero_file_range_block_device(self, mock_fstat, mock_ioctl):
+        mock_fstat.return_value = mock.Mock(st_mode=0o60660)
+        self.assertTrue(utils.zero_file_range(7, 4096, 8192))
+        mock_ioctl.assert_called_once_with(7, utils.BLKZEROOUT, mock.ANY)
+
+    @mock.patch('fcntl.ioctl', side_effect=IOError(25, 'ENOTTY'))
+    @mock.patch('os.fstat')
+    def test_zero_file_range_block_device_unsupported(self, mock_fstat,
+                                                      mock_ioctl):
+        mock_fstat.return_value = mock.Mock(st_mode=0o60660)
+        self.assertFalse(utils.zero_file_range(7, 4096, 8192))
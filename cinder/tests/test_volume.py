@@ -242,6 +242,51 @@ class VolumeTestCase(BaseVolumeTestCase):
         self.assertEqual(volume['status'], "error")
         self.volume.delete_volume(self.context, volume_id)
 
+    def test_init_host_reexports_in_use_volumes(self):
+        """init_host sets volumes it fails to re-export to error."""
+        self.flags(volume_service_inithost_workers=4)
+        volumes = [tests_utils.create_volume(self.context, status='in-use',
+                                             size=1, host=CONF.host)
+                   for i in range(3)]
+        failing_id = volumes[1]['id']
+
+        def fake_ensure_export(context, volume):
+            if volume['id'] == failing_id:
+                raise exception.CinderException()
+
+        with mock.patch.object(self.volume.driver, 'ensure_export',
+                               side_effect=fake_ensure_export) as mock_export:
+            self.volume.init_host()
+
+        self.assertEqual(3, mock_export.call_count)
+        self.assertEqual(3, self.volume.stats['allocated_capacity_gb'])
+        self.assertTrue(self.volume.driver.initialized)
+        self.assertEqual(['in-use', 'error', 'in-use'],
+                         [db.volume_get(self.context, volume['id'])['status']
+                          for volume in volumes])
+        for volume in volumes:
+            db.volume_destroy(self.context, volume['id'])
+
+    def test_init_host_bulk_ensure_exports(self):
+        """init_host uses the driver's bulk re-export when it has one."""
+        volume = tests_utils.create_volume(self.context, status='in-use',
+                                           size=1, host=CONF.host)
+
+        with mock.patch.object(self.volume.driver, 'ensure_exports',
+                               return_value={volume['id']: Exception()}) as \
+                mock_exports:
+            with mock.patch.object(self.volume.driver,
+                                   'ensure_export') as mock_export:
+                self.volume.init_host()
+
+        self.assertEqual(1, mock_exports.call_count)
+        self.assertEqual([volume['id']],
+                         [v['id'] for v in mock_exports.call_args[0][1]])
+        self.assertFalse(mock_export.called)
+        self.assertEqual('error',
+                         db.volume_get(self.context, volume['id'])['status'])
+        db.volume_destroy(self.context, volume['id'])
+
     def test_init_host_resumes_deletes(self):
         """init_host will resume deleting volume in deleting status."""
         volume = tests_utils.create_volume(self.context, status='deleting',
@@ -579,6 +624,39 @@ class VolumeTestCase(BaseVolumeTestCase):
             self.assertEqual(volume_stats['key2'],
                              fake_capabilities['key2'])
 
+    def test_report_driver_status_timestamp(self):
+        manager = VolumeManager()
+        manager.driver.set_initialized()
+        manager._report_driver_status(self.context)
+        self.assertIn('stats_timestamp', manager.last_capabilities)
+
+    def test_report_driver_status_in_background(self):
+        self.flags(volume_stats_timeout=10)
+        manager = VolumeManager()
+        manager.driver.set_initialized()
+        collecting = eventlet.event.Event()
+
+        def fake_get_volume_stats(refresh=False):
+            collecting.wait()
+            return {'free_capacity_gb': 1}
+
+        with mock.patch.object(manager.driver, 'get_volume_stats',
+                               side_effect=fake_get_volume_stats) as \
+                mock_stats:
+            manager._report_driver_status(self.context)
+            collection = manager._stats_collection
+            # Still collecting: nothing new to publish, no new collection.
+            manager._report_driver_status(self.context)
+            eventlet.sleep(0)
+            self.assertIsNone(manager.last_capabilities)
+
+            collecting.send()
+            collection.wait()
+
+        self.assertEqual(1, mock_stats.call_count)
+        self.assertEqual(1, manager.last_capabilities['free_capacity_gb'])
+        self.assertIsNone(manager._stats_collection)
+
     def test_extra_capabilities_fail(self):
         with mock.patch.object(jsonutils, 'loads') as mock_loads:
             mock_loads.side_effect = exception.CinderException('test')
@@ -3296,7 +3374,7 @@ class LVMISCSIVolumeDriverTestCase(DriverTestCase):
 
         self.stubs.Set(volutils, 'copy_volume',
                        lambda x, y, z, sync=False, execute='foo',
-                       blocksize=mox.IgnoreArg(): None)
+                       blocksize=mox.IgnoreArg(), sparse=False: None)
 
         self.stubs.Set(volutils, 'get_all_volume_groups',
                        get_all_volume_groups)
@@ -3449,6 +3527,21 @@ class LVMVolumeDriverTestCase(DriverTestCase):
 
         lvm_driver._delete_volume(fake_snapshot, is_snapshot=True)
 
+    @mock.patch.object(volutils, 'copy_volume')
+    def test_create_volume_from_snapshot_thinlvm_sparse(self, copy_volume):
+        configuration = conf.Configuration(fake_opt, 'fake_group')
+        configuration.lvm_type = 'thin'
+        configuration.lvm_mirrors = 0
+        lvm_driver = lvm.LVMVolumeDriver(configuration=configuration,
+                                         vg_obj=mock.Mock())
+
+        lvm_driver.create_volume_from_snapshot(
+            {'name': 'volume-1', 'size': 1},
+            {'name': 'snapshot-1', 'volume_size': 1})
+
+        # A new thin LV reads back zeroes, so they are not copied.
+        self.assertTrue(copy_volume.call_args[1]['sparse'])
+
 
 class ISCSITestCase(DriverTestCase):
     """Test Case for ISCSIDriver"""
@@ -80,6 +80,24 @@ class VolumeGlanceMetadataTestCase(test.TestCase):
         for key, value in expected_metadata_1.items():
             self.assertEqual(metadata[0][key], value)
 
+    def test_vol_glance_metadata_bulk_create(self):
+        ctxt = context.get_admin_context()
+        db.volume_create(ctxt, {'id': '1'})
+        db.volume_glance_metadata_create(ctxt, '1', 'key1', 'value1')
+        db.volume_glance_metadata_bulk_create(ctxt, '1',
+                                              {'key1': 'value1a',
+                                               'key2': 'value2',
+                                               'key3': 123})
+
+        metadata = db.volume_glance_metadata_get(ctxt, '1')
+        metadata = dict([(m['key'], m['value']) for m in metadata])
+        self.assertEqual({'key1': 'value1', 'key2': 'value2', 'key3': '123'},
+                         metadata)
+
+        self.assertRaises(exception.VolumeNotFound,
+                          db.volume_glance_metadata_bulk_create,
+                          ctxt, '2', {'key1': 'value1'})
+
     def test_vols_get_glance_metadata(self):
         ctxt = context.get_admin_context()
         db.volume_create(ctxt, {'id': '1'})
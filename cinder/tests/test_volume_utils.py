@@ -18,6 +18,8 @@
 import mock
 import os
 import re
+import shutil
+import tempfile
 
 from oslo.config import cfg
 
@@ -27,9 +29,11 @@ from cinder import exception
 from cinder.openstack.common import importutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import processutils
+from cinder.openstack.common import units
 from cinder import test
 from cinder.tests import fake_notifier
 from cinder import utils
+from cinder.volume import block_copy
 from cinder.volume import utils as volume_utils
 
 
@@ -217,6 +221,61 @@ class CopyVolumeTestCase(test.TestCase):
                                  CONF.volume_dd_blocksize, sync=True,
                                  ionice=None, execute=fake_utils_execute)
 
+    def test_copy_volume_dd_sparse(self):
+        cmds = []
+
+        def fake_utils_execute(*cmd, **kwargs):
+            cmds.append(cmd)
+
+        volume_utils.copy_volume('/dev/zero', '/dev/null', 1024, '1M',
+                                 sparse=True, execute=fake_utils_execute)
+        self.assertIn('conv=sparse', cmds[-1])
+
+    @mock.patch.object(block_copy, 'can_copy', return_value=True)
+    @mock.patch.object(block_copy, 'copy')
+    def test_copy_volume_native(self, mock_copy, mock_can_copy):
+        self.flags(volume_copy_engine='native', volume_copy_bps_limit=100)
+        execute = mock.Mock()
+        progress = mock.Mock()
+
+        volume_utils.copy_volume('/dev/src', '/dev/dst', 2, '1M', sync=True,
+                                 execute=execute, progress=progress)
+
+        mock_copy.assert_called_once_with('/dev/src', '/dev/dst',
+                                          2 * units.Mi, units.Mi, sync=True,
+                                          sparse=False, discard=True,
+                                          bps_limit=100, progress=progress)
+        self.assertFalse(execute.called)
+
+    def test_copy_volume_native_files(self):
+        self.flags(volume_copy_engine='native')
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        src = os.path.join(tmpdir, 'src')
+        dst = os.path.join(tmpdir, 'dst')
+        data = ('a' * units.Mi + '\0' * units.Mi) * 2
+        with open(src, 'w') as f:
+            f.write(data)
+        execute = mock.Mock()
+
+        volume_utils.copy_volume(src, dst, 4, '1M', execute=execute)
+
+        with open(dst) as f:
+            self.assertEqual(data, f.read())
+        self.assertFalse(execute.called)
+
+    @mock.patch.object(block_copy, 'can_copy', return_value=False)
+    @mock.patch.object(block_copy, 'copy')
+    def test_copy_volume_native_needs_root(self, mock_copy, mock_can_copy):
+        self.flags(volume_copy_engine='native')
+        execute = mock.Mock()
+
+        volume_utils.copy_volume('/dev/src', '/dev/dst', 2, '1M',
+                                 execute=execute)
+
+        self.assertFalse(mock_copy.called)
+        self.assertTrue(execute.called)
+
 
 class BlkioCgroupTestCase(test.TestCase):
 
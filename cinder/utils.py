@@ -19,7 +19,10 @@
 
 
 import contextlib
+import ctypes
+import ctypes.util
 import datetime
+import fcntl
 import hashlib
 import inspect
 import os
@@ -27,6 +30,7 @@ import pyclbr
 import re
 import shutil
 import stat
+import struct
 import sys
 import tempfile
 
@@ -55,6 +59,12 @@ PERFECT_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
 
 synchronized = lockutils.synchronized_with_prefix('cinder-')
 
+# _IO(0x12, 127) from linux/fs.h
+BLKZEROOUT = 0x127f
+# from linux/falloc.h
+FALLOC_FL_KEEP_SIZE = 0x01
+FALLOC_FL_PUNCH_HOLE = 0x02
+
 
 def find_config(config_path):
     """Find a configuration file using the given hint.
@@ -688,6 +698,46 @@ def get_blkdev_major_minor(path, lookup_for_file=True):
         raise exception.Error(msg)
 
 
+def _punch_hole(fileno, offset, length):
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    ret = libc.fallocate(fileno,
+                         FALLOC_FL_PUNCH_HOLE | FALLOC_FL_KEEP_SIZE,
+                         ctypes.c_longlong(offset),
+                         ctypes.c_longlong(length))
+    if ret != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+def zero_file_range(fileno, offset, length):
+    """Make a range of an open block device or regular file read as zeros.
+
+    Block devices are zeroed with the BLKZEROOUT ioctl, which lets thin
+    provisioned and discard capable storage release the range instead of
+    writing to it. Regular files get a hole punched, and are extended with
+    a hole if the range ends past their current size.
+
+    :returns: False if the range could not be zeroed this way, in which
+              case the caller has to write the zeros itself.
+    """
+    try:
+        st = os.fstat(fileno)
+        if stat.S_ISBLK(st.st_mode):
+            fcntl.ioctl(fileno, BLKZEROOUT, struct.pack('QQ', offset, length))
+        elif stat.S_ISREG(st.st_mode):
+            if offset < st.st_size:
+                _punch_hole(fileno, offset, min(length, st.st_size - offset))
+            if offset + length > st.st_size:
+                os.ftruncate(fileno, offset + length)
+        else:
+            return False
+    except (AttributeError, EnvironmentError) as err:
+        LOG.debug('Unable to zero %(length)d bytes at offset %(offset)d: '
+                  '%(err)s', {'length': length, 'offset': offset, 'err': err})
+        return False
+    return True
+
+
 def check_string_length(value, name, min_length=0, max_length=None):
     """Check the length of specified string
     :param value: the value of the string
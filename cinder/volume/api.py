@@ -290,7 +290,8 @@ class API(base.Base):
         return volume
 
     def get_all(self, context, marker=None, limit=None, sort_key='created_at',
-                sort_dir='desc', filters=None, viewable_admin_meta=False):
+                sort_dir='desc', filters=None, viewable_admin_meta=False,
+                offset=None, columns=None):
         check_policy(context, 'get_all')
         if filters == None:
             filters = {}
@@ -305,6 +306,16 @@ class API(base.Base):
             msg = _('limit param must be an integer')
             raise exception.InvalidInput(reason=msg)
 
+        try:
+            if offset is not None:
+                offset = int(offset)
+                if offset < 0:
+                    msg = _('offset param must be positive')
+                    raise exception.InvalidInput(reason=msg)
+        except ValueError:
+            msg = _('offset param must be an integer')
+            raise exception.InvalidInput(reason=msg)
+
         # Non-admin shouldn't see temporary target of a volume migration, add
         # unique filter data to reflect that only volumes with a NULL
         # 'migration_status' or a 'migration_status' that does not start with
@@ -319,7 +330,8 @@ class API(base.Base):
             # Need to remove all_tenants to pass the filtering below.
             del filters['all_tenants']
             volumes = self.db.volume_get_all(context, marker, limit, sort_key,
-                                             sort_dir, filters=filters)
+                                             sort_dir, filters=filters,
+                                             offset=offset, columns=columns)
         else:
             if viewable_admin_meta:
                 context = context.elevated()
@@ -327,7 +339,9 @@ class API(base.Base):
                                                         context.project_id,
                                                         marker, limit,
                                                         sort_key, sort_dir,
-                                                        filters=filters)
+                                                        filters=filters,
+                                                        offset=offset,
+                                                        columns=columns)
 
         return volumes
 
@@ -341,31 +355,29 @@ class API(base.Base):
         rv = self.db.volume_get(context, volume_id)
         return dict(rv.iteritems())
 
-    def get_all_snapshots(self, context, search_opts=None):
+    def get_all_snapshots(self, context, search_opts=None, limit=None,
+                          offset=None):
         check_policy(context, 'get_all_snapshots')
 
         search_opts = search_opts or {}
 
-        if (context.is_admin and 'all_tenants' in search_opts):
-            # Need to remove all_tenants to pass the filtering below.
+        all_tenants = (context.is_admin and 'all_tenants' in search_opts)
+        if all_tenants:
+            # all_tenants is not a snapshot column, keep it out of the
+            # filters passed to the DB.
             del search_opts['all_tenants']
-            snapshots = self.db.snapshot_get_all(context)
-        else:
-            snapshots = self.db.snapshot_get_all_by_project(
-                context, context.project_id)
 
         if search_opts:
             LOG.debug("Searching by: %s" % search_opts)
 
-            results = []
-            not_found = object()
-            for snapshot in snapshots:
-                for opt, value in search_opts.iteritems():
-                    if snapshot.get(opt, not_found) != value:
-                        break
-                else:
-                    results.append(snapshot)
-            snapshots = results
+        if all_tenants:
+            snapshots = self.db.snapshot_get_all(context,
+                                                 filters=search_opts,
+                                                 limit=limit, offset=offset)
+        else:
+            snapshots = self.db.snapshot_get_all_by_project(
+                context, context.project_id, filters=search_opts,
+                limit=limit, offset=offset)
         return snapshots
 
     @wrap_check_policy
@@ -0,0 +1,248 @@
+# Copyright (c) 2014 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""In-process block copy, an alternative to running dd.
+
+Blocks are read and written in native threads from eventlet's thread pool,
+so the copy does not block the service, and the next block is read while
+the previous one is written.  Buffers are aligned for O_DIRECT.
+"""
+
+import ctypes
+import errno
+import fcntl
+import io
+import os
+import stat
+import struct
+import time
+
+import eventlet
+from eventlet import tpool
+
+from cinder.openstack.common import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+# Alignment of the buffers, enough for O_DIRECT on any logical block size.
+DIRECT_IO_ALIGNMENT = 4096
+
+# Minimum number of seconds between two progress callbacks.
+PROGRESS_INTERVAL = 5
+
+# ioctls from linux/fs.h
+BLKDISCARD = 0x1277
+BLKDISCARDZEROES = 0x127c
+
+
+class TokenBucket(object):
+    """Limit the rate of a stream of bytes.
+
+    Up to one second worth of bytes can go through in a burst, after which
+    consume() sleeps as long as needed to keep to the rate.
+    """
+
+    def __init__(self, rate, clock=time.time, sleep=eventlet.sleep):
+        self.rate = rate
+        self.tokens = rate
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+
+    def consume(self, amount):
+        now = self._clock()
+        self.tokens = min(self.rate,
+                          self.tokens + (now - self._last) * self.rate)
+        self._last = now
+        self.tokens -= amount
+        if self.tokens < 0:
+            self._sleep(-self.tokens / float(self.rate))
+
+
+def can_copy(srcpath, dstpath):
+    """Check whether this process can open both paths itself.
+
+    dd runs as root, the engine runs as the service user, so devices the
+    service cannot open are still copied with dd.
+    """
+    if not os.access(srcpath, os.R_OK):
+        return False
+    if os.path.exists(dstpath):
+        return os.access(dstpath, os.W_OK)
+    return os.access(os.path.dirname(dstpath) or '.', os.W_OK)
+
+
+def _aligned_buffer(size):
+    raw = ctypes.create_string_buffer(size + DIRECT_IO_ALIGNMENT)
+    offset = -ctypes.addressof(raw) % DIRECT_IO_ALIGNMENT
+    # The array keeps a reference to raw, which owns the memory.
+    return (ctypes.c_char * size).from_buffer(raw, offset)
+
+
+def _open(path, flags, direct):
+    """Open path with O_DIRECT if asked and supported by its filesystem."""
+    if direct and hasattr(os, 'O_DIRECT'):
+        try:
+            return os.open(path, flags | os.O_DIRECT, 0o644)
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+            LOG.debug("O_DIRECT is not supported for %s." % path)
+    return os.open(path, flags, 0o644)
+
+
+def _discard_zeroes_data(fd):
+    """Check whether discarded blocks of a device read back as zeroes."""
+    if not stat.S_ISBLK(os.fstat(fd).st_mode):
+        return False
+    try:
+        result = fcntl.ioctl(fd, BLKDISCARDZEROES, struct.pack('I', 0))
+    except IOError:
+        return False
+    return struct.unpack('I', result)[0] == 1
+
+
+def _read_block(src, buf):
+    """Fill buf, returning how many bytes were read.
+
+    The whole buffer is always read, as O_DIRECT reads must be aligned;
+    files and devices only return fewer bytes at their end.
+    """
+    return src.readinto(memoryview(buf)) or 0
+
+
+def _write_block(dst, buf, length):
+    view = memoryview(buf)
+    done = 0
+    while done < length:
+        try:
+            done += dst.write(view[done:length])
+        except IOError as e:
+            # The last block of a file may not be a multiple of the
+            # logical block size, which O_DIRECT writes must be.
+            flags = fcntl.fcntl(dst.fileno(), fcntl.F_GETFL)
+            if (e.errno != errno.EINVAL or
+                    not flags & getattr(os, 'O_DIRECT', 0)):
+                raise
+            fcntl.fcntl(dst.fileno(), fcntl.F_SETFL, flags & ~os.O_DIRECT)
+
+
+def _in_thread(func, *args):
+    """Run func in a native thread without blocking other greenthreads."""
+    return eventlet.spawn(tpool.execute, func, *args)
+
+
+def copy(srcpath, dstpath, size, blocksize, direct=True, sync=False,
+         sparse=False, discard=False, bps_limit=0, progress=None):
+    """Copy up to size bytes from srcpath to dstpath.
+
+    Blocks of zeroes are not written when the destination is known to read
+    back zeroes where nothing was written: regular files, which are
+    truncated like dd does, or any destination if sparse is set.
+
+    :param blocksize: bytes read and written at a time
+    :param direct: bypass the page cache if the paths support O_DIRECT
+    :param sync: flush the destination to disk before returning
+    :param sparse: the caller guarantees that dstpath reads back zeroes
+    :param discard: discard blocks of zeroes rather than writing them, on
+                    devices which read back discarded blocks as zeroes
+    :param bps_limit: maximum bytes per second to copy, 0 for no limit
+    :param progress: called with the bytes copied so far and size, at most
+                     every PROGRESS_INTERVAL seconds and once done
+    :returns: the number of bytes copied
+    """
+    if blocksize % DIRECT_IO_ALIGNMENT:
+        direct = False
+    limiter = TokenBucket(bps_limit) if bps_limit else None
+    src = io.FileIO(_open(srcpath, os.O_RDONLY, direct), 'r')
+    try:
+        dst = io.FileIO(_open(dstpath, os.O_WRONLY | os.O_CREAT, direct),
+                        'w')
+        try:
+            is_file = stat.S_ISREG(os.fstat(dst.fileno()).st_mode)
+            if is_file:
+                dst.truncate(0)
+            skip_zeroes = sparse or is_file
+            discard = discard and not skip_zeroes and \
+                _discard_zeroes_data(dst.fileno())
+            zeroes = '\0' * blocksize if skip_zeroes or discard else None
+
+            copied = _copy_blocks(src, dst, size, blocksize, zeroes,
+                                  discard, limiter, progress)
+
+            if is_file and os.fstat(dst.fileno()).st_size < copied:
+                # The file ends in zeroes which were skipped.
+                dst.truncate(copied)
+            if sync:
+                tpool.execute(os.fsync, dst.fileno())
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return copied
+
+
+def _copy_blocks(src, dst, size, blocksize, zeroes, discard, limiter,
+                 progress):
+    buffers = [_aligned_buffer(blocksize), _aligned_buffer(blocksize)]
+    copied = skipped = 0
+    last_progress = time.time()
+
+    reading = _in_thread(_read_block, src, buffers[0])
+    current = 0
+    try:
+        while reading is not None:
+            length = min(reading.wait(), size - copied)
+            if not length:
+                break
+            buf = buffers[current]
+            current = 1 - current
+            # A short read means the end of the source.
+            if copied + length < size and length == blocksize:
+                reading = _in_thread(_read_block, src, buffers[current])
+            else:
+                reading = None
+
+            if zeroes is not None and buf.raw[:length] == zeroes[:length]:
+                offset = copied
+                if discard:
+                    fcntl.ioctl(dst.fileno(), BLKDISCARD,
+                                struct.pack('QQ', offset, length))
+                dst.seek(offset + length)
+                skipped += length
+            else:
+                tpool.execute(_write_block, dst, buf, length)
+            copied += length
+
+            if limiter:
+                limiter.consume(length)
+            if progress and time.time() - last_progress >= PROGRESS_INTERVAL:
+                last_progress = time.time()
+                progress(copied, size)
+    finally:
+        # src is closed once this returns or raises, so a native read of
+        # the next block must be over by then.
+        if reading is not None:
+            try:
+                reading.wait()
+            except Exception:
+                pass
+
+    if progress:
+        progress(copied, size)
+    LOG.debug("Copied %(copied)d bytes, of which %(skipped)d bytes of "
+              "zeroes were not written." %
+              {'copied': copied, 'skipped': skipped})
+    return copied
@@ -113,6 +113,12 @@ volume_opts = [
                default=0,
                help='The upper limit of bandwidth of volume copy. '
                     '0 => unlimited'),
+    cfg.StrOpt('volume_copy_engine',
+               default='dd',
+               help='How volumes are copied and cleared: dd, or native to '
+                    'copy in the volume service itself, skipping blocks of '
+                    'zeroes where possible. native falls back to dd for '
+                    'devices the service cannot open without root'),
     cfg.StrOpt('iscsi_write_cache',
                default='on',
                help='Sets the behavior of the iSCSI target to either '
@@ -349,11 +355,19 @@ class VolumeDriver(object):
         copy_error = True
         try:
             size_in_mb = int(src_vol['size']) * 1024    # vol size is in GB
+
+            def _progress(copied, total):
+                LOG.debug("Copied %(percent)d%% of volume %(src)s to "
+                          "%(dest)s." %
+                          {'percent': copied * 100 / total,
+                           'src': src_vol['id'], 'dest': dest_vol['id']})
+
             volume_utils.copy_volume(
                 src_attach_info['device']['path'],
                 dest_attach_info['device']['path'],
                 size_in_mb,
-                self.configuration.volume_dd_blocksize)
+                self.configuration.volume_dd_blocksize,
+                progress=_progress)
             copy_error = False
         except Exception:
             with excutils.save_and_reraise_exception():
@@ -640,6 +654,17 @@ class VolumeDriver(object):
         """Synchronously recreates an export for a volume."""
         raise NotImplementedError()
 
+    def ensure_exports(self, context, volumes):
+        """Synchronously recreates the exports of many volumes.
+
+        Drivers which can re-export volumes in one backend call implement
+        this; the others have ensure_export called for each volume.
+
+        Returns a dict mapping the ids of the volumes which could not be
+        re-exported to the exception raised, or None if not implemented.
+        """
+        return None
+
     def create_export(self, context, volume):
         """Exports the volume.
 
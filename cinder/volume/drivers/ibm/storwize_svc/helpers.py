@@ -39,6 +39,8 @@ class StorwizeHelpers(object):
     def __init__(self, run_ssh):
         self.ssh = storwize_ssh.StorwizeSSH(run_ssh)
         self.check_fcmapping_interval = 3
+        # Host names by iSCSI name or lower-cased WWPN, checked on use
+        self._host_index = {}
 
     @staticmethod
     def handle_keyerror(cmd, out):
@@ -175,12 +177,64 @@ class StorwizeHelpers(object):
                 wwpns.add(wwpn)
         return list(wwpns)
 
+    @staticmethod
+    def _connector_ports(connector):
+        """Return the ports of the connector that identify its host."""
+        if 'initiator' in connector:
+            return [connector['initiator']]
+        if 'wwpns' in connector:
+            return [str(x).lower() for x in connector['wwpns']]
+        return []
+
+    def _host_matches(self, resp, connector):
+        """Check the output of lshost <host> against the connector."""
+        ports = self._connector_ports(connector)
+        if 'initiator' in connector:
+            return any(iscsi in ports for iscsi in resp.select('iscsi_name'))
+        return any(wwpn and wwpn.lower() in ports
+                   for wwpn in resp.select('WWPN'))
+
+    def _index_host(self, host_name, resp=None, ports=()):
+        """Index the ports of a host, from lshost <host> output if given."""
+        if resp is not None:
+            self._unindex_host(host_name)
+            ports = [iscsi for iscsi in resp.select('iscsi_name') if iscsi]
+            ports += [wwpn.lower() for wwpn in resp.select('WWPN') if wwpn]
+        for port in ports:
+            self._host_index[port] = host_name
+
+    def _unindex_host(self, host_name):
+        for port, name in self._host_index.items():
+            if name == host_name:
+                del self._host_index[port]
+
+    def _get_indexed_host(self, connector):
+        """Return the indexed host of the connector if it still matches."""
+        for port in self._connector_ports(connector):
+            host_name = self._host_index.get(port)
+            if host_name is None:
+                continue
+            resp = self.ssh.lshost_if_exists(host_name)
+            if resp is None:
+                # The host was deleted by someone else
+                self._unindex_host(host_name)
+            elif self._host_matches(resp, connector):
+                return host_name
+            else:
+                self._index_host(host_name, resp)
+        return None
+
     def get_host_from_connector(self, connector):
         """Return the Storwize host described by the connector."""
         LOG.debug('enter: get_host_from_connector: %s' % connector)
 
+        # Hosts found or created before are checked with one command
+        host_name = self._get_indexed_host(connector)
+        if host_name:
+            LOG.debug('leave: get_host_from_connector: host %s' % host_name)
+            return host_name
+
         # If we have FC information, we have a faster lookup option
-        host_name = None
         if 'wwpns' in connector:
             for wwpn in connector['wwpns']:
                 resp = self.ssh.lsfabric(wwpn=wwpn)
@@ -198,25 +252,17 @@ class StorwizeHelpers(object):
             LOG.debug('leave: get_host_from_connector: host %s' % host_name)
             return host_name
 
-        # That didn't work, so try exhaustive search
+        # That didn't work, so try exhaustive search, indexing the hosts
+        # on the way and dropping the ones which no longer exist
         hosts_info = self.ssh.lshost()
-        found = False
-        for name in hosts_info.select('name'):
+        names = list(hosts_info.select('name'))
+        for name in set(self._host_index.values()) - set(names):
+            self._unindex_host(name)
+        for name in names:
             resp = self.ssh.lshost(host=name)
-            if 'initiator' in connector:
-                for iscsi in resp.select('iscsi_name'):
-                    if iscsi == connector['initiator']:
-                        host_name = name
-                        found = True
-                        break
-            elif 'wwpns' in connector and len(connector['wwpns']):
-                connector_wwpns = [str(x).lower() for x in connector['wwpns']]
-                for wwpn in resp.select('WWPN'):
-                    if wwpn and wwpn.lower() in connector_wwpns:
-                        host_name = name
-                        found = True
-                        break
-            if found:
+            self._index_host(name, resp)
+            if self._host_matches(resp, connector):
+                host_name = name
                 break
 
         LOG.debug('leave: get_host_from_connector: host %s' % host_name)
@@ -277,12 +323,16 @@ class StorwizeHelpers(object):
         for port in ports:
             self.ssh.addhostport(host_name, port[0], port[1])
 
+        self._index_host(host_name,
+                         ports=self._connector_ports(connector))
+
         LOG.debug('leave: create_host: host %(host)s - %(host_name)s' %
                   {'host': connector['host'], 'host_name': host_name})
         return host_name
 
     def delete_host(self, host_name):
         self.ssh.rmhost(host_name)
+        self._unindex_host(host_name)
 
     def map_vol_to_host(self, volume_name, host_name, multihostmap):
         """Create a mapping between a volume to a host."""
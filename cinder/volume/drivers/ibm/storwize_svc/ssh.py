@@ -127,6 +127,23 @@ class StorwizeSSH(object):
             ssh_cmd.append('"%s"' % host)
         return self.run_ssh_info(ssh_cmd, with_header=with_header)
 
+    def lshost_if_exists(self, host):
+        """Return host attributes or None if it doesn't exist."""
+        ssh_cmd = ['svcinfo', 'lshost', '-delim', '!', '"%s"' % host]
+        out, err = self._ssh(ssh_cmd, check_exit_code=False)
+        if not len(err):
+            return CLIResponse((out, err), ssh_cmd=ssh_cmd, delim='!',
+                               with_header=False)
+        if err.startswith('CMMVC5754E'):
+            return None
+        msg = (_('CLI Exception output:\n command: %(cmd)s\n '
+                 'stdout: %(out)s\n stderr: %(err)s') %
+               {'cmd': ssh_cmd,
+                'out': out,
+                'err': err})
+        LOG.error(msg)
+        raise exception.VolumeBackendAPIException(data=msg)
+
     def add_chap_secret(self, secret, host):
         ssh_cmd = ['svctask', 'chhost', '-chapsecret', secret, '"%s"' % host]
         self.run_ssh_assert_no_output(ssh_cmd)
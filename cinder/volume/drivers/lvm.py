@@ -50,6 +50,12 @@ volume_opts = [
     cfg.StrOpt('lvm_type',
                default='default',
                help='Type of LVM volumes to deploy; (default or thin)'),
+    cfg.IntOpt('lvm_inventory_cache_ttl',
+               default=0,
+               help='Seconds to serve LV, PV and VG information from memory '
+                    'instead of running lvs, pvs and vgs again. The cache is '
+                    'dropped when Cinder changes the VG; only set this if no '
+                    'other service changes the VG. 0 disables the cache'),
 ]
 
 CONF = cfg.CONF
@@ -78,10 +84,12 @@ class LVMVolumeDriver(driver.VolumeDriver):
         if self.vg is None:
             root_helper = utils.get_root_helper()
             try:
-                self.vg = lvm.LVM(self.configuration.volume_group,
-                                  root_helper,
-                                  lvm_type=self.configuration.lvm_type,
-                                  executor=self._execute)
+                self.vg = lvm.LVM(
+                    self.configuration.volume_group,
+                    root_helper,
+                    lvm_type=self.configuration.lvm_type,
+                    executor=self._execute,
+                    inventory_ttl=self.configuration.lvm_inventory_cache_ttl)
             except brick_exception.VolumeGroupNotFound:
                 message = ("Volume Group %s does not exist" %
                            self.configuration.volume_group)
@@ -209,11 +217,13 @@ class LVMVolumeDriver(driver.VolumeDriver):
 
         # copy_volume expects sizes in MiB, we store integer GiB
         # be sure to convert before passing in
+        # A new thin LV reads back zeroes, so zeroes need not be written.
         volutils.copy_volume(self.local_path(snapshot),
                              self.local_path(volume),
                              snapshot['volume_size'] * units.Ki,
                              self.configuration.volume_dd_blocksize,
-                             execute=self._execute)
+                             execute=self._execute,
+                             sparse=self.configuration.lvm_type == 'thin')
 
     def delete_volume(self, volume):
         """Deletes a logical volume."""
@@ -571,6 +581,7 @@ class LVMISCSIDriver(LVMVolumeDriver, driver.ISCSIDriver):
         if (dest_type != 'LVMVolumeDriver' or dest_hostname != self.hostname):
             return false_ret
 
+        sparse = False
         if dest_vg != self.vg.vg_name:
             vg_list = volutils.get_all_volume_groups()
             try:
@@ -582,21 +593,27 @@ class LVMISCSIDriver(LVMVolumeDriver, driver.ISCSIDriver):
                 return false_ret
 
             helper = utils.get_root_helper()
-            dest_vg_ref = lvm.LVM(dest_vg, helper,
-                                  lvm_type=lvm_type,
-                                  executor=self._execute)
+            dest_vg_ref = lvm.LVM(
+                dest_vg, helper,
+                lvm_type=lvm_type,
+                executor=self._execute,
+                inventory_ttl=self.configuration.lvm_inventory_cache_ttl)
             self.remove_export(ctxt, volume)
             self._create_volume(volume['name'],
                                 self._sizestr(volume['size']),
                                 lvm_type,
                                 lvm_mirrors,
                                 dest_vg_ref)
+            # A new thin LV reads back zeroes, so zeroes need not be
+            # written.
+            sparse = lvm_type == 'thin'
 
         volutils.copy_volume(self.local_path(volume),
                              self.local_path(volume, vg=dest_vg),
                              volume['size'],
                              self.configuration.volume_dd_blocksize,
-                             execute=self._execute)
+                             execute=self._execute,
+                             sparse=sparse)
         self._delete_volume(volume)
         model_update = self._create_export(ctxt, volume, vg=dest_vg)
 
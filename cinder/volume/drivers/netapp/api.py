@@ -19,8 +19,13 @@ NetApp api for ONTAP and OnCommand DFM.
 Contains classes required to issue api calls to ONTAP and OnCommand DFM.
 """
 
+import base64
+import httplib
+import socket
+import threading
+import time
+
 from lxml import etree
-import urllib2
 
 from cinder.openstack.common.gettextutils import _
 from cinder.openstack.common import log as logging
@@ -29,6 +34,62 @@ LOG = logging.getLogger(__name__)
 
 ESIS_CLONE_NOT_LICENSED = '14956'
 
+DEFAULT_POOL_SIZE = 4
+
+
+class NaConnectionPool(object):
+    """Keep-alive connections to a server, shared by copies of a client.
+
+    Up to size idle connections are kept open. Callers never wait for a
+    connection: one is opened when none is idle and closed after use if
+    the pool is full. Request counts and latencies are kept per api name.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = []
+        self._key = None
+        self._stats = {}
+
+    def get(self, key, create):
+        """Get an idle connection to key or a new one from create().
+
+        :returns: the connection and whether it was used before
+        """
+        with self._lock:
+            stale = []
+            if key != self._key:
+                stale, self._idle, self._key = self._idle, [], key
+            conn = self._idle.pop() if self._idle else None
+        for old in stale:
+            old.close()
+        if conn is not None:
+            return conn, True
+        return create(), False
+
+    def put(self, key, conn):
+        """Return a connection which can be reused."""
+        with self._lock:
+            if key == self._key and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def record(self, api, seconds, failed=False):
+        with self._lock:
+            stats = self._stats.setdefault(
+                api, {'requests': 0, 'failures': 0, 'seconds': 0.0})
+            stats['requests'] += 1
+            stats['seconds'] += seconds
+            if failed:
+                stats['failures'] += 1
+
+    def get_stats(self):
+        with self._lock:
+            return dict((api, dict(stats))
+                        for api, stats in self._stats.items())
+
 
 class NaServer(object):
     """Encapsulates server connection logic."""
@@ -46,14 +107,15 @@ class NaServer(object):
     def __init__(self, host, server_type=SERVER_TYPE_FILER,
                  transport_type=TRANSPORT_TYPE_HTTP,
                  style=STYLE_LOGIN_PASSWORD, username=None,
-                 password=None):
+                 password=None, pool_size=DEFAULT_POOL_SIZE):
         self._host = host
         self.set_server_type(server_type)
         self.set_transport_type(transport_type)
         self.set_style(style)
         self._username = username
         self._password = password
-        self._refresh_conn = True
+        # Copies made to tunnel to a vserver or vfiler share the pool.
+        self._connections = NaConnectionPool(pool_size)
 
     def get_transport_type(self):
         """Get the transport type protocol."""
@@ -79,7 +141,6 @@ class NaServer(object):
                 self.set_port(443)
             else:
                 self.set_port(8488)
-        self._refresh_conn = True
 
     def get_style(self):
         """Get the authorization style for communicating with the server."""
@@ -113,7 +174,6 @@ class NaServer(object):
         else:
             self._url = NaServer.URL_DFM
         self._ns = NaServer.NETAPP_NS
-        self._refresh_conn = True
 
     def set_api_version(self, major, minor):
         """Set the api version."""
@@ -123,7 +183,6 @@ class NaServer(object):
             self._api_version = str(major) + "." + str(minor)
         except ValueError:
             raise ValueError('Major and minor versions must be integers')
-        self._refresh_conn = True
 
     def get_api_version(self):
         """Gets the api version tuple."""
@@ -138,7 +197,6 @@ class NaServer(object):
         except ValueError:
             raise ValueError('Port must be integer')
         self._port = str(port)
-        self._refresh_conn = True
 
     def get_port(self):
         """Get the server communication port."""
@@ -176,31 +234,31 @@ class NaServer(object):
     def set_username(self, username):
         """Set the user name for authentication."""
         self._username = username
-        self._refresh_conn = True
 
     def set_password(self, password):
         """Set the password for authentication."""
         self._password = password
-        self._refresh_conn = True
+
+    def get_stats(self):
+        """Gets request counts, failures and seconds spent per api name."""
+        return self._connections.get_stats()
 
     def invoke_elem(self, na_element, enable_tunneling=False):
         """Invoke the api on the server."""
         if na_element and not isinstance(na_element, NaElement):
             ValueError('NaElement must be supplied to invoke api')
         request = self._create_request(na_element, enable_tunneling)
-        if not hasattr(self, '_opener') or not self._opener \
-                or self._refresh_conn:
-            self._build_opener()
+        headers = {'Content-Type': 'text/xml', 'charset': 'utf-8',
+                   'Content-Length': str(len(request))}
+        headers.update(self._get_auth_headers())
+        start = time.time()
         try:
-            if hasattr(self, '_timeout'):
-                response = self._opener.open(request, timeout=self._timeout)
-            else:
-                response = self._opener.open(request)
-        except urllib2.HTTPError as e:
-            raise NaApiError(e.code, e.msg)
-        except Exception as e:
-            raise NaApiError('Unexpected error', e)
-        xml = response.read()
+            xml = self._send_request(request, headers)
+        except Exception:
+            self._connections.record(na_element.get_name(),
+                                     time.time() - start, failed=True)
+            raise
+        self._connections.record(na_element.get_name(), time.time() - start)
         return self._get_result(xml)
 
     def invoke_successfully(self, na_element, enable_tunneling=False):
@@ -234,11 +292,7 @@ class NaServer(object):
         if enable_tunneling:
             self._enable_tunnel_request(netapp_elem)
         netapp_elem.add_child_elem(na_element)
-        request_d = netapp_elem.to_string()
-        request = urllib2.Request(
-            self._get_url(), data=request_d,
-            headers={'Content-Type': 'text/xml', 'charset': 'utf-8'})
-        return request
+        return netapp_elem.to_string()
 
     def _enable_tunnel_request(self, netapp_elem):
         """Enables vserver or vfiler tunneling."""
@@ -277,24 +331,67 @@ class NaServer(object):
         return '%s://%s:%s/%s' % (self._protocol, self._host, self._port,
                                   self._url)
 
-    def _build_opener(self):
+    def _get_auth_headers(self):
         if self._auth_style == NaServer.STYLE_LOGIN_PASSWORD:
-            auth_handler = self._create_basic_auth_handler()
-        else:
-            auth_handler = self._create_certificate_auth_handler()
-        opener = urllib2.build_opener(auth_handler)
-        self._opener = opener
-
-    def _create_basic_auth_handler(self):
-        password_man = urllib2.HTTPPasswordMgrWithDefaultRealm()
-        password_man.add_password(None, self._get_url(), self._username,
-                                  self._password)
-        auth_handler = urllib2.HTTPBasicAuthHandler(password_man)
-        return auth_handler
-
-    def _create_certificate_auth_handler(self):
+            credentials = '%s:%s' % (self._username, self._password)
+            return {'Authorization': 'Basic %s' %
+                    base64.b64encode(credentials)}
         raise NotImplementedError()
 
+    def _create_connection(self):
+        host = '%s:%s' % (self._host, self._port)
+        if self._protocol == NaServer.TRANSPORT_TYPE_HTTPS:
+            return httplib.HTTPSConnection(host, timeout=self.get_timeout())
+        return httplib.HTTPConnection(host, timeout=self.get_timeout())
+
+    def _send_request(self, request, headers):
+        """Post the request on a pooled connection, returning the body.
+
+        A pooled connection may have been closed by the server while idle.
+        The request is then sent once more on a new connection, but only if
+        it cannot have reached the server: sending it failed, or the
+        connection was closed without any status line. ZAPI calls such as
+        clone-start are not idempotent, so any other failure is raised.
+        """
+        # Connections are opened with the timeout, changing it resets the
+        # pool as changing the server does.
+        key = (self._protocol, self._host, self._port, self.get_timeout())
+        conn, reused = self._connections.get(key, self._create_connection)
+        try:
+            sent = False
+            try:
+                conn.request('POST', '/%s' % self._url, request, headers)
+                sent = True
+                response = conn.getresponse()
+            except (socket.error, httplib.HTTPException) as e:
+                if not reused or not self._closed_while_idle(e, sent):
+                    raise
+                LOG.debug("Reconnecting to %(url)s: %(error)s" %
+                          {'url': self._get_url(), 'error': e})
+                conn.close()
+                conn = self._create_connection()
+                conn.request('POST', '/%s' % self._url, request, headers)
+                response = conn.getresponse()
+            # The body must be read before the connection is used again.
+            status, reason = response.status, response.reason
+            body = response.read()
+        except Exception as e:
+            conn.close()
+            raise NaApiError('Unexpected error', e)
+        self._connections.put(key, conn)
+        if not 200 <= status < 300:
+            raise NaApiError(status, reason)
+        return body
+
+    @staticmethod
+    def _closed_while_idle(error, sent):
+        """Check whether error shows the request never reached the server."""
+        if not sent:
+            return not isinstance(error, socket.timeout)
+        # httplib reports an empty status line as "''".
+        return (isinstance(error, httplib.BadStatusLine) and
+                error.line in ('', "''"))
+
     def __str__(self):
         return "server: %s" % (self._host)
 
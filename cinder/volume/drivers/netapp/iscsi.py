@@ -109,7 +109,8 @@ class NetAppDirectISCSIDriver(driver.ISCSIDriver):
                                transport_type=kwargs['transport_type'],
                                style=NaServer.STYLE_LOGIN_PASSWORD,
                                username=kwargs['login'],
-                               password=kwargs['password'])
+                               password=kwargs['password'],
+                               pool_size=kwargs['pool_size'])
 
     def _do_custom_setup(self):
         """Does custom setup depending on the type of filer."""
@@ -137,7 +138,8 @@ class NetAppDirectISCSIDriver(driver.ISCSIDriver):
             login=self.configuration.netapp_login,
             password=self.configuration.netapp_password,
             hostname=self.configuration.netapp_server_hostname,
-            port=self.configuration.netapp_server_port)
+            port=self.configuration.netapp_server_port,
+            pool_size=self.configuration.netapp_connection_pool_size)
         self._do_custom_setup()
 
     def check_for_setup_error(self):
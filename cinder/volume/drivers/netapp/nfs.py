@@ -677,7 +677,8 @@ class NetAppDirectNfsDriver (NetAppNFSDriver):
             transport_type=self.configuration.netapp_transport_type,
             style=NaServer.STYLE_LOGIN_PASSWORD,
             username=self.configuration.netapp_login,
-            password=self.configuration.netapp_password)
+            password=self.configuration.netapp_password,
+            pool_size=self.configuration.netapp_connection_pool_size)
         return client
 
     def _do_custom_setup(self, client):
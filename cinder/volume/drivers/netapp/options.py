@@ -49,7 +49,13 @@ netapp_connection_opts = [
                      'system or proxy server. Traditionally, port 80 is used '
                      'for HTTP and port 443 is used for HTTPS; however, this '
                      'value should be changed if an alternate port has been '
-                     'configured on the storage system or proxy server.')), ]
+                     'configured on the storage system or proxy server.')),
+    cfg.IntOpt('netapp_connection_pool_size',
+               default=4,
+               help=('The number of idle connections kept open to the '
+                     'storage system for reuse by Data ONTAP drivers. Set '
+                     'it to 0 to open a new connection for every request.')),
+]
 
 netapp_transport_opts = [
     cfg.StrOpt('netapp_transport_type',
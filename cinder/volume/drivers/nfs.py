@@ -25,6 +25,7 @@ from cinder.image import image_utils
 from cinder.openstack.common.gettextutils import _
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import processutils as putils
+from cinder.openstack.common import timeutils
 from cinder.openstack.common import units
 from cinder import utils
 from cinder.volume import driver
@@ -59,6 +60,14 @@ volume_opts = [
                default=None,
                help=('Mount options passed to the nfs client. See section '
                      'of the nfs man page for details.')),
+    cfg.IntOpt('nfs_capacity_refresh_interval',
+               default=0,
+               help=('Seconds for which the capacity of a share, measured '
+                     'with stat and du, is cached. Volumes created, '
+                     'extended and deleted by the driver are accounted for '
+                     'in the cached capacity until the periodic stats '
+                     'update measures it again. 0 measures the shares '
+                     'every time.')),
 ]
 
 nas_opts = [
@@ -357,7 +366,7 @@ class RemoteFsDriver(driver.VolumeDriver):
         global_capacity = 0
         global_free = 0
         for share in self._mounted_shares:
-            capacity, free, used = self._get_capacity_info(share)
+            capacity, free, used = self._get_share_capacity(share)
             global_capacity += capacity
             global_free += free
 
@@ -382,6 +391,10 @@ class RemoteFsDriver(driver.VolumeDriver):
             else:
                 raise
 
+    def _get_share_capacity(self, share):
+        """Return the capacity info of a share, which may be cached."""
+        return self._get_capacity_info(share)
+
     def _get_capacity_info(self, nfs_share):
         raise NotImplementedError()
 
@@ -404,6 +417,9 @@ class NfsDriver(RemoteFsDriver):
 
     def __init__(self, execute=putils.execute, *args, **kwargs):
         self._remotefsclient = None
+        # share -> [total_size, total_available, total_allocated,
+        #           measured_at]
+        self._share_capacity = {}
         super(NfsDriver, self).__init__(*args, **kwargs)
         self.configuration.append_config_values(volume_opts)
         root_helper = utils.get_root_helper()
@@ -489,7 +505,7 @@ class NfsDriver(RemoteFsDriver):
             if not self._is_share_eligible(nfs_share, volume_size_in_gib):
                 continue
             total_size, total_available, total_allocated = \
-                self._get_capacity_info(nfs_share)
+                self._get_share_capacity(nfs_share)
             if target_share is not None:
                 if target_share_reserved > total_allocated:
                     target_share = nfs_share
@@ -504,6 +520,9 @@ class NfsDriver(RemoteFsDriver):
 
         LOG.debug('Selected %s as target nfs share.', target_share)
 
+        # Account for the volume now, so that concurrent creates do not all
+        # pick the share on the same cached capacity.
+        self._account_share_allocation(target_share, volume_size_in_gib)
         return target_share
 
     def _is_share_eligible(self, nfs_share, volume_size_in_gib):
@@ -525,7 +544,7 @@ class NfsDriver(RemoteFsDriver):
         requested_volume_size = volume_size_in_gib * units.Gi
 
         total_size, total_available, total_allocated = \
-            self._get_capacity_info(nfs_share)
+            self._get_share_capacity(nfs_share)
         apparent_size = max(0, total_size * oversub_ratio)
         apparent_available = max(0, apparent_size - total_allocated)
         used = (total_size - total_available) / total_size
@@ -550,6 +569,36 @@ class NfsDriver(RemoteFsDriver):
         """Needed by parent class."""
         return self._remotefsclient.get_mount_point(nfs_share)
 
+    def _get_share_capacity(self, nfs_share):
+        """Return the capacity info of a share, cached if enabled.
+
+        The share is only measured with _get_capacity_info when its cached
+        capacity is missing or older than nfs_capacity_refresh_interval.
+        """
+        interval = self.configuration.nfs_capacity_refresh_interval
+        cached = self._share_capacity.get(nfs_share)
+        if (interval and cached is not None and
+                not timeutils.is_older_than(cached[3], interval)):
+            return tuple(cached[:3])
+
+        capacity = self._get_capacity_info(nfs_share)
+        if interval:
+            self._share_capacity[nfs_share] = (list(capacity) +
+                                               [timeutils.utcnow()])
+        return capacity
+
+    def _account_share_allocation(self, nfs_share, size_in_gib):
+        """Add a volume size change to the cached capacity of a share."""
+        cached = self._share_capacity.get(nfs_share)
+        if cached is None:
+            return
+        size = size_in_gib * units.Gi
+        cached[2] += size
+        # Sparse files only take space once written, which the next
+        # measurement of the share accounts for.
+        if not self.configuration.nfs_sparsed_volumes:
+            cached[1] -= size
+
     def _get_capacity_info(self, nfs_share):
         """Calculate available space on the NFS share.
 
@@ -587,6 +636,18 @@ class NfsDriver(RemoteFsDriver):
         if not self._is_file_size_equal(path, new_size):
             raise exception.ExtendVolumeError(
                 reason='Resizing image file failed.')
+        self._account_share_allocation(volume['provider_location'],
+                                       extend_by)
+
+    def delete_volume(self, volume):
+        """Deletes a logical volume.
+
+        :param volume: volume reference
+        """
+        super(NfsDriver, self).delete_volume(volume)
+        if volume['provider_location']:
+            self._account_share_allocation(volume['provider_location'],
+                                           -volume['size'])
 
     def _is_file_size_equal(self, path, size):
         """Checks if file size at path is equal to size."""
@@ -14,17 +14,23 @@
 """RADOS Block Device Driver"""
 
 from __future__ import absolute_import
+import collections
+import contextlib
+import functools
 import io
 import json
 import math
 import os
 import tempfile
+import threading
+import time
 import urllib
 
 from oslo.config import cfg
 
 from cinder import exception
 from cinder.image import image_utils
+from cinder.openstack.common import excutils
 from cinder.openstack.common import fileutils
 from cinder.openstack.common.gettextutils import _
 from cinder.openstack.common import log as logging
@@ -77,7 +83,15 @@ rbd_opts = [
     cfg.IntOpt('rados_connect_timeout', default=-1,
                help=_('Timeout value (in seconds) used when connecting to '
                       'ceph cluster. If value < 0, no timeout is set and '
-                      'default librados value is used.'))
+                      'default librados value is used.')),
+    cfg.IntOpt('rados_connection_pool_size', default=4,
+               help=_('Maximum number of idle connections to the ceph '
+                      'cluster kept open for reuse, per RADOS pool. Set to '
+                      '0 to connect for every operation.')),
+    cfg.IntOpt('rados_connection_pool_max_active', default=32,
+               help=_('Maximum number of connections to the ceph cluster '
+                      'in use at once, per RADOS pool. Operations wait for '
+                      'a connection beyond that. Set to 0 for no limit.')),
 ]
 
 CONF = cfg.CONF
@@ -89,8 +103,9 @@ class RBDImageMetadata(object):
     def __init__(self, image, pool, user, conf):
         self.image = image
         self.pool = strutils.safe_encode(pool)
-        self.user = strutils.safe_encode(user)
-        self.conf = strutils.safe_encode(conf)
+        # NOTE: rbd_user is not set when cephx is not used.
+        self.user = strutils.safe_encode(user) if user is not None else None
+        self.conf = strutils.safe_encode(conf) if conf is not None else None
 
 
 class RBDImageIOWrapper(io.RawIOBase):
@@ -191,6 +206,147 @@ class RBDImageIOWrapper(io.RawIOBase):
         pass
 
 
+class RADOSConnectionPool(object):
+    """Keeps connections to ceph clusters open between operations.
+
+    Connecting to a cluster means a monitor handshake and a new librados
+    thread, so returned connections are kept per (conffile, user, RADOS
+    pool) key and handed out again if they are still connected. One pool is
+    shared by the RBD volume driver and the Ceph backup driver of a process,
+    see get_rados_connection_pool(). Connections returned after an error are
+    closed, and so are connections left idle for idle_timeout seconds.
+    """
+
+    def __init__(self, idle_timeout=300, wait_timeout=60):
+        """Create the pool.
+
+        :param idle_timeout: seconds after which idle connections are closed,
+                             0 to keep them until close_idle() is called
+        :param wait_timeout: seconds get() waits for a connection when the
+                             maximum number of them is checked out
+        """
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition()
+        self._idle = collections.defaultdict(collections.deque)
+        self._active = collections.defaultdict(int)
+        self._max_idle = {}
+        self._checked_out = {}
+        self.stats = {'connected': 0, 'reused': 0, 'closed': 0}
+
+    @staticmethod
+    def _is_connected(client):
+        return client.state == 'connected'
+
+    def get(self, key, connect, max_idle, max_active=0):
+        """Check out a (client, ioctx) tuple.
+
+        :param key: (conffile, user, RADOS pool) tuple of the connection
+        :param connect: callable returning a new (client, ioctx) tuple for key
+        :param max_idle: number of idle connections kept for key
+        :param max_active: number of connections for key checked out at
+                           once, 0 for no limit
+        """
+        if self.idle_timeout:
+            self.close_idle(self.idle_timeout)
+
+        conn = None
+        stale = []
+        with self._cond:
+            deadline = time.time() + self.wait_timeout
+            while max_active and self._active[key] >= max_active:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    msg = (_('Timed out waiting for a connection to RADOS '
+                             'pool %s.') % key[2])
+                    raise exception.VolumeBackendAPIException(data=msg)
+                self._cond.wait(remaining)
+            self._active[key] += 1
+            self._max_idle[key] = max_idle
+
+            idle = self._idle[key]
+            while idle:
+                client, ioctx, _since = idle.pop()
+                if self._is_connected(client):
+                    self.stats['reused'] += 1
+                    conn = client, ioctx
+                    break
+                stale.append((client, ioctx))
+
+        for client, ioctx in stale:
+            LOG.debug("dropping stale connection to ceph cluster.")
+            self._close(client, ioctx)
+
+        if conn is None:
+            try:
+                conn = connect()
+            except Exception:
+                with excutils.save_and_reraise_exception():
+                    self._release(key)
+            self.stats['connected'] += 1
+
+        with self._cond:
+            self._checked_out[conn[1]] = key
+        return conn
+
+    def put(self, client, ioctx, discard=False):
+        """Return a connection checked out with get().
+
+        :param discard: close the connection rather than keep it, e.g.
+                        because an operation using it failed
+        """
+        with self._cond:
+            key = self._checked_out.pop(ioctx, None)
+            keep = (key is not None and not discard and
+                    self._is_connected(client) and
+                    len(self._idle[key]) < self._max_idle[key])
+            if keep:
+                self._idle[key].append((client, ioctx, time.time()))
+        if key is not None:
+            self._release(key)
+        if not keep:
+            self._close(client, ioctx)
+
+    def close_idle(self, max_age=0):
+        """Close the connections left idle for at least max_age seconds.
+
+        :returns: the number of connections closed
+        """
+        expired = []
+        now = time.time()
+        with self._cond:
+            for idle in self._idle.values():
+                # put() appends, so the connections idle longest come first
+                while idle and now - idle[0][2] >= max_age:
+                    client, ioctx, _since = idle.popleft()
+                    expired.append((client, ioctx))
+        for client, ioctx in expired:
+            self._close(client, ioctx)
+        return len(expired)
+
+    def _release(self, key):
+        with self._cond:
+            self._active[key] -= 1
+            self._cond.notify_all()
+
+    def _close(self, client, ioctx):
+        self.stats['closed'] += 1
+        # closing an ioctx cannot raise an exception
+        ioctx.close()
+        client.shutdown()
+
+
+_rados_connection_pool = None
+
+
+def get_rados_connection_pool():
+    """Return the connection pool shared by the ceph drivers."""
+    global _rados_connection_pool
+    if _rados_connection_pool is None:
+        _rados_connection_pool = RADOSConnectionPool()
+    return _rados_connection_pool
+
+
 class RBDVolumeProxy(object):
     """Context manager for dealing with an existing rbd volume.
 
@@ -212,7 +368,7 @@ class RBDVolumeProxy(object):
                                            read_only=read_only)
         except driver.rbd.Error:
             LOG.exception(_("error opening rbd image %s"), name)
-            driver._disconnect_from_rados(client, ioctx)
+            driver._disconnect_from_rados(client, ioctx, discard=True)
             raise
         self.driver = driver
         self.client = client
@@ -225,14 +381,19 @@ class RBDVolumeProxy(object):
         try:
             self.volume.close()
         finally:
-            self.driver._disconnect_from_rados(self.client, self.ioctx)
+            self.driver._disconnect_from_rados(self.client, self.ioctx,
+                                               discard=type_ is not None)
 
     def __getattr__(self, attrib):
         return getattr(self.volume, attrib)
 
 
 class RADOSClient(object):
-    """Context manager to simplify error handling for connecting to ceph."""
+    """Context manager to simplify error handling for connecting to ceph.
+
+    The connection is checked out of the shared connection pool and
+    returned to it on exit, unless the block raised.
+    """
     def __init__(self, driver, pool=None):
         self.driver = driver
         self.cluster, self.ioctx = driver._connect_to_rados(pool)
@@ -241,7 +402,8 @@ class RADOSClient(object):
         return self
 
     def __exit__(self, type_, value, traceback):
-        self.driver._disconnect_from_rados(self.cluster, self.ioctx)
+        self.driver._disconnect_from_rados(self.cluster, self.ioctx,
+                                           discard=type_ is not None)
 
 
 class RBDDriver(driver.VolumeDriver):
@@ -286,15 +448,27 @@ class RBDDriver(driver.VolumeDriver):
         return args
 
     def _connect_to_rados(self, pool=None):
+        if pool is not None:
+            pool = strutils.safe_encode(pool)
+        else:
+            pool = self.configuration.rbd_pool
+
+        key = (self.configuration.rbd_ceph_conf,
+               self.configuration.rbd_user, pool)
+        return get_rados_connection_pool().get(
+            key, functools.partial(self._open_rados_connection, pool),
+            self.configuration.rados_connection_pool_size,
+            self.configuration.rados_connection_pool_max_active)
+
+    def _disconnect_from_rados(self, client, ioctx, discard=False):
+        get_rados_connection_pool().put(client, ioctx, discard=discard)
+
+    def _open_rados_connection(self, pool):
         LOG.debug("opening connection to ceph cluster (timeout=%s)." %
                   (self.configuration.rados_connect_timeout))
 
         client = self.rados.Rados(rados_id=self.configuration.rbd_user,
                                   conffile=self.configuration.rbd_ceph_conf)
-        if pool is not None:
-            pool = strutils.safe_encode(pool)
-        else:
-            pool = self.configuration.rbd_pool
 
         try:
             if self.configuration.rados_connect_timeout >= 0:
@@ -310,11 +484,6 @@ class RBDDriver(driver.VolumeDriver):
             client.shutdown()
             raise exception.VolumeBackendAPIException(data=str(exc))
 
-    def _disconnect_from_rados(self, client, ioctx):
-        # closing an ioctx cannot raise an exception
-        ioctx.close()
-        client.shutdown()
-
     def _get_backup_snaps(self, rbd_image):
         """Get list of any backup snapshots that exist on this volume.
 
@@ -789,7 +958,58 @@ class RBDDriver(driver.VolumeDriver):
         if tmp_dir and not os.path.exists(tmp_dir):
             os.makedirs(tmp_dir)
 
+    def _stream_image_to_volume(self, context, volume, image_service,
+                                image_id):
+        """Write a raw image into a new RBD image while downloading it.
+
+        Chunks of zeroes are skipped, so the volume stays sparse.
+        """
+        @contextlib.contextmanager
+        def open_volume():
+            self.delete_volume(volume)
+            self.create_volume(volume)
+            with RBDVolumeProxy(self, volume['name']) as rbd_image:
+                rbd_meta = RBDImageMetadata(rbd_image,
+                                            self.configuration.rbd_pool,
+                                            self.configuration.rbd_user,
+                                            self.configuration.rbd_ceph_conf)
+                yield RBDImageIOWrapper(rbd_meta)
+
+        return image_utils.stream_raw_image(
+            context, image_service, image_id, open_volume,
+            size=volume['size'], skip_zeros=True,
+            chunk_size=CONF.rbd_store_chunk_size * units.Mi)
+
+    def _import_image(self, volume, path):
+        """Replace the volume with a new RBD image imported from path."""
+        self.delete_volume(volume)
+
+        chunk_size = CONF.rbd_store_chunk_size * units.Mi
+        order = int(math.log(chunk_size, 2))
+        # keep using the command line import instead of librbd since it
+        # detects zeroes to preserve sparseness in the image
+        args = ['rbd', 'import',
+                '--pool', self.configuration.rbd_pool,
+                '--order', order,
+                path, volume['name']]
+        if self._supports_layering():
+            args.append('--new-format')
+        args.extend(self._ceph_args())
+        self._try_execute(*args)
+
     def copy_image_to_volume(self, context, volume, image_service, image_id):
+        cached = image_utils.fetch_to_cache(
+            context, image_service, image_id,
+            self.configuration.volume_dd_blocksize, size=volume['size'])
+        if cached:
+            self._import_image(volume, cached)
+            self._resize(volume)
+            return
+
+        if self._stream_image_to_volume(context, volume, image_service,
+                                        image_id):
+            return
+
         self._ensure_tmp_exists()
         tmp_dir = self.configuration.volume_tmp_dir
 
@@ -798,21 +1018,7 @@ class RBDDriver(driver.VolumeDriver):
                                      tmp.name,
                                      self.configuration.volume_dd_blocksize,
                                      size=volume['size'])
-
-            self.delete_volume(volume)
-
-            chunk_size = CONF.rbd_store_chunk_size * units.Mi
-            order = int(math.log(chunk_size, 2))
-            # keep using the command line import instead of librbd since it
-            # detects zeroes to preserve sparseness in the image
-            args = ['rbd', 'import',
-                    '--pool', self.configuration.rbd_pool,
-                    '--order', order,
-                    tmp.name, volume['name']]
-            if self._supports_layering():
-                args.append('--new-format')
-            args.extend(self._ceph_args())
-            self._try_execute(*args)
+            self._import_image(volume, tmp.name)
         self._resize(volume)
 
     def copy_volume_to_image(self, context, volume, image_service, image_meta):
@@ -40,6 +40,8 @@ import json
 import math
 import pprint
 import re
+import threading
+import time
 import uuid
 
 from cinder.openstack.common import importutils
@@ -100,7 +102,17 @@ hp3par_opts = [
                 help="Enable HTTP debugging to 3PAR"),
     cfg.ListOpt('hp3par_iscsi_ips',
                 default=[],
-                help="List of target iSCSI addresses to use.")
+                help="List of target iSCSI addresses to use."),
+    cfg.IntOpt('hp3par_session_timeout',
+               default=0,
+               help="Seconds a WSAPI session is kept open after an "
+                    "operation for reuse by the next ones. Set it below "
+                    "the session timeout of the array. 0 logs out after "
+                    "every operation"),
+    cfg.IntOpt('hp3par_lookup_cache_time',
+               default=0,
+               help="Seconds the ports of the array and the domains of "
+                    "its CPGs are cached. 0 looks them up every time"),
 ]
 
 
@@ -108,6 +120,34 @@ CONF = cfg.CONF
 CONF.register_opts(hp3par_opts)
 
 
+class _SessionClient(object):
+    """Proxy to the WSAPI client which renews a shared session.
+
+    The array may end a shared session before it has been idle for
+    hp3par_session_timeout, for example when the WSAPI restarts. A call
+    rejected as unauthorized is then retried once in a new session.
+    """
+
+    def __init__(self, common, client):
+        self._common = common
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in ('login', 'logout') or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            generation = self._common._session_generation
+            try:
+                return attr(*args, **kwargs)
+            except hpexceptions.HTTPUnauthorized:
+                if not self._common._renew_session(generation):
+                    raise
+            return attr(*args, **kwargs)
+        return call
+
+
 class HP3PARCommon(object):
     """Class that contains common code for the 3PAR drivers.
 
@@ -138,10 +178,11 @@ class HP3PARCommon(object):
         2.0.14 - Modified manage volume to use standard 'source-name' element.
         2.0.15 - Added support for volume retype
         2.0.16 - Add a better log during delete_volume time. Bug #1349636
+        2.0.17 - Reuse WSAPI sessions and cache ports and CPG domains
 
     """
 
-    VERSION = "2.0.16"
+    VERSION = "2.0.17"
 
     stats = {}
 
@@ -179,6 +220,12 @@ class HP3PARCommon(object):
         self.config = config
         self.hosts_naming_dict = dict()
         self.client = None
+        self._session_lock = threading.Lock()
+        self._session_open = False
+        self._session_users = 0
+        self._session_released = None
+        self._session_generation = 0
+        self._lookup_cache = {}
 
     def get_version(self):
         return self.VERSION
@@ -209,9 +256,67 @@ class HP3PARCommon(object):
                          conn_timeout=self.config.ssh_conn_timeout,
                          privatekey=self.config.san_private_key)
 
-        return cl
+        return _SessionClient(self, cl)
 
     def client_login(self):
+        """Log in to the WSAPI or join the session kept open.
+
+        Every call must be followed by a call to client_logout.
+        """
+        timeout = self.config.hp3par_session_timeout
+        if not timeout:
+            self._login()
+            return
+        with self._session_lock:
+            if (self._session_open and not self._session_users and
+                    time.time() - self._session_released >= timeout):
+                # The array may have expired the idle session already.
+                self._end_session()
+            if not self._session_open:
+                self._start_session()
+            self._session_users += 1
+
+    def client_logout(self):
+        if not self.config.hp3par_session_timeout:
+            self._logout()
+            return
+        with self._session_lock:
+            self._session_users -= 1
+            if not self._session_users:
+                self._session_released = time.time()
+
+    def _start_session(self):
+        self._login()
+        self._session_open = True
+        self._session_generation += 1
+
+    def _renew_session(self, generation):
+        """Log in again after the array rejected the shared session.
+
+        :param generation: the session generation the rejected call used
+        :returns: whether the call should be retried
+        """
+        if not self.config.hp3par_session_timeout:
+            return False
+        with self._session_lock:
+            if not self._session_open:
+                return False
+            # Another call may have renewed the session already.
+            if self._session_generation == generation:
+                LOG.info(_("3PAR session is no longer valid, logging in "
+                           "again."))
+                self._end_session()
+                self._start_session()
+        return True
+
+    def _end_session(self):
+        self._session_open = False
+        try:
+            self._logout()
+        except Exception as ex:
+            LOG.debug("Failed to log out of 3PAR: %s" % ex)
+
+    def _login(self):
         try:
             LOG.debug("Connecting to 3PAR")
             self.client.login(self.config.hp3par_username,
@@ -222,10 +327,22 @@ class HP3PARCommon(object):
             LOG.error(msg)
             raise exception.InvalidInput(reason=msg)
 
-    def client_logout(self):
+    def _logout(self):
         self.client.logout()
         LOG.debug("Disconnect from 3PAR")
 
+    def _cached_lookup(self, key, lookup, *args):
+        """Return lookup(*args), cached for hp3par_lookup_cache_time."""
+        cache_time = self.config.hp3par_lookup_cache_time
+        if not cache_time:
+            return lookup(*args)
+        now = time.time()
+        cached = self._lookup_cache.get(key)
+        if cached is None or cached[0] <= now:
+            cached = (now + cache_time, lookup(*args))
+            self._lookup_cache[key] = cached
+        return cached[1]
+
     def do_setup(self, context):
         if hp3parclient is None:
             msg = _('You must install hp3parclient before using 3PAR drivers.')
@@ -257,6 +374,10 @@ class HP3PARCommon(object):
             raise exception.InvalidInput(reason=err)
 
     def get_domain(self, cpg_name):
+        return self._cached_lookup(('domain', cpg_name), self._get_domain,
+                                   cpg_name)
+
+    def _get_domain(self, cpg_name):
         try:
             cpg = self.client.getCPG(cpg_name)
         except hpexceptions.HTTPNotFound:
@@ -528,7 +649,7 @@ class HP3PARCommon(object):
         return self.client.getHost(hostname)
 
     def get_ports(self):
-        return self.client.getPorts()
+        return self._cached_lookup('ports', self.client.getPorts)
 
     def get_active_target_ports(self):
         ports = self.get_ports()
@@ -55,7 +55,18 @@ sf_opts = [
     cfg.IntOpt('sf_api_port',
                default=443,
                help='SolidFire API port. Useful if the device api is behind '
-                    'a proxy on a different port.'), ]
+                    'a proxy on a different port.'),
+
+    cfg.IntOpt('sf_api_pool_size',
+               default=4,
+               help='Number of idle API connections kept open for reuse. '
+                    'Set to 0 to open a new connection for every call.'),
+
+    cfg.IntOpt('sf_volume_index_ttl',
+               default=0,
+               help='Seconds the volumes of an account listed from the '
+                    'cluster are used to look up volumes by UUID before '
+                    'being listed again. 0 lists them for every lookup.'), ]
 
 
 CONF = cfg.CONF
@@ -93,6 +104,9 @@ class SolidFireDriver(SanISCSIDriver):
     def __init__(self, *args, **kwargs):
         super(SolidFireDriver, self).__init__(*args, **kwargs)
         self.configuration.append_config_values(sf_opts)
+        self._idle_connections = []
+        # accountID -> (expiry time, {volume UUID: SolidFire volume})
+        self._volume_index = {}
         try:
             self._update_cluster_status()
         except exception.SolidFireAPIException:
@@ -143,16 +157,15 @@ class SolidFireDriver(SanISCSIDriver):
             LOG.debug("Payload for SolidFire API call: %s", payload)
 
             api_endpoint = '/json-rpc/%s' % version
-            connection = httplib.HTTPSConnection(host, port)
             try:
-                connection.request('POST', api_endpoint, payload, header)
+                connection, response = self._send_request(
+                    host, port, api_endpoint, payload, header)
             except Exception as ex:
                 LOG.error(_('Failed to make httplib connection '
                             'SolidFire Cluster: %s (verify san_ip '
                             'settings)') % ex.message)
                 msg = _("Failed to make httplib connection: %s") % ex.message
                 raise exception.SolidFireAPIException(msg)
-            response = connection.getresponse()
 
             data = {}
             if response.status != 200:
@@ -177,7 +190,7 @@ class SolidFireDriver(SanISCSIDriver):
                             "an exception: %s") % exc
                     raise exception.SfJsonEncodeFailure(msg)
 
-                connection.close()
+                self._release_connection(connection)
 
             LOG.debug("Results of SolidFire API call: %s", data)
 
@@ -205,11 +218,85 @@ class SolidFireDriver(SanISCSIDriver):
 
         return data
 
+    def _send_request(self, host, port, endpoint, payload, header):
+        """Post on a keep-alive connection, returning it and the response.
+
+        A connection reused from an earlier call may have been closed by
+        the cluster while idle. The request is then sent once more on a
+        new connection, but only if it cannot have reached the cluster:
+        sending it failed, or the connection was closed without any
+        status line. Calls are not idempotent, so any other failure is
+        raised rather than risk running a call twice.
+        """
+        try:
+            connection = self._idle_connections.pop()
+            reused = True
+        except IndexError:
+            connection = httplib.HTTPSConnection(host, port)
+            reused = False
+        try:
+            connection.request('POST', endpoint, payload, header)
+        except (socket.error, httplib.HTTPException):
+            connection.close()
+            if not reused:
+                raise
+        else:
+            try:
+                return connection, connection.getresponse()
+            except httplib.BadStatusLine as e:
+                connection.close()
+                # httplib reports an empty status line as "''".
+                if not reused or e.line not in ('', "''"):
+                    raise
+            except (socket.error, httplib.HTTPException):
+                connection.close()
+                raise
+        connection = httplib.HTTPSConnection(host, port)
+        connection.request('POST', endpoint, payload, header)
+        return connection, connection.getresponse()
+
+    def _release_connection(self, connection):
+        """Keep a connection whose response was read for the next calls."""
+        if len(self._idle_connections) < self.configuration.sf_api_pool_size:
+            self._idle_connections.append(connection)
+        else:
+            connection.close()
+
+    def _index_volumes(self, account_id, volumes):
+        """Index the volumes listed for an account by their UUID."""
+        ttl = self.configuration.sf_volume_index_ttl
+        if not ttl:
+            return
+        index = {}
+        duplicates = set()
+        for v in volumes:
+            if v['name'].startswith('UUID-'):
+                uuid = v['name'][len('UUID-'):]
+                if uuid in index:
+                    duplicates.add(uuid)
+                index[uuid] = v
+        # Leave duplicates to a listing, which reports them.
+        for uuid in duplicates:
+            del index[uuid]
+        self._volume_index[account_id] = (time.time() + ttl, index)
+
+    def _get_indexed_volume(self, account_id, uuid):
+        entry = self._volume_index.get(account_id)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1].get(uuid)
+
+    def _unindex_volume(self, account_id, uuid):
+        entry = self._volume_index.get(account_id)
+        if entry is not None:
+            entry[1].pop(uuid, None)
+
     def _get_volumes_by_sfaccount(self, account_id):
         """Get all volumes on cluster for specified account."""
         params = {'accountID': account_id}
         data = self._issue_api_request('ListVolumesForAccount', params)
         if 'result' in data:
+            self._index_volumes(account_id, data['result']['volumes'])
             return data['result']['volumes']
 
     def _get_sfaccount_by_name(self, sf_account_name):
@@ -454,10 +541,15 @@ class SolidFireDriver(SanISCSIDriver):
         return qos
 
     def _get_sf_volume(self, uuid, params):
+        sf_volref = self._get_indexed_volume(params['accountID'], uuid)
+        if sf_volref is not None:
+            return sf_volref
+
         data = self._issue_api_request('ListVolumesForAccount', params)
         if 'result' not in data:
             msg = _("Failed to get SolidFire Volume: %s") % data
             raise exception.SolidFireAPIException(msg)
+        self._index_volumes(params['accountID'], data['result']['volumes'])
 
         found_count = 0
         sf_volref = None
@@ -567,6 +659,7 @@ class SolidFireDriver(SanISCSIDriver):
             if 'result' not in data:
                 msg = _("Failed to delete SolidFire Volume: %s") % data
                 raise exception.SolidFireAPIException(msg)
+            self._unindex_volume(sfaccount['accountID'], volume['id'])
         else:
             LOG.error(_("Volume ID %s was not found on "
                         "the SolidFire Cluster!"), volume['id'])
@@ -655,6 +748,7 @@ class SolidFireDriver(SanISCSIDriver):
 
         if 'result' not in data:
             raise exception.SolidFireAPIDataException(data=data)
+        sf_vol['totalSize'] = params['totalSize']
 
         LOG.debug("Leaving SolidFire extend_volume")
 
@@ -721,6 +815,8 @@ class SolidFireDriver(SanISCSIDriver):
         data = self._issue_api_request('ModifyVolume', params)
 
         if 'result' not in data:
+            # The attributes of the indexed volume were changed.
+            self._unindex_volume(sfaccount['accountID'], volume['id'])
             raise exception.SolidFireAPIDataException(data=data)
 
     def detach_volume(self, context, volume):
@@ -746,6 +842,8 @@ class SolidFireDriver(SanISCSIDriver):
         data = self._issue_api_request('ModifyVolume', params)
 
         if 'result' not in data:
+            # The attributes of the indexed volume were changed.
+            self._unindex_volume(sfaccount['accountID'], volume['id'])
             raise exception.SolidFireAPIDataException(data=data)
 
     def accept_transfer(self, context, volume,
@@ -769,6 +867,7 @@ class SolidFireDriver(SanISCSIDriver):
 
         if 'result' not in data:
             raise exception.SolidFireAPIDataException(data=data)
+        self._unindex_volume(sf_vol['accountID'], volume['id'])
 
         volume['project_id'] = new_project
         volume['user_id'] = new_user
@@ -811,5 +910,8 @@ class SolidFireDriver(SanISCSIDriver):
                 attributes[k] = str(v)
             params['attributes'] = attributes
 
+        # The attributes of the indexed volume were changed in place, its
+        # qos is listed again next time.
+        self._unindex_volume(sfaccount['accountID'], volume['id'])
         self._issue_api_request('ModifyVolume', params)
         return True
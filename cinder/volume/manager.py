@@ -64,12 +64,16 @@ from cinder.volume import rpcapi as volume_rpcapi
 from cinder.volume import utils as volume_utils
 from cinder.volume import volume_types
 
+import eventlet
 from eventlet.greenpool import GreenPool
 
 LOG = logging.getLogger(__name__)
 
 QUOTAS = quota.QUOTAS
 
+# Number of volumes re-exported between two progress messages at startup.
+INITHOST_PROGRESS_INTERVAL = 100
+
 volume_manager_opts = [
     cfg.StrOpt('volume_driver',
                default='cinder.volume.drivers.lvm.LVMISCSIDriver',
@@ -82,6 +86,17 @@ volume_manager_opts = [
                 default=False,
                 help='Offload pending volume delete during '
                      'volume service startup'),
+    cfg.IntOpt('volume_stats_timeout',
+               default=0,
+               help='Seconds driver stats collection may take when run in '
+                    'the background. While it runs, the last stats '
+                    'collected are published. 0 collects stats in the '
+                    'periodic task itself'),
+    cfg.IntOpt('volume_service_inithost_workers',
+               default=1,
+               help='Number of volumes re-exported in parallel during '
+                    'volume service startup, for drivers which cannot '
+                    're-export all volumes at once'),
     cfg.StrOpt('zoning_mode',
                default='none',
                help='FC Zoning mode configured'),
@@ -165,6 +180,8 @@ class VolumeManager(manager.SchedulerDependentManager):
                                            config_group=service_name)
         self._tp = GreenPool()
         self.stats = {}
+        # Greenthread collecting driver stats in the background, if any.
+        self._stats_collection = None
 
         if not volume_driver:
             # Get from configuration, which will get the default
@@ -193,6 +210,34 @@ class VolumeManager(manager.SchedulerDependentManager):
     def _add_to_threadpool(self, func, *args, **kwargs):
         self._tp.spawn_n(func, *args, **kwargs)
 
+    def _ensure_exports(self, ctxt, volumes):
+        """Re-export volumes, in parallel unless the driver does it in bulk.
+
+        Returns a dict mapping the ids of the volumes which could not be
+        re-exported to the exception raised.
+        """
+        failed = self.driver.ensure_exports(ctxt, volumes)
+        if failed is not None:
+            return failed
+
+        def _ensure_export(volume):
+            try:
+                self.driver.ensure_export(ctxt, volume)
+            except Exception as ex:
+                return volume['id'], ex
+            return volume['id'], None
+
+        failed = {}
+        pool = GreenPool(CONF.volume_service_inithost_workers)
+        for done, (volume_id, ex) in enumerate(
+                pool.imap(_ensure_export, volumes), 1):
+            if ex is not None:
+                failed[volume_id] = ex
+            if not done % INITHOST_PROGRESS_INTERVAL or done == len(volumes):
+                LOG.info(_("Re-exported %(done)d of %(total)d volumes") %
+                         {'done': done, 'total': len(volumes)})
+        return failed
+
     def init_host(self):
         """Do any initialization that needs to be run if this is a
            standalone service.
@@ -217,32 +262,19 @@ class VolumeManager(manager.SchedulerDependentManager):
         volumes = self.db.volume_get_all_by_host(ctxt, self.host)
         LOG.debug("Re-exporting %s volumes", len(volumes))
 
+        in_use = [volume for volume in volumes
+                  if volume['status'] in ['in-use']]
         try:
-            sum = 0
-            self.stats.update({'allocated_capacity_gb': sum})
-            for volume in volumes:
-                if volume['status'] in ['in-use']:
-                    # calculate allocated capacity for driver
-                    sum += volume['size']
-                    self.stats['allocated_capacity_gb'] = sum
-                    try:
-                        self.driver.ensure_export(ctxt, volume)
-                    except Exception as export_ex:
-                        LOG.error(_("Failed to re-export volume %s: "
-                                    "setting to error state"), volume['id'])
-                        LOG.exception(export_ex)
-                        self.db.volume_update(ctxt,
-                                              volume['id'],
-                                              {'status': 'error'})
-                elif volume['status'] == 'downloading':
-                    LOG.info(_("volume %s stuck in a downloading state"),
-                             volume['id'])
-                    self.driver.clear_download(ctxt, volume)
-                    self.db.volume_update(ctxt,
-                                          volume['id'],
-                                          {'status': 'error'})
-                else:
-                    LOG.info(_("volume %s: skipping export"), volume['id'])
+            # calculate allocated capacity for driver
+            self.stats.update({'allocated_capacity_gb':
+                               sum(volume['size'] for volume in in_use)})
+            failed = self._ensure_exports(ctxt, in_use)
+            for volume_id, export_ex in failed.items():
+                LOG.error(_("Failed to re-export volume %(volume_id)s: "
+                            "setting to error state: %(error)s") %
+                          {'volume_id': volume_id, 'error': export_ex})
+            self.db.volume_update_all_by_ids(ctxt, list(failed),
+                                             {'status': 'error'})
         except Exception as ex:
             LOG.error(_("Error encountered during "
                         "re-exporting phase of driver initialization: "
@@ -251,9 +283,28 @@ class VolumeManager(manager.SchedulerDependentManager):
             LOG.exception(ex)
             return
 
-        # at this point the driver is considered initialized.
+        # at this point the driver is considered initialized; stuck
+        # downloads and pending deletes are recovered after, so they do not
+        # delay the service.
         self.driver.set_initialized()
 
+        downloading = []
+        for volume in volumes:
+            if volume['status'] == 'downloading':
+                LOG.info(_("volume %s stuck in a downloading state"),
+                         volume['id'])
+                try:
+                    self.driver.clear_download(ctxt, volume)
+                except Exception as ex:
+                    LOG.error(_("Failed to clear download of volume %s"),
+                              volume['id'])
+                    LOG.exception(ex)
+                downloading.append(volume['id'])
+            elif volume['status'] not in ['in-use', 'deleting']:
+                LOG.info(_("volume %s: skipping export"), volume['id'])
+        self.db.volume_update_all_by_ids(ctxt, downloading,
+                                         {'status': 'error'})
+
         LOG.debug('Resuming any in progress delete operations')
         for volume in volumes:
             if volume['status'] == 'deleting':
@@ -1124,15 +1175,40 @@ class VolumeManager(manager.SchedulerDependentManager):
                         {'driver_name': self.driver.__class__.__name__,
                          'driver_version': self.driver.get_version(),
                          'config_group': config_group})
+        elif not CONF.volume_stats_timeout:
+            self._collect_driver_stats()
+        elif self._stats_collection is None:
+            self._stats_collection = eventlet.spawn(
+                self._collect_driver_stats_in_background)
         else:
-            volume_stats = self.driver.get_volume_stats(refresh=True)
-            if self.extra_capabilities:
-                volume_stats.update(self.extra_capabilities)
-            if volume_stats:
-                # Append volume stats with 'allocated_capacity_gb'
-                volume_stats.update(self.stats)
-                # queue it to be sent to the Schedulers.
-                self.update_service_capabilities(volume_stats)
+            LOG.debug('Driver stats are still being collected, publishing '
+                      'the last stats.')
+
+    def _collect_driver_stats(self):
+        volume_stats = self.driver.get_volume_stats(refresh=True)
+        if self.extra_capabilities:
+            volume_stats.update(self.extra_capabilities)
+        if volume_stats:
+            # Append volume stats with 'allocated_capacity_gb'
+            volume_stats.update(self.stats)
+            # Let the scheduler know how old the stats are, as they keep
+            # being published if later collections fail.
+            volume_stats['stats_timestamp'] = timeutils.isotime()
+            # queue it to be sent to the Schedulers.
+            self.update_service_capabilities(volume_stats)
+
+    def _collect_driver_stats_in_background(self):
+        try:
+            with eventlet.Timeout(CONF.volume_stats_timeout):
+                self._collect_driver_stats()
+        except eventlet.Timeout:
+            LOG.warning(_('Driver stats collection took more than %d '
+                          'seconds, giving up on it.') %
+                        CONF.volume_stats_timeout)
+        except Exception:
+            LOG.exception(_('Failed to collect driver stats.'))
+        finally:
+            self._stats_collection = None
 
     def publish_service_capabilities(self, context):
         """Collect driver status and then publish."""
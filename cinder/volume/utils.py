@@ -29,6 +29,7 @@ from cinder.openstack.common import strutils
 from cinder.openstack.common import units
 from cinder import rpc
 from cinder import utils
+from cinder.volume import block_copy
 
 
 CONF = cfg.CONF
@@ -179,7 +180,28 @@ def _calculate_count(size_in_m, blocksize):
 
 
 def copy_volume(srcstr, deststr, size_in_m, blocksize, sync=False,
-                execute=utils.execute, ionice=None):
+                execute=utils.execute, ionice=None, sparse=False,
+                progress=None):
+    """Copy size_in_m MiB from srcstr to deststr.
+
+    :param sparse: deststr reads back zeroes where nothing is written, so
+                   blocks of zeroes need not be written
+    :param progress: with the native copy engine, called with the bytes
+                     copied so far and the total
+    """
+    if (CONF.volume_copy_engine == 'native' and ionice is None and
+            block_copy.can_copy(srcstr, deststr)):
+        blocksize, count = _calculate_count(size_in_m, blocksize)
+        bs = strutils.string_to_bytes('%sB' % blocksize, return_int=True)
+        # Discarding zeroes keeps thinly provisioned destinations thin,
+        # unless the copy is clearing a volume.
+        block_copy.copy(srcstr, deststr, size_in_m * units.Mi, bs,
+                        sync=sync, sparse=sparse,
+                        discard=srcstr != '/dev/zero',
+                        bps_limit=CONF.volume_copy_bps_limit,
+                        progress=progress)
+        return
+
     # Use O_DIRECT to avoid thrashing the system buffer cache
     extra_flags = []
     # Check whether O_DIRECT is supported to iflag and oflag separately
@@ -202,6 +224,8 @@ def copy_volume(srcstr, deststr, size_in_m, blocksize, sync=False,
     cmd = ['dd', 'if=%s' % srcstr, 'of=%s' % deststr,
            'count=%d' % count, 'bs=%s' % blocksize]
     cmd.extend(extra_flags)
+    if sparse:
+        cmd.append('conv=sparse')
 
     if ionice is not None:
         cmd = ['ionice', ionice] + cmd
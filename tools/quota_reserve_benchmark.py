@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measure quota reservation throughput under concurrent volume creators.
+
+Every worker reserves a volume and its gigabytes for the same project and
+then commits or rolls back the reservation, like the volume API does, as
+fast as it can. Run against the database configured in cinder.conf:
+
+    tools/quota_reserve_benchmark.py --config-file /etc/cinder/cinder.conf \\
+        --workers 50 --duration 30
+
+Use a scratch MySQL or PostgreSQL database; SQLite serializes writers and
+fails concurrent transactions. The benchmark project's quotas and usages are
+deleted when it finishes.
+"""
+
+from __future__ import print_function
+
+import argparse
+import sys
+import threading
+import time
+import uuid
+
+from cinder.common import config  # noqa
+from cinder import context
+from cinder import db
+from cinder import quota
+
+
+def _worker(ctxt, deadline, results, index):
+    reserved = 0
+    errors = 0
+    while time.time() < deadline:
+        try:
+            reservations = quota.QUOTAS.reserve(ctxt, volumes=1,
+                                                gigabytes=1)
+            if reserved % 2:
+                quota.QUOTAS.rollback(ctxt, reservations)
+            else:
+                quota.QUOTAS.commit(ctxt, reservations)
+                reservations = quota.QUOTAS.reserve(ctxt, volumes=-1,
+                                                    gigabytes=-1)
+                quota.QUOTAS.commit(ctxt, reservations)
+            reserved += 1
+        except Exception as e:
+            if not errors:
+                print('worker %d: %s' % (index, e))
+            errors += 1
+    results[index] = (reserved, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--config-file', action='append', default=[])
+    parser.add_argument('--workers', type=int, default=50)
+    parser.add_argument('--duration', type=int, default=30,
+                        help='seconds to run for')
+    args = parser.parse_args()
+
+    cfg_args = []
+    for config_file in args.config_file:
+        cfg_args.extend(['--config-file', config_file])
+    quota.CONF(cfg_args, project='cinder')
+
+    project_id = 'quota-benchmark-%s' % uuid.uuid4()
+    ctxt = context.RequestContext('quota-benchmark', project_id,
+                                  is_admin=True)
+    # A finite limit, so reservations take the conditional update path.
+    db.quota_create(ctxt, project_id, 'volumes', 10 ** 9)
+    db.quota_create(ctxt, project_id, 'gigabytes', 10 ** 9)
+    # Create the usages before the workers race to do it.
+    quota.QUOTAS.rollback(ctxt, quota.QUOTAS.reserve(ctxt, volumes=1,
+                                                     gigabytes=1))
+
+    results = [None] * args.workers
+    deadline = time.time() + args.duration
+    threads = [threading.Thread(target=_worker,
+                                args=(ctxt, deadline, results, i))
+               for i in range(args.workers)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+
+    db.quota_destroy_all_by_project(ctxt, project_id)
+
+    reserved = sum(result[0] for result in results)
+    errors = sum(result[1] for result in results)
+    print('workers: %d' % args.workers)
+    print('reservations: %d in %.1fs (%.1f/s)' %
+          (reserved, elapsed, reserved / elapsed))
+    print('errors: %d' % errors)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
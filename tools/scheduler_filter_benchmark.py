@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare scheduler host filtering with and without the host index.
+
+Simulated back-ends, spread over availability zones, protocols, vendors
+and back-end names, are filtered for volume types of increasing
+selectivity with the default filters:
+
+    tools/scheduler_filter_benchmark.py --backends 1000 --requests 2000
+"""
+
+from __future__ import print_function
+
+import argparse
+import random
+import sys
+import time
+
+from cinder.common import config  # noqa
+from cinder.openstack.common.scheduler.filters import availability_zone_filter
+from cinder.openstack.common.scheduler.filters import capabilities_filter
+from cinder.scheduler.filters import capacity_filter
+from cinder.scheduler import host_manager
+
+
+PROTOCOLS = ['iSCSI', 'FC', 'NFS', 'RBD']
+VENDORS = ['Open Source', 'NetApp', 'HP', 'SolidFire', 'IBM']
+
+
+def _make_hosts(manager, count, zones):
+    rand = random.Random(0)
+    for i in range(count):
+        host = 'backend%d@pool' % i
+        capabilities = {
+            'volume_backend_name': 'backend%d' % (i % 50),
+            'vendor_name': rand.choice(VENDORS),
+            'storage_protocol': rand.choice(PROTOCOLS),
+            'total_capacity_gb': 10240,
+            'free_capacity_gb': rand.randint(0, 10240),
+            'reserved_percentage': 0,
+            'thin_provisioning_support': rand.choice([True, False]),
+            'timestamp': None,
+        }
+        service = {'host': host, 'disabled': False,
+                   'availability_zone': 'zone%d' % (i % zones)}
+        host_state = host_manager.HostState(host, capabilities=capabilities,
+                                            service=service)
+        host_state.update_from_volume_capability(capabilities)
+        manager.host_state_map[host] = host_state
+        manager.host_index.update(host_state)
+
+
+def _requests():
+    return [
+        ('no extra specs', {}),
+        ('protocol', {'storage_protocol': 'iSCSI'}),
+        ('protocol and vendor', {'capabilities:storage_protocol':
+                                 '<or> iSCSI <or> FC',
+                                 'vendor_name': 'NetApp'}),
+        ('backend name', {'volume_backend_name': 'backend7'}),
+    ]
+
+
+def _filter_properties(extra_specs, zone):
+    return {'size': 10,
+            'resource_type': {'extra_specs': extra_specs},
+            'request_spec': {'resource_properties':
+                             {'availability_zone': zone}}}
+
+
+def _run(filter_hosts, manager, extra_specs, zones, count):
+    start = time.time()
+    passed = 0
+    for i in range(count):
+        properties = _filter_properties(extra_specs, 'zone%d' % (i % zones))
+        passed += len(filter_hosts(manager.host_state_map.values(),
+                                   properties))
+    return time.time() - start, passed / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--backends', type=int, default=1000)
+    parser.add_argument('--zones', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+
+    manager = host_manager.HostManager()
+    filter_classes = [availability_zone_filter.AvailabilityZoneFilter,
+                      capacity_filter.CapacityFilter,
+                      capabilities_filter.CapabilitiesFilter]
+    manager.filter_classes = filter_classes
+    filter_names = [cls.__name__ for cls in filter_classes]
+    _make_hosts(manager, args.backends, args.zones)
+
+    def unindexed(hosts, properties):
+        return manager.filter_handler.get_filtered_objects(filter_classes,
+                                                           hosts, properties)
+
+    def indexed(hosts, properties):
+        return manager.get_filtered_hosts(hosts, properties, filter_names)
+
+    for name, extra_specs in _requests():
+        results = []
+        for filter_hosts in (unindexed, indexed):
+            results.append(_run(filter_hosts, manager, extra_specs,
+                                args.zones, args.requests))
+        (plain, passed), (fast, indexed_passed) = results
+        assert passed == indexed_passed
+        print('%-20s %d hosts pass, %.2fms unindexed, %.2fms indexed '
+              'per request' % (name, passed, plain * 1000 / args.requests,
+                               fast * 1000 / args.requests))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare volume copy throughput of dd and the native copy engine.
+
+A source of the given size, with the given share of blocks of zeroes, is
+copied with each engine through volume_utils.copy_volume:
+
+    tools/volume_copy_benchmark.py --size 4096 --zero-percent 50 \\
+        --dir /var/lib/cinder/tmp
+
+--source and --dest copy between existing paths instead, such as two
+scratch logical volumes; dd runs without sudo, so both must be accessible
+to the user running the benchmark. Their contents are overwritten.
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import eventlet
+eventlet.monkey_patch()
+
+from cinder.common import config  # noqa
+from cinder.openstack.common import processutils
+from cinder.openstack.common import units
+from cinder.volume import driver  # noqa
+from cinder.volume import utils as volume_utils
+
+
+def _execute(*cmd, **kwargs):
+    kwargs.pop('run_as_root', None)
+    return processutils.execute(*cmd, **kwargs)
+
+
+def _make_source(path, size_in_m, zero_percent):
+    block = os.urandom(units.Mi)
+    zeroes = '\0' * units.Mi
+    with open(path, 'w') as f:
+        for i in range(size_in_m):
+            f.write(zeroes if random.randint(1, 100) <= zero_percent
+                    else block)
+
+
+def _allocated(path):
+    if not os.path.isfile(path):
+        return None
+    return os.stat(path).st_blocks * 512
+
+
+def _run(engine, source, dest, size_in_m, blocksize):
+    volume_utils.CONF.set_override('volume_copy_engine', engine)
+    start = time.time()
+    volume_utils.copy_volume(source, dest, size_in_m, blocksize, sync=True,
+                             execute=_execute)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--size', type=int, default=1024,
+                        help='MiB to copy')
+    parser.add_argument('--zero-percent', type=int, default=50,
+                        help='share of the generated source made of zeroes')
+    parser.add_argument('--blocksize', default='1M')
+    parser.add_argument('--bps-limit', type=int, default=0)
+    parser.add_argument('--dir', default=None,
+                        help='where to create the source and destination')
+    parser.add_argument('--source')
+    parser.add_argument('--dest')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    volume_utils.CONF([], project='cinder')
+    volume_utils.CONF.set_override('volume_copy_bps_limit', args.bps_limit)
+
+    tmpdir = None
+    source, dest = args.source, args.dest
+    if not source or not dest:
+        tmpdir = tempfile.mkdtemp(dir=args.dir)
+        source = os.path.join(tmpdir, 'source')
+        dest = os.path.join(tmpdir, 'dest')
+        _make_source(source, args.size, args.zero_percent)
+
+    try:
+        for engine in ('dd', 'native'):
+            times = [_run(engine, source, dest, args.size, args.blocksize)
+                     for i in range(args.runs)]
+            best = min(times)
+            allocated = _allocated(dest)
+            print('%-6s best %.2fs (%.1f MiB/s) over %d runs%s' %
+                  (engine, best, args.size / best, args.runs,
+                   ', %d MiB allocated' % (allocated / units.Mi)
+                   if allocated is not None else ''))
+    finally:
+        if tmpdir:
+            for path in (source, dest):
+                if os.path.exists(path):
+                    os.unlink(path)
+            os.rmdir(tmpdir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())